@@ -0,0 +1,253 @@
+"""
+Control de admisión: límite de peticiones concurrentes con cola de prioridad
+
+Cuando llegan más peticiones de las que el pool de conexiones puede atender,
+en lugar de dejar que todas esperen una conexión hasta DB_POOL_TIMEOUT (y que
+la API entera se degrade) se admiten como máximo ADMISSION_MAX_CONCURRENT a
+la vez. El resto espera en una cola acotada y, si la cola está llena o la
+espera supera ADMISSION_QUEUE_TIMEOUT, recibe un 503 inmediato con
+`Retry-After`. Con la cola llena, una petición de mayor prioridad desplaza a
+la última en espera de menor prioridad (que recibe el 503 en su lugar).
+
+Cada petición pertenece a una clase según su método y ruta:
+
+- carrito: escrituras de /carrito (checkout, items, crear...). Máxima prioridad;
+  ADMISSION_CART_MAX_CONCURRENT puede acotarlas para que una ráfaga de
+  escrituras (que en SQLite se serializan) no deje sin lugar a las lecturas.
+- general: el resto de lecturas y escrituras.
+- masiva: exports, reportes e importación masiva. Menor prioridad y con su
+  propio límite (ADMISSION_BULK_MAX_CONCURRENT) para que no acaparen el pool.
+
+Al liberarse un lugar se admite primero la petición en espera de mayor
+prioridad (y, dentro de la misma clase, la más antigua).
+"""
+import asyncio
+import heapq
+import itertools
+import re
+from typing import Optional
+from app.core.config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_BULK_MAX_CONCURRENT,
+    ADMISSION_CART_MAX_CONCURRENT,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER
+)
+
+# Clases de petición y su prioridad (menor = se atiende antes)
+PRIORIDADES = {"carrito": 0, "general": 1, "masiva": 2}
+
+# Reglas (métodos, patrón de ruta, clase); la primera que coincide decide.
+# Las rutas exentas (clase None) no usan la base de datos o deben responder siempre.
+REGLAS = [
+    (None, re.compile(r"^/(health|metrics|docs|redoc|openapi\.json|cache/stats|pool/stats|admission/stats|events/stats)?/?$"), None),
+    (None, re.compile(r"^/(docs|redoc)/"), None),
+    # Conexiones SSE de larga duración: tienen su propio límite (EVENTS_MAX_CLIENTS) y no usan el pool
+    (None, re.compile(r"^/productos/eventos/?$"), None),
+    (("GET",), re.compile(r"^/(productos|carrito)/export/?$"), "masiva"),
+    (("POST",), re.compile(r"^/productos/bulk/?$"), "masiva"),
+    (("GET",), re.compile(r"^/reportes/"), "masiva"),
+    (("POST", "PUT", "PATCH", "DELETE"), re.compile(r"^/carrito(/|$)"), "carrito"),
+]
+
+def limites_por_clase() -> dict:
+    limites = {"masiva": ADMISSION_BULK_MAX_CONCURRENT}
+    if ADMISSION_CART_MAX_CONCURRENT > 0:
+        limites["carrito"] = ADMISSION_CART_MAX_CONCURRENT
+    return limites
+
+def clasificar(metodo: str, ruta: str) -> Optional[str]:
+    """Clase de admisión de una petición, o None si está exenta"""
+    for metodos, patron, clase in REGLAS:
+        if (metodos is None or metodo in metodos) and patron.search(ruta):
+            return clase
+    return "general"
+
+class ControlAdmision:
+    """Semáforo con límite global, límites por clase y cola de espera por prioridad"""
+
+    def __init__(
+        self,
+        limite: int = ADMISSION_MAX_CONCURRENT,
+        limites_clase: Optional[dict] = None,
+        max_cola: int = ADMISSION_QUEUE_SIZE,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.limite = limite
+        self.limites_clase = limites_por_clase() if limites_clase is None else limites_clase
+        self.max_cola = max_cola
+        self.timeout = timeout
+        self._cola = []  # heap de (prioridad, orden, clase, futuro)
+        self._orden = itertools.count()
+        self.activas = {clase: 0 for clase in PRIORIDADES}
+        self.en_espera = {clase: 0 for clase in PRIORIDADES}
+        self.admitidas = {clase: 0 for clase in PRIORIDADES}
+        self.rechazadas = {(clase, motivo): 0 for clase in PRIORIDADES for motivo in ("cola_llena", "timeout", "desplazada")}
+        self.espera_total_s = {clase: 0.0 for clase in PRIORIDADES}
+
+    def hay_lugar(self, clase: str) -> bool:
+        limite_clase = self.limites_clase.get(clase)
+        return (
+            sum(self.activas.values()) < self.limite
+            and (limite_clase is None or self.activas[clase] < limite_clase)
+        )
+
+    async def entrar(self, clase: str) -> bool:
+        """Ocupar un lugar; False si la petición debe rechazarse"""
+        # Sin nadie esperando delante se admite directamente (camino rápido)
+        if not self._cola and self.hay_lugar(clase):
+            self.activas[clase] += 1
+            self.admitidas[clase] += 1
+            return True
+        if len(self._cola) >= self.max_cola and not self.desplazar(PRIORIDADES[clase]):
+            self.rechazadas[(clase, "cola_llena")] += 1
+            return False
+
+        futuro = asyncio.get_running_loop().create_future()
+        entrada = (PRIORIDADES[clase], next(self._orden), clase, futuro)
+        heapq.heappush(self._cola, entrada)
+        self.en_espera[clase] += 1
+        self.despachar()
+        inicio = asyncio.get_running_loop().time()
+        try:
+            # True: admitida; False: desplazada de la cola por una de mayor prioridad
+            return await asyncio.wait_for(asyncio.shield(futuro), self.timeout)
+        except asyncio.TimeoutError:
+            if futuro.done():
+                # Se resolvió justo al vencer la espera
+                return futuro.result()
+            futuro.cancel()
+            self.rechazadas[(clase, "timeout")] += 1
+            return False
+        except asyncio.CancelledError:
+            # El cliente se desconectó: devolver el lugar si ya se había concedido
+            if futuro.done() and not futuro.cancelled() and futuro.result():
+                self.salir(clase)
+            futuro.cancel()
+            raise
+        finally:
+            self.espera_total_s[clase] += asyncio.get_running_loop().time() - inicio
+            if futuro.cancelled():
+                self._cola = [otra for otra in self._cola if otra is not entrada]
+                heapq.heapify(self._cola)
+                self.en_espera[clase] -= 1
+
+    def desplazar(self, prioridad: int) -> bool:
+        """Con la cola llena, sacar la última petición de menor prioridad que `prioridad`"""
+        candidatas = [entrada for entrada in self._cola if entrada[0] > prioridad and not entrada[3].done()]
+        if not candidatas:
+            return False
+        entrada = max(candidatas, key=lambda candidata: (candidata[0], candidata[1]))
+        self._cola.remove(entrada)
+        heapq.heapify(self._cola)
+        _, _, clase, futuro = entrada
+        self.en_espera[clase] -= 1
+        self.rechazadas[(clase, "desplazada")] += 1
+        futuro.set_result(False)
+        return True
+
+    def salir(self, clase: str):
+        self.activas[clase] -= 1
+        self.despachar()
+
+    def despachar(self):
+        """Admitir, por prioridad, las peticiones en espera que quepan"""
+        saltadas = []
+        while self._cola and sum(self.activas.values()) < self.limite:
+            entrada = heapq.heappop(self._cola)
+            _, _, clase, futuro = entrada
+            if futuro.done():
+                continue
+            if not self.hay_lugar(clase):
+                # Su clase está en el límite: las de otras clases pueden pasar
+                saltadas.append(entrada)
+                continue
+            self.activas[clase] += 1
+            self.admitidas[clase] += 1
+            self.en_espera[clase] -= 1
+            futuro.set_result(True)
+        for entrada in saltadas:
+            heapq.heappush(self._cola, entrada)
+
+    def estadisticas(self):
+        return {
+            "limite": self.limite,
+            "limites_clase": dict(self.limites_clase),
+            "max_cola": self.max_cola,
+            "activas": dict(self.activas),
+            "en_espera": dict(self.en_espera),
+            "admitidas": dict(self.admitidas),
+            "rechazadas": {f"{clase}:{motivo}": total for (clase, motivo), total in self.rechazadas.items()},
+            "espera_total_s": {clase: round(segundos, 6) for clase, segundos in self.espera_total_s.items()},
+        }
+
+admision = ControlAdmision()
+
+async def responder_503(send, retry_after: int = ADMISSION_RETRY_AFTER):
+    cuerpo = b'{"detail":"Servidor saturado, intente de nuevo en unos segundos"}'
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+class AdmisionMiddleware:
+    """Middleware ASGI que aplica el control de admisión antes de llegar a la ruta.
+
+    El lugar se conserva hasta terminar de enviar la respuesta, así que los
+    exports por streaming lo ocupan mientras mantienen la conexión a la base.
+    """
+
+    def __init__(self, app, control: ControlAdmision = admision):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        clase = clasificar(scope["method"], scope["path"])
+        if clase is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.control.entrar(clase):
+            await responder_503(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.salir(clase)
+
+def colector_admision(obtener_estadisticas):
+    """Colector de métricas de la cola de admisión"""
+
+    def colector():
+        estadisticas = obtener_estadisticas()
+        return [
+            ("admission_active_requests", "gauge", "Peticiones admitidas en curso", [
+                ({"clase": clase}, total) for clase, total in estadisticas["activas"].items()
+            ]),
+            ("admission_queue_depth", "gauge", "Peticiones esperando en la cola de admisión", [
+                ({"clase": clase}, total) for clase, total in estadisticas["en_espera"].items()
+            ]),
+            ("admission_admitted_total", "counter", "Peticiones admitidas", [
+                ({"clase": clase}, total) for clase, total in estadisticas["admitidas"].items()
+            ]),
+            ("admission_shed_total", "counter", "Peticiones rechazadas con 503", [
+                ({"clase": clave.split(":")[0], "motivo": clave.split(":")[1]}, total)
+                for clave, total in estadisticas["rechazadas"].items()
+            ]),
+            ("admission_queue_wait_seconds_total", "counter", "Tiempo total esperando admisión", [
+                ({"clase": clase}, segundos) for clase, segundos in estadisticas["espera_total_s"].items()
+            ]),
+            ("admission_limit", "gauge", "Límite de peticiones concurrentes", [({}, estadisticas["limite"])]),
+        ]
+
+    return colector
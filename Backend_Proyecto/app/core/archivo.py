@@ -0,0 +1,126 @@
+"""
+Archivo de carritos completados/cancelados antiguos
+
+Los carritos cerrados cuya última actividad es anterior al corte se mueven de
+`carritos`/`carrito_items` a `carritos_archivados`/`carrito_items_archivados`
+para que los índices y las páginas que recorren los listados solo contengan
+el historial reciente. Cada lote de ARCHIVE_BATCH_SIZE carritos es una única
+transacción:
+
+    SELECT id FROM carritos WHERE estado IN (...) AND <antiguo> AND id > :ultimo
+    ORDER BY id LIMIT :lote FOR UPDATE SKIP LOCKED
+    INSERT INTO carritos_archivados SELECT ... FROM carritos WHERE id IN (...)
+    INSERT INTO carrito_items_archivados SELECT ... FROM carrito_items WHERE carrito_id IN (...)
+    DELETE FROM carrito_items WHERE carrito_id IN (...)
+    DELETE FROM carritos WHERE id IN (...)
+
+Un lote se mueve entero o no se mueve, así que el proceso se puede
+interrumpir en cualquier momento y volver a lanzar: lo ya archivado ya no
+está en `carritos` y la siguiente ejecución sigue con lo pendiente.
+
+El rollup de ventas no cambia (los carritos archivados siguen contando y
+`recalcular_ventas` también los lee); las lecturas del archivo son explícitas
+(`?archivado=true` en GET /carrito).
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, delete, func
+from app.core.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_PAUSE
+from app.models.models import Carrito, CarritoItem, CarritoArchivado, CarritoItemArchivado
+
+ESTADOS_ARCHIVABLES = ("completado", "cancelado")
+
+COLUMNAS_CARRITO = [
+    "id", "fecha_creacion", "fecha_actualizacion", "total", "estado", "cantidad_items", "productos_distintos"
+]
+COLUMNAS_ITEM = ["id", "carrito_id", "producto_id", "cantidad", "precio_unitario", "subtotal"]
+
+def limite_archivo(dias: float = ARCHIVE_AFTER_DAYS) -> datetime:
+    """Instante antes del cual un carrito cerrado se archiva (UTC, como CURRENT_TIMESTAMP)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=dias)
+
+def archivables(limite: datetime):
+    return (
+        Carrito.estado.in_(ESTADOS_ARCHIVABLES),
+        func.coalesce(Carrito.fecha_actualizacion, Carrito.fecha_creacion) < limite
+    )
+
+def contar_archivables(conn, limite: datetime) -> int:
+    return conn.scalar(select(func.count(Carrito.id)).where(*archivables(limite)))
+
+def archivar_lote(conn, limite: datetime, despues_de: int, tope: int, tamano: int = ARCHIVE_BATCH_SIZE):
+    """Mover el siguiente lote de carritos archivables con despues_de < id < tope.
+
+    Devuelve (carritos, items, último id) o (0, 0, None) si no quedan.
+    """
+    ids = conn.scalars(
+        select(Carrito.id)
+        .where(*archivables(limite), Carrito.id > despues_de, Carrito.id < tope)
+        .order_by(Carrito.id)
+        .limit(tamano)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        return 0, 0, None
+
+    conn.execute(
+        insert(CarritoArchivado).from_select(
+            COLUMNAS_CARRITO,
+            select(*(getattr(Carrito, columna) for columna in COLUMNAS_CARRITO)).where(Carrito.id.in_(ids))
+        )
+    )
+    items = conn.execute(
+        insert(CarritoItemArchivado).from_select(
+            COLUMNAS_ITEM,
+            select(*(getattr(CarritoItem, columna) for columna in COLUMNAS_ITEM)).where(CarritoItem.carrito_id.in_(ids))
+        )
+    ).rowcount
+    conn.execute(delete(CarritoItem).where(CarritoItem.carrito_id.in_(ids)))
+    conn.execute(delete(Carrito).where(Carrito.id.in_(ids)))
+    return len(ids), items, ids[-1]
+
+class ResultadoArchivo:
+    """Carritos e items movidos, lotes y duración de una ejecución"""
+
+    def __init__(self):
+        self.carritos = 0
+        self.items = 0
+        self.lotes = 0
+        self.inicio = time.perf_counter()
+        self.segundos = 0.0
+
+    def registrar(self, carritos: int, items: int):
+        self.carritos += carritos
+        self.items += items
+        self.lotes += 1
+        self.segundos = time.perf_counter() - self.inicio
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return (self.carritos + self.items) / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.carritos} carritos y {self.items} items archivados en {self.lotes} lotes, "
+            f"{self.segundos:.2f}s ({self.filas_por_segundo:,.0f} filas/s)"
+        )
+
+def archivar_carritos(engine, dias: float = ARCHIVE_AFTER_DAYS, tamano: int = ARCHIVE_BATCH_SIZE,
+                      pausa: float = ARCHIVE_PAUSE, al_terminar_lote=None) -> ResultadoArchivo:
+    """Archivar todos los carritos cerrados anteriores al corte, lote a lote"""
+    limite = limite_archivo(dias)
+    resultado = ResultadoArchivo()
+    with engine.connect() as conn:
+        # El carrito con el id más alto nunca se archiva: SQLite asigna max(id) + 1
+        # a los nuevos y, si desapareciera, un carrito nuevo repetiría un id archivado
+        tope = conn.scalar(select(func.max(Carrito.id))) or 0
+    ultimo = 0
+    while True:
+        with engine.begin() as conn:
+            carritos, items, ultimo = archivar_lote(conn, limite, ultimo, tope, tamano)
+        if ultimo is None:
+            return resultado
+        resultado.registrar(carritos, items)
+        if al_terminar_lote is not None:
+            al_terminar_lote(resultado)
+        time.sleep(pausa)
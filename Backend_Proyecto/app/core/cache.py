@@ -0,0 +1,190 @@
+"""
+Caché en proceso del catálogo de productos (LRU + TTL)
+
+Las escrituras de productos incrementan un sello de versión en la tabla
+`catalogo_version` dentro de la misma transacción. Cada worker compara ese
+sello (siempre en la primaria) como máximo una vez cada
+`PRODUCT_CACHE_VERSION_INTERVAL` segundos y vacía su caché si otro worker
+modificó el catálogo.
+
+Con réplica, las lecturas de un cliente dentro de su ventana read-your-writes
+no consultan ni llenan la caché: una entrada llenada desde la réplica puede
+ser anterior a la escritura que ese cliente acaba de hacer. Además, una
+lectura de la réplica solo llena la caché si el sello que ve la réplica ya
+alcanzó al último sello conocido de la primaria; tras una escritura local el
+sello de la primaria se vuelve a leer en la siguiente petición.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import select, update, insert
+from app.core.config import (
+    PRODUCT_CACHE_ENABLED,
+    PRODUCT_CACHE_MAX_ENTRIES,
+    PRODUCT_CACHE_TTL,
+    PRODUCT_CACHE_VERSION_INTERVAL
+)
+from app.database.connection import async_engine, async_replica_engine
+from app.models.models import VersionCatalogo
+
+def incrementar_version(conn):
+    """Incrementar el sello de versión con una sesión o conexión síncrona (también la usa seed_data)"""
+    result = conn.execute(
+        update(VersionCatalogo)
+        .where(VersionCatalogo.id == 1)
+        .values(version=VersionCatalogo.version + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(VersionCatalogo).values(id=1, version=1))
+
+def lectura_de_replica(db) -> bool:
+    """Si la sesión `db` lee de la réplica (que puede ir por detrás de la primaria)"""
+    return async_replica_engine is not None and db.bind is async_replica_engine
+
+def consulta_version():
+    """Sello del catálogo (una sola fila): toda escritura de productos lo incrementa"""
+    return select(VersionCatalogo.version).where(VersionCatalogo.id == 1)
+
+class CacheLRU:
+    """Diccionario acotado con expiración por TTL y desalojo LRU"""
+
+    def __init__(self, max_entradas: int, ttl: float):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, clave):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        valor, expira = entrada
+        if time.monotonic() >= expira:
+            del self._datos[clave]
+            self.fallos += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        self._datos[clave] = (valor, time.monotonic() + self.ttl)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.desalojos += 1
+
+    def eliminar(self, clave):
+        self._datos.pop(clave, None)
+
+    def eliminar_si(self, condicion):
+        for clave in [clave for clave in self._datos if condicion(clave)]:
+            del self._datos[clave]
+
+    def limpiar(self):
+        self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+class CacheCatalogo:
+    """Caché de productos serializados y páginas de listado"""
+
+    def __init__(
+        self,
+        habilitada: bool = PRODUCT_CACHE_ENABLED,
+        max_entradas: int = PRODUCT_CACHE_MAX_ENTRIES,
+        ttl: float = PRODUCT_CACHE_TTL,
+        intervalo_version: float = PRODUCT_CACHE_VERSION_INTERVAL
+    ):
+        self.habilitada = habilitada
+        self.intervalo_version = intervalo_version
+        self._lru = CacheLRU(max_entradas, ttl)
+        self._version = None
+        self._proxima_verificacion = 0.0
+        # Cambia en cada invalidación; evita guardar lecturas iniciadas antes de ella
+        self.generacion = 0
+        self.invalidaciones = 0
+        self.rechazos_replica = 0
+
+    async def sincronizar(self):
+        """Vaciar la caché si otro worker cambió el sello de versión del catálogo"""
+        if not self.habilitada:
+            return
+        ahora = time.monotonic()
+        if ahora < self._proxima_verificacion:
+            return
+        self._proxima_verificacion = ahora + self.intervalo_version
+        # Leído de la primaria: en una réplica con retraso el cambio aún no sería visible
+        async with async_engine.connect() as conn:
+            version = await conn.scalar(consulta_version()) or 0
+        if self._version is not None and version != self._version:
+            self._vaciar()
+        self._version = version
+
+    async def version_lectura(self, db) -> Optional[int]:
+        """Sello que ve la sesión de lectura `db` si es la réplica (None si se lee de la primaria).
+
+        Consultarlo antes de leer los datos: lo que se lea después es al menos así de reciente.
+        """
+        if not lectura_de_replica(db):
+            return None
+        return await db.scalar(consulta_version()) or 0
+
+    def obtener(self, clave):
+        if not self.habilitada:
+            return None
+        return self._lru.obtener(clave)
+
+    def guardar(self, clave, valor, generacion: int, version: Optional[int] = None):
+        """Guardar un valor leído cuando la generación aún era `generacion`.
+
+        `version` es el sello que veía la réplica al leerlo (ver `version_lectura`):
+        si es anterior al de la primaria, el valor puede no incluir escrituras ya
+        confirmadas y no se guarda.
+        """
+        if not self.habilitada or generacion != self.generacion:
+            return
+        if version is not None and (self._version is None or version < self._version):
+            self.rechazos_replica += 1
+            return
+        self._lru.guardar(clave, valor)
+
+    async def marcar_cambio(self, db):
+        """Incrementar el sello de versión (llamar dentro de la transacción de escritura)"""
+        await db.run_sync(incrementar_version)
+
+    def invalidar_producto(self, producto_id: int):
+        """Eliminar el detalle de un producto y todas las páginas de listado"""
+        self.generacion += 1
+        self.invalidaciones += 1
+        self._lru.eliminar(("producto", producto_id))
+        self._lru.eliminar_si(lambda clave: clave[0] == "lista")
+        # El sello de la primaria cambió: releerlo antes de aceptar lecturas de la réplica
+        self._proxima_verificacion = 0.0
+
+    def limpiar(self):
+        self._vaciar()
+        self._proxima_verificacion = 0.0
+
+    def _vaciar(self):
+        self.generacion += 1
+        self.invalidaciones += 1
+        self._lru.limpiar()
+
+    def estadisticas(self):
+        return {
+            "habilitada": self.habilitada,
+            "entradas": len(self._lru),
+            "max_entradas": self._lru.max_entradas,
+            "aciertos": self._lru.aciertos,
+            "fallos": self._lru.fallos,
+            "desalojos": self._lru.desalojos,
+            "invalidaciones": self.invalidaciones,
+            "rechazos_replica": self.rechazos_replica,
+        }
+
+cache_productos = CacheCatalogo()
@@ -0,0 +1,152 @@
+"""
+Compresión gzip/brotli de las respuestas por encima de un umbral
+
+Middleware ASGI puro: negocia la codificación con Accept-Encoding (brotli si
+el paquete `brotli` está instalado, si no gzip), deja sin comprimir las
+respuestas menores que COMPRESSION_MIN_SIZE y comprime por fragmentos las
+respuestas en streaming (exports). Los flujos `text/event-stream` y las
+respuestas ya codificadas se envían tal cual.
+"""
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se usa gzip
+    brotli = None
+
+TIPOS_SIN_COMPRESION = ("text/event-stream",)
+
+class CompresorGzip:
+    def __init__(self, nivel: int = COMPRESSION_GZIP_LEVEL):
+        # wbits 16 + MAX_WBITS: formato gzip (cabecera y CRC)
+        self._zlib = zlib.compressobj(nivel, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._zlib.compress(datos)
+
+    def terminar(self) -> bytes:
+        return self._zlib.flush()
+
+class CompresorBrotli:
+    def __init__(self, calidad: int = COMPRESSION_BROTLI_QUALITY):
+        self._brotli = brotli.Compressor(quality=calidad)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._brotli.process(datos)
+
+    def terminar(self) -> bytes:
+        return self._brotli.finish()
+
+def codificaciones_disponibles() -> tuple:
+    """Codificaciones soportadas, en orden de preferencia"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def elegir_codificacion(accept_encoding: str, disponibles: tuple) -> Optional[str]:
+    """Codificación con mayor q aceptada por el cliente (empates por preferencia del servidor)"""
+    calidades = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        calidades[nombre] = calidad
+    
+    mejor, mejor_calidad = None, 0.0
+    for codificacion in disponibles:
+        calidad = calidades.get(codificacion, calidades.get("*", 0.0))
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = codificacion, calidad
+    return mejor
+
+def comprimible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    return not headers.get("content-type", "").startswith(TIPOS_SIN_COMPRESION)
+
+class CompresionMiddleware:
+    """Middleware ASGI de compresión de respuestas"""
+
+    def __init__(
+        self,
+        app,
+        minimo: int = COMPRESSION_MIN_SIZE,
+        nivel_gzip: int = COMPRESSION_GZIP_LEVEL,
+        calidad_brotli: int = COMPRESSION_BROTLI_QUALITY
+    ):
+        self.app = app
+        self.minimo = minimo
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+        self.disponibles = codificaciones_disponibles()
+
+    def crear_compresor(self, codificacion: str):
+        if codificacion == "br":
+            return CompresorBrotli(self.calidad_brotli)
+        return CompresorGzip(self.nivel_gzip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""), self.disponibles)
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        
+        inicio = None       # http.response.start retenido hasta ver el primer fragmento
+        compresor = None
+        sin_compresion = False
+        
+        async def enviar(message):
+            nonlocal inicio, compresor, sin_compresion
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or sin_compresion:
+                await send(message)
+                return
+            
+            cuerpo = message.get("body", b"")
+            mas_cuerpo = message.get("more_body", False)
+            
+            if compresor is None:
+                headers = MutableHeaders(raw=inicio["headers"])
+                if not comprimible(headers) or (not mas_cuerpo and len(cuerpo) < self.minimo):
+                    sin_compresion = True
+                    await send(inicio)
+                    await send(message)
+                    return
+                
+                compresor = self.crear_compresor(codificacion)
+                headers["Content-Encoding"] = codificacion
+                headers.add_vary_header("Accept-Encoding")
+                if mas_cuerpo:
+                    # Streaming: la longitud final no se conoce
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                else:
+                    cuerpo = compresor.comprimir(cuerpo) + compresor.terminar()
+                    headers["Content-Length"] = str(len(cuerpo))
+                    await send(inicio)
+                    await send({"type": "http.response.body", "body": cuerpo})
+                    return
+                await send(inicio)
+            
+            datos = compresor.comprimir(cuerpo)
+            if not mas_cuerpo:
+                datos += compresor.terminar()
+            if datos or not mas_cuerpo:
+                await send({"type": "http.response.body", "body": datos, "more_body": mas_cuerpo})
+        
+        await self.app(scope, receive, enviar)
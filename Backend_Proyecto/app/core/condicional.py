@@ -0,0 +1,68 @@
+"""
+Peticiones condicionales HTTP: ETag, Last-Modified y respuestas 304
+
+Los ETag se calculan a partir de los valores crudos de las filas (o de un
+resumen de agregados), sin serializar el modelo, para poder responder 304
+antes de construir la respuesta.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response, status
+from app.core.config import HTTP_CACHE_MAX_AGE
+
+def calcular_etag(*partes) -> str:
+    """ETag fuerte a partir de una secuencia de valores"""
+    digest = hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def valores_fila(fila) -> tuple:
+    """Valores de todas las columnas de una fila ORM, en orden de la tabla"""
+    return tuple(getattr(fila, columna.key) for columna in fila.__table__.columns)
+
+def en_utc(fecha: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve fechas sin zona (CURRENT_TIMESTAMP está en UTC)
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        return fecha.replace(tzinfo=timezone.utc)
+    return fecha.astimezone(timezone.utc)
+
+def cabeceras_cache(etag: str, ultima_modificacion: Optional[datetime] = None) -> dict:
+    """Cabeceras de validación y Cache-Control para una respuesta"""
+    cabeceras = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}" if HTTP_CACHE_MAX_AGE > 0 else "no-cache",
+    }
+    ultima_modificacion = en_utc(ultima_modificacion)
+    if ultima_modificacion is not None:
+        cabeceras["Last-Modified"] = format_datetime(ultima_modificacion, usegmt=True)
+    return cabeceras
+
+def coincide_etag(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidatos = (candidato.strip() for candidato in if_none_match.split(","))
+    return any(candidato.removeprefix("W/") == etag for candidato in candidatos)
+
+def no_modificado(request: Request, etag: str, ultima_modificacion: Optional[datetime] = None) -> bool:
+    """True si la copia del cliente sigue vigente; If-None-Match tiene prioridad sobre If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return coincide_etag(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    ultima_modificacion = en_utc(ultima_modificacion)
+    if if_modified_since is None or ultima_modificacion is None:
+        return False
+    try:
+        fecha_cliente = en_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified solo tiene resolución de segundos
+    return ultima_modificacion.replace(microsecond=0) <= fecha_cliente
+
+def respuesta_304(cabeceras: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
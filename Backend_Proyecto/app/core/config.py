@@ -0,0 +1,123 @@
+"""
+Configuración de la aplicación a partir de variables de entorno
+
+Todos los valores tienen un valor por defecto para que la API funcione sin
+configuración adicional; en despliegues se ajustan por entorno sin tocar el código.
+"""
+import os
+import urllib.parse
+
+def env_str(nombre: str, defecto: str) -> str:
+    return os.getenv(nombre, defecto)
+
+def env_int(nombre: str, defecto: int) -> int:
+    return int(os.getenv(nombre, defecto))
+
+def env_float(nombre: str, defecto: float) -> float:
+    return float(os.getenv(nombre, defecto))
+
+def env_bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() not in ("0", "false", "no", "off", "")
+
+# Configuración de conexión a SQL Server (usada si no se define DATABASE_URL)
+DB_SERVER = env_str("DB_SERVER", "localhost\\SQLEXPRESS")  # Usando la instancia local SQLEXPRESS común
+DB_NAME = env_str("DB_NAME", "db_disco")
+DB_USER = env_str("DB_USER", "user_disco")
+DB_PASSWORD = env_str("DB_PASSWORD", "123456")
+DB_ODBC_DRIVER = env_str("DB_ODBC_DRIVER", "ODBC Driver 17 for SQL Server")
+
+# URL de conexión (SQL Server por defecto; sqlite:///... o postgresql://... en local)
+DATABASE_URL = env_str(
+    "DATABASE_URL",
+    f"mssql+pyodbc://{DB_USER}:{urllib.parse.quote_plus(DB_PASSWORD)}@{DB_SERVER}/{DB_NAME}"
+    f"?driver={urllib.parse.quote_plus(DB_ODBC_DRIVER)}&trusted_connection=yes"
+)
+# URL asíncrona; vacía = derivarla de DATABASE_URL
+ASYNC_DATABASE_URL = env_str("ASYNC_DATABASE_URL", "")
+
+# Réplica de solo lectura opcional para los GET (vacía = leer de la primaria).
+# Usa la misma configuración de pool que la primaria.
+REPLICA_DATABASE_URL = env_str("REPLICA_DATABASE_URL", "")
+ASYNC_REPLICA_DATABASE_URL = env_str("ASYNC_REPLICA_DATABASE_URL", "")
+# Segundos que un cliente lee de la primaria tras una escritura (read-your-writes); 0 = desactivado
+READ_YOUR_WRITES_SECONDS = env_float("READ_YOUR_WRITES_SECONDS", 5)
+
+# Pool de conexiones (por proceso; multiplicar por el número de workers)
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)  # segundos; -1 = nunca reciclar
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = env_int("DB_STATEMENT_TIMEOUT_MS", 0)  # 0 = sin límite
+DB_ECHO = env_bool("DB_ECHO", False)
+
+# Paginación
+COUNT_CACHE_TTL = env_float("COUNT_CACHE_TTL", 10)
+
+# Caché del catálogo de productos
+PRODUCT_CACHE_ENABLED = env_bool("PRODUCT_CACHE_ENABLED", True)
+PRODUCT_CACHE_MAX_ENTRIES = env_int("PRODUCT_CACHE_MAX_ENTRIES", 1024)
+PRODUCT_CACHE_TTL = env_float("PRODUCT_CACHE_TTL", 60)
+PRODUCT_CACHE_VERSION_INTERVAL = env_float("PRODUCT_CACHE_VERSION_INTERVAL", 1)
+
+# Caché HTTP de lecturas de productos (ETag / Last-Modified)
+HTTP_CACHE_MAX_AGE = env_int("HTTP_CACHE_MAX_AGE", 0)  # 0 = revalidar siempre (no-cache)
+
+# Compresión de respuestas (gzip, o brotli si el paquete está instalado)
+COMPRESSION_ENABLED = env_bool("COMPRESSION_ENABLED", True)
+COMPRESSION_MIN_SIZE = env_int("COMPRESSION_MIN_SIZE", 1024)  # bytes
+COMPRESSION_GZIP_LEVEL = env_int("COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = env_int("COMPRESSION_BROTLI_QUALITY", 4)
+
+# Métricas e instrumentación
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+SLOW_REQUEST_MS = env_float("SLOW_REQUEST_MS", 500)
+SLOW_REQUEST_MAX_STATEMENTS = env_int("SLOW_REQUEST_MAX_STATEMENTS", 50)
+
+# Importación masiva de productos
+IMPORT_BATCH_SIZE = env_int("IMPORT_BATCH_SIZE", 500)
+EXPORT_YIELD_PER = env_int("EXPORT_YIELD_PER", 1000)
+
+# Idempotency-Key en POST /carrito
+IDEMPOTENCY_TTL = env_int("IDEMPOTENCY_TTL", 86400)  # segundos que se guarda la respuesta
+IDEMPOTENCY_PURGE_INTERVAL = env_float("IDEMPOTENCY_PURGE_INTERVAL", 300)  # segundos entre purgas de claves vencidas
+
+# Verificación del esquema al arrancar: error | warn | off
+SCHEMA_CHECK = env_str("SCHEMA_CHECK", "error")
+
+# Lecturas por lote (GET /productos/batch y /carrito/batch)
+BATCH_MAX_IDS = env_int("BATCH_MAX_IDS", 100)  # IDs por petición (un solo IN)
+
+# Control de admisión (límite de peticiones concurrentes por proceso, ver app/core/admision.py)
+ADMISSION_ENABLED = env_bool("ADMISSION_ENABLED", True)
+ADMISSION_MAX_CONCURRENT = env_int("ADMISSION_MAX_CONCURRENT", DB_POOL_SIZE + DB_MAX_OVERFLOW)
+ADMISSION_BULK_MAX_CONCURRENT = env_int("ADMISSION_BULK_MAX_CONCURRENT", 2)  # exports, reportes, importación
+ADMISSION_CART_MAX_CONCURRENT = env_int("ADMISSION_CART_MAX_CONCURRENT", 0)  # escrituras de carrito; 0 = solo el límite global
+ADMISSION_QUEUE_SIZE = env_int("ADMISSION_QUEUE_SIZE", 100)  # peticiones en espera antes de rechazar
+ADMISSION_QUEUE_TIMEOUT = env_float("ADMISSION_QUEUE_TIMEOUT", 5)  # segundos en la cola antes del 503
+ADMISSION_RETRY_AFTER = env_int("ADMISSION_RETRY_AFTER", 1)  # segundos sugeridos en Retry-After
+
+# Expiración de carritos abandonados (ver app/core/expiracion.py y expirar_carritos.py)
+CART_EXPIRY_ENABLED = env_bool("CART_EXPIRY_ENABLED", False)  # tarea en segundo plano dentro de la API
+CART_EXPIRY_HOURS = env_float("CART_EXPIRY_HOURS", 72)  # horas sin actividad para cancelar un carrito activo
+CART_EXPIRY_BATCH_SIZE = env_int("CART_EXPIRY_BATCH_SIZE", 1000)  # carritos por UPDATE/transacción
+CART_EXPIRY_PAUSE = env_float("CART_EXPIRY_PAUSE", 0.05)  # segundos entre lotes
+CART_EXPIRY_INTERVAL = env_float("CART_EXPIRY_INTERVAL", 3600)  # segundos entre pasadas
+
+# Archivo de carritos cerrados antiguos (ver app/core/archivo.py y archivar_carritos.py)
+ARCHIVE_AFTER_DAYS = env_float("ARCHIVE_AFTER_DAYS", 180)  # días desde la última actividad
+ARCHIVE_BATCH_SIZE = env_int("ARCHIVE_BATCH_SIZE", 500)  # carritos por transacción
+ARCHIVE_PAUSE = env_float("ARCHIVE_PAUSE", 0.05)  # segundos entre lotes
+
+# Feed SSE de cambios de stock y precio (ver app/core/eventos.py)
+EVENTS_ENABLED = env_bool("EVENTS_ENABLED", True)
+EVENTS_BROKER_URL = env_str("EVENTS_BROKER_URL", "")  # vacío: broker en proceso; redis://... para varios workers
+EVENTS_CHANNEL = env_str("EVENTS_CHANNEL", "tienda:productos")
+EVENTS_COALESCE_MS = env_int("EVENTS_COALESCE_MS", 200)  # ventana de agrupación de cambios
+EVENTS_CLIENT_MAX_PENDING = env_int("EVENTS_CLIENT_MAX_PENDING", 1000)  # productos pendientes antes de resincronizar
+EVENTS_MAX_CLIENTS = env_int("EVENTS_MAX_CLIENTS", 1000)  # conexiones SSE por worker
+EVENTS_HEARTBEAT = env_float("EVENTS_HEARTBEAT", 15)  # segundos entre latidos sin cambios
+EVENTS_STREAM_MAX_SECONDS = env_float("EVENTS_STREAM_MAX_SECONDS", 600)  # el cliente reconecta después
@@ -0,0 +1,331 @@
+"""
+Feed de cambios de stock y precio de productos (server-sent events)
+
+Las escrituras que cambian el stock o el precio (update_producto,
+delete_producto, importación, checkout y cancelación de carritos) solo
+anotan los ids afectados con `cambios_productos.marcar(ids)` después del
+commit. Una tarea por worker junta esas marcas durante EVENTS_COALESCE_MS,
+lee el estado actual de todos los productos marcados con un único IN contra
+la primaria y publica eventos compactos:
+
+    [{"id": 5, "stock": 7, "precio": 19.9}, {"id": 8, "eliminado": true}]
+
+Una ráfaga de cien checkouts del mismo producto se publica como un solo
+evento con el stock final. El broker reparte cada publicación a todos los
+workers:
+
+- BrokerLocal (EVENTS_BROKER_URL vacío): dentro del proceso; sirve para un
+  solo worker y para pruebas.
+- BrokerRedis (EVENTS_BROKER_URL=redis://...): pub/sub de Redis; necesita el
+  paquete opcional `redis` (>= 5).
+
+Cada cliente tiene un buffer acotado indexado por producto: si consume más
+lento de lo que llegan los eventos, el estado nuevo de un producto reemplaza
+al pendiente (el broker nunca espera al cliente y la memoria no crece) y, si
+acumula más de EVENTS_CLIENT_MAX_PENDING productos, recibe `resincronizar`
+para volver a pedir GET /productos.
+"""
+import asyncio
+import logging
+from typing import Optional
+import orjson
+from sqlalchemy import select
+from app.core.config import (
+    EVENTS_BROKER_URL,
+    EVENTS_CHANNEL,
+    EVENTS_COALESCE_MS,
+    EVENTS_CLIENT_MAX_PENDING,
+    EVENTS_MAX_CLIENTS,
+    EVENTS_HEARTBEAT,
+    EVENTS_STREAM_MAX_SECONDS
+)
+from app.models.models import Producto
+
+logger = logging.getLogger("app.eventos")
+
+# Productos por consulta al leer el estado de los marcados
+LOTE_LECTURA = 500
+# Espera sugerida al navegador antes de reconectar (campo `retry` de SSE)
+RECONEXION_MS = 3000
+
+class BrokerLocal:
+    """Difusión dentro del proceso"""
+
+    local = True
+
+    async def iniciar(self, entregar):
+        self._entregar = entregar
+
+    async def publicar(self, mensaje: dict):
+        self._entregar(mensaje)
+
+    async def cerrar(self):
+        pass
+
+class BrokerRedis:
+    """Pub/sub de Redis: cada worker publica sus cambios y recibe los de todos"""
+
+    local = False
+
+    def __init__(self, url: str, canal: str = EVENTS_CHANNEL):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "EVENTS_BROKER_URL apunta a Redis pero el paquete `redis` no está instalado (pip install redis)"
+            ) from e
+        self.cliente = redis.from_url(url)
+        self.canal = canal
+        self._tarea = None
+
+    async def iniciar(self, entregar):
+        self._pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.canal)
+        self._tarea = asyncio.create_task(self._escuchar(entregar))
+
+    async def _escuchar(self, entregar):
+        while True:
+            try:
+                async for mensaje in self._pubsub.listen():
+                    entregar(orjson.loads(mensaje["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Conexión perdida con el broker de eventos; reintentando")
+                # Los cambios publicados mientras tanto se perdieron
+                entregar({"resincronizar": True})
+                await asyncio.sleep(1)
+
+    async def publicar(self, mensaje: dict):
+        await self.cliente.publish(self.canal, orjson.dumps(mensaje))
+
+    async def cerrar(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+        await self._pubsub.aclose()
+        await self.cliente.aclose()
+
+def crear_broker(url: str = EVENTS_BROKER_URL):
+    if not url:
+        return BrokerLocal()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return BrokerRedis(url)
+    raise ValueError(f"EVENTS_BROKER_URL no soportada: {url}")
+
+class Suscripcion:
+    """Buffer de un cliente: el último estado de cada producto pendiente de enviar"""
+
+    def __init__(self, max_pendientes: int = EVENTS_CLIENT_MAX_PENDING):
+        self.max_pendientes = max_pendientes
+        self.pendientes = {}
+        self.resincronizar = False
+        self._aviso = asyncio.Event()
+
+    def recibir(self, mensaje: dict) -> int:
+        """Encolar sin bloquear; devuelve cuántos eventos pendientes se reemplazaron"""
+        reemplazados = 0
+        if mensaje.get("resincronizar"):
+            self.resincronizar = True
+        elif not self.resincronizar:
+            for evento in mensaje["eventos"]:
+                reemplazados += evento["id"] in self.pendientes
+                self.pendientes[evento["id"]] = evento
+        if len(self.pendientes) > self.max_pendientes:
+            self.resincronizar = True
+        if self.resincronizar:
+            self.pendientes.clear()
+        self._aviso.set()
+        return reemplazados
+
+    async def esperar(self, timeout: float):
+        """(eventos, resincronizar) pendientes; vacíos si pasó `timeout` sin novedades"""
+        try:
+            await asyncio.wait_for(self._aviso.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._aviso.clear()
+        eventos, self.pendientes = list(self.pendientes.values()), {}
+        resincronizar, self.resincronizar = self.resincronizar, False
+        return eventos, resincronizar
+
+class FeedCambios:
+    """Marcas de productos cambiados, publicación agrupada y clientes suscritos de este worker"""
+
+    def __init__(
+        self,
+        ventana: float = EVENTS_COALESCE_MS / 1000,
+        max_pendientes: int = EVENTS_CLIENT_MAX_PENDING,
+        max_clientes: int = EVENTS_MAX_CLIENTS
+    ):
+        self.ventana = ventana
+        self.max_pendientes = max_pendientes
+        self.max_clientes = max_clientes
+        self.broker = None
+        self.engine = None
+        self.suscripciones = set()
+        self._marcados = set()
+        self._aviso = None
+        self._tarea = None
+        self.publicaciones = 0
+        self.eventos_publicados = 0
+        self.entregados = 0
+        self.reemplazados = 0
+        self.resincronizaciones = 0
+        self.rechazados = 0
+        self.errores = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None
+
+    async def iniciar(self, engine, broker):
+        self.engine = engine
+        self.broker = broker
+        await broker.iniciar(self.entregar)
+        self._aviso = asyncio.Event()
+        self._tarea = asyncio.create_task(self._publicar_en_bucle())
+
+    async def detener(self):
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+        await self.broker.cerrar()
+
+    def marcar(self, ids):
+        """Anotar productos cuyo stock o precio cambió (llamar después del commit)"""
+        if self._tarea is None:
+            return
+        # Con el broker local nadie fuera de este worker puede estar escuchando
+        if self.broker.local and not self.suscripciones:
+            return
+        self._marcados.update(ids)
+        self._aviso.set()
+
+    def suscribir(self) -> Optional[Suscripcion]:
+        """Nueva suscripción, o None si el worker ya tiene EVENTS_MAX_CLIENTS clientes"""
+        if len(self.suscripciones) >= self.max_clientes:
+            self.rechazados += 1
+            return None
+        suscripcion = Suscripcion(self.max_pendientes)
+        self.suscripciones.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion):
+        self.suscripciones.discard(suscripcion)
+
+    def entregar(self, mensaje: dict):
+        """Repartir una publicación del broker a los clientes de este worker"""
+        for suscripcion in list(self.suscripciones):
+            ya_desincronizada = suscripcion.resincronizar
+            self.reemplazados += suscripcion.recibir(mensaje)
+            self.entregados += 1
+            if suscripcion.resincronizar and not ya_desincronizada:
+                self.resincronizaciones += 1
+
+    async def leer_estado(self, ids) -> list:
+        """Eventos con el stock y precio actuales; los ids que ya no existen salen como eliminados"""
+        ids = sorted(ids)
+        encontrados = {}
+        async with self.engine.connect() as conn:
+            for inicio in range(0, len(ids), LOTE_LECTURA):
+                result = await conn.execute(
+                    select(Producto.id, Producto.stock, Producto.precio)
+                    .where(Producto.id.in_(ids[inicio:inicio + LOTE_LECTURA]))
+                )
+                encontrados.update((fila.id, fila) for fila in result)
+        return [
+            {"id": producto_id, "stock": encontrados[producto_id].stock, "precio": encontrados[producto_id].precio}
+            if producto_id in encontrados else {"id": producto_id, "eliminado": True}
+            for producto_id in ids
+        ]
+
+    async def _publicar_en_bucle(self):
+        while True:
+            await self._aviso.wait()
+            # Ventana de agrupación: las marcas que lleguen mientras tanto salen juntas
+            await asyncio.sleep(self.ventana)
+            self._aviso.clear()
+            ids, self._marcados = self._marcados, set()
+            try:
+                if len(ids) > self.max_pendientes:
+                    # Más cambios de los que un cliente puede tener pendientes: que recargue
+                    mensaje = {"resincronizar": True}
+                else:
+                    mensaje = {"eventos": await self.leer_estado(ids)}
+                    self.eventos_publicados += len(mensaje["eventos"])
+                await self.broker.publicar(mensaje)
+                self.publicaciones += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errores += 1
+                logger.exception("Error al publicar los cambios de productos")
+
+    def estadisticas(self):
+        return {
+            "activo": self.activo,
+            "broker": "local" if self.broker is None or self.broker.local else "redis",
+            "clientes": len(self.suscripciones),
+            "pendientes_publicar": len(self._marcados),
+            "publicaciones": self.publicaciones,
+            "eventos_publicados": self.eventos_publicados,
+            "entregados": self.entregados,
+            "reemplazados": self.reemplazados,
+            "resincronizaciones": self.resincronizaciones,
+            "rechazados": self.rechazados,
+            "errores": self.errores,
+        }
+
+cambios_productos = FeedCambios()
+
+async def flujo_sse(
+    feed: FeedCambios,
+    suscripcion: Suscripcion,
+    latido: float = EVENTS_HEARTBEAT,
+    duracion: float = EVENTS_STREAM_MAX_SECONDS
+):
+    """Cuerpo text/event-stream de un cliente.
+
+    Envía un comentario cada `latido` segundos sin novedades (mantiene vivos
+    proxies y detecta desconexiones) y cierra tras `duracion` segundos para
+    que el cliente reconecte, se reparta entre workers y no retrase el apagado.
+    """
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + duracion
+    try:
+        yield f"retry: {RECONEXION_MS}\n\n".encode()
+        while (restante := fin - loop.time()) > 0:
+            eventos, resincronizar = await suscripcion.esperar(min(latido, restante))
+            if resincronizar:
+                yield b"event: resincronizar\ndata: {}\n\n"
+            elif eventos:
+                yield b"event: productos\ndata: " + orjson.dumps(eventos) + b"\n\n"
+            else:
+                yield b": ping\n\n"
+    finally:
+        feed.desuscribir(suscripcion)
+
+def colector_eventos(obtener_estadisticas):
+    """Colector de métricas del feed de eventos"""
+
+    def colector():
+        estadisticas = obtener_estadisticas()
+        return [
+            ("events_clients", "gauge", "Clientes conectados al feed de eventos", [({}, estadisticas["clientes"])]),
+            ("events_published_total", "counter", "Eventos de producto publicados por este worker",
+             [({}, estadisticas["eventos_publicados"])]),
+            ("events_coalesced_total", "counter", "Eventos pendientes reemplazados por uno más nuevo",
+             [({}, estadisticas["reemplazados"])]),
+            ("events_resyncs_total", "counter", "Clientes enviados a resincronizar",
+             [({}, estadisticas["resincronizaciones"])]),
+            ("events_rejected_total", "counter", "Conexiones rechazadas por EVENTS_MAX_CLIENTS",
+             [({}, estadisticas["rechazados"])]),
+            ("events_errors_total", "counter", "Publicaciones con error", [({}, estadisticas["errores"])]),
+        ]
+
+    return colector
@@ -0,0 +1,154 @@
+"""
+Expiración de carritos abandonados
+
+Los carritos `activo` sin actividad (fecha_actualizacion, o fecha_creacion si
+nunca se modificaron) desde hace más de CART_EXPIRY_HOURS pasan a `cancelado`.
+Se procesan por lotes de CART_EXPIRY_BATCH_SIZE, avanzando por id (cursor,
+sin volver a recorrer lo ya examinado), cada lote en su propia transacción
+(bloqueos cortos) y con una pausa entre lotes:
+
+    SELECT id FROM carritos WHERE estado = 'activo' AND <inactivo> AND id > :ultimo
+    ORDER BY id LIMIT :lote
+    UPDATE carritos SET estado = 'cancelado' WHERE id IN (...) AND estado = 'activo' AND <inactivo>
+
+La condición se repite en el UPDATE, así que un carrito que el usuario
+modifica entre ambas sentencias no se cancela. Los carritos activos no tienen
+stock reservado (se reserva al completar), por lo que no hay nada que liberar.
+
+Se ejecuta con `python expirar_carritos.py` o dentro de la API con
+CART_EXPIRY_ENABLED=true (cada CART_EXPIRY_INTERVAL segundos).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, func
+from app.core.config import (
+    CART_EXPIRY_HOURS,
+    CART_EXPIRY_BATCH_SIZE,
+    CART_EXPIRY_PAUSE,
+    CART_EXPIRY_INTERVAL
+)
+from app.models.models import Carrito
+
+logger = logging.getLogger("app.expiracion")
+
+ESTADO_ACTIVO = "activo"
+ESTADO_CANCELADO = "cancelado"
+
+def limite_inactividad(horas: float = CART_EXPIRY_HOURS) -> datetime:
+    """Instante antes del cual un carrito activo se considera abandonado (UTC, como CURRENT_TIMESTAMP)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=horas)
+
+def abandonados(limite: datetime):
+    return (
+        Carrito.estado == ESTADO_ACTIVO,
+        func.coalesce(Carrito.fecha_actualizacion, Carrito.fecha_creacion) < limite
+    )
+
+def contar_abandonados(conn, limite: datetime) -> int:
+    return conn.scalar(select(func.count(Carrito.id)).where(*abandonados(limite)))
+
+def expirar_lote(conn, limite: datetime, despues_de: int = 0, tamano: int = CART_EXPIRY_BATCH_SIZE):
+    """Cancelar el siguiente lote de carritos abandonados con id > `despues_de`.
+
+    Devuelve (filas cambiadas, último id examinado o None si no quedan).
+    """
+    ids = conn.scalars(
+        select(Carrito.id)
+        .where(*abandonados(limite), Carrito.id > despues_de)
+        .order_by(Carrito.id)
+        .limit(tamano)
+    ).all()
+    if not ids:
+        return 0, None
+    result = conn.execute(
+        update(Carrito)
+        .where(Carrito.id.in_(ids), *abandonados(limite))
+        .values(estado=ESTADO_CANCELADO)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount, ids[-1]
+
+class ResultadoExpiracion:
+    """Filas, lotes y duración de una pasada"""
+
+    def __init__(self):
+        self.filas = 0
+        self.lotes = 0
+        self.inicio = time.perf_counter()
+        self.segundos = 0.0
+
+    def registrar(self, filas: int):
+        self.filas += filas
+        self.lotes += 1
+        self.segundos = time.perf_counter() - self.inicio
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.filas} carritos cancelados en {self.lotes} lotes, "
+            f"{self.segundos:.2f}s ({self.filas_por_segundo:,.0f} filas/s)"
+        )
+
+def expirar_carritos(engine, horas: float = CART_EXPIRY_HOURS, tamano: int = CART_EXPIRY_BATCH_SIZE,
+                     pausa: float = CART_EXPIRY_PAUSE, al_terminar_lote=None) -> ResultadoExpiracion:
+    """Pasada completa con el engine síncrono (CLI)"""
+    limite = limite_inactividad(horas)
+    resultado = ResultadoExpiracion()
+    ultimo = 0
+    while True:
+        with engine.begin() as conn:
+            filas, ultimo = expirar_lote(conn, limite, ultimo, tamano)
+        if ultimo is None:
+            return resultado
+        resultado.registrar(filas)
+        if al_terminar_lote is not None:
+            al_terminar_lote(resultado)
+        time.sleep(pausa)
+
+async def expirar_carritos_async(engine, horas: float = CART_EXPIRY_HOURS, tamano: int = CART_EXPIRY_BATCH_SIZE,
+                                 pausa: float = CART_EXPIRY_PAUSE) -> ResultadoExpiracion:
+    """Pasada completa con el engine asíncrono de la API, cediendo el event loop entre lotes"""
+    limite = limite_inactividad(horas)
+    resultado = ResultadoExpiracion()
+    ultimo = 0
+    while True:
+        async with engine.begin() as conn:
+            filas, ultimo = await conn.run_sync(expirar_lote, limite, ultimo, tamano)
+        if ultimo is None:
+            return resultado
+        resultado.registrar(filas)
+        await asyncio.sleep(pausa)
+
+# Totales de la tarea en segundo plano (para /metrics)
+estadisticas = {"pasadas": 0, "cancelados": 0, "ultima_filas_por_segundo": 0.0, "errores": 0}
+
+async def tarea_expiracion(engine, intervalo: float = CART_EXPIRY_INTERVAL):
+    """Bucle en segundo plano de la API; se cancela al apagar el servidor"""
+    while True:
+        try:
+            resultado = await expirar_carritos_async(engine)
+            estadisticas["pasadas"] += 1
+            estadisticas["cancelados"] += resultado.filas
+            if resultado.filas:
+                estadisticas["ultima_filas_por_segundo"] = round(resultado.filas_por_segundo, 1)
+                logger.info("Expiración de carritos: %s", resultado)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            estadisticas["errores"] += 1
+            logger.exception("Error en la expiración de carritos")
+        await asyncio.sleep(intervalo)
+
+def colector_expiracion():
+    return [
+        ("cart_expiry_runs_total", "counter", "Pasadas de expiración de carritos", [({}, estadisticas["pasadas"])]),
+        ("cart_expiry_cancelled_total", "counter", "Carritos abandonados cancelados", [({}, estadisticas["cancelados"])]),
+        ("cart_expiry_errors_total", "counter", "Pasadas de expiración con error", [({}, estadisticas["errores"])]),
+        ("cart_expiry_last_rows_per_second", "gauge", "Filas por segundo de la última pasada con cancelaciones",
+         [({}, estadisticas["ultima_filas_por_segundo"])]),
+    ]
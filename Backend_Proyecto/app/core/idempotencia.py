@@ -0,0 +1,95 @@
+"""
+Peticiones idempotentes con la cabecera Idempotency-Key
+
+La respuesta exitosa de la primera ejecución se guarda en la tabla
+`idempotencia_claves` dentro de la misma transacción que la escritura, así
+que un reintento (en cualquier worker) devuelve esa respuesta sin repetir el
+trabajo. Los duplicados concurrentes del mismo worker esperan a la primera
+ejecución con un candado por clave; entre workers la clave primaria de la
+tabla garantiza que solo una transacción se confirma.
+"""
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import insert, delete
+from app.core.config import IDEMPOTENCY_TTL, IDEMPOTENCY_PURGE_INTERVAL
+from app.models.models import ClaveIdempotencia
+
+def ahora_utc() -> datetime:
+    # Fechas sin zona en UTC: se comparan igual en todos los motores
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def huella_peticion(datos) -> str:
+    """Huella del cuerpo de la petición (modelo de pydantic)"""
+    return hashlib.sha256(datos.model_dump_json().encode("utf-8")).hexdigest()
+
+class AlmacenIdempotencia:
+    """Respuestas guardadas por clave con expiración"""
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL, intervalo_purga: float = IDEMPOTENCY_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.intervalo_purga = intervalo_purga
+        self._candados = {}  # clave -> [asyncio.Lock, peticiones esperando]
+        self._proxima_purga = 0.0
+        self.repeticiones = 0
+
+    @asynccontextmanager
+    async def exclusiva(self, clave: str):
+        """Serializar las peticiones con la misma clave dentro del proceso"""
+        candado = self._candados.get(clave)
+        if candado is None:
+            candado = self._candados[clave] = [asyncio.Lock(), 0]
+        candado[1] += 1
+        try:
+            async with candado[0]:
+                yield
+        finally:
+            candado[1] -= 1
+            if candado[1] == 0:
+                del self._candados[clave]
+
+    async def buscar(self, db, clave: str, huella: str) -> Optional[Response]:
+        """Respuesta guardada para la clave, o None si no existe o ya expiró"""
+        guardada = await db.get(ClaveIdempotencia, clave)
+        if guardada is None:
+            return None
+        if guardada.expira <= ahora_utc():
+            # Liberar la clave vencida para que pueda volver a usarse
+            await db.delete(guardada)
+            await db.flush()
+            return None
+        if guardada.huella != huella:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="La Idempotency-Key ya se usó con un contenido distinto"
+            )
+
+        self.repeticiones += 1
+        return Response(
+            content=guardada.respuesta,
+            status_code=guardada.estado_http,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    async def guardar(self, db, clave: str, huella: str, estado_http: int, cuerpo: str):
+        """Guardar la respuesta (llamar dentro de la transacción de escritura)"""
+        ahora = ahora_utc()
+        await db.execute(insert(ClaveIdempotencia).values(
+            clave=clave,
+            huella=huella,
+            estado_http=estado_http,
+            respuesta=cuerpo,
+            expira=ahora + timedelta(seconds=self.ttl)
+        ))
+
+        # Purga perezosa de claves vencidas, como máximo una vez por intervalo
+        if time.monotonic() >= self._proxima_purga:
+            self._proxima_purga = time.monotonic() + self.intervalo_purga
+            await db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.expira <= ahora))
+
+idempotencia = AlmacenIdempotencia()
@@ -0,0 +1,74 @@
+"""
+Lectura incremental de archivos NDJSON y CSV recibidos por streaming
+
+Los cuerpos se procesan a medida que llegan los fragmentos, sin cargar el
+archivo completo en memoria; cada registro se entrega junto con su número
+de línea para poder reportar errores por fila.
+"""
+import csv
+import io
+import json
+
+async def lineas(fragmentos):
+    """Convertir un flujo de bytes en líneas de texto completas (UTF-8)"""
+    pendiente = ""
+    async for fragmento in fragmentos:
+        pendiente += fragmento.decode("utf-8") if isinstance(fragmento, bytes) else fragmento
+        *completas, pendiente = pendiente.split("\n")
+        for linea in completas:
+            yield linea.rstrip("\r")
+    if pendiente:
+        yield pendiente.rstrip("\r")
+
+async def registros_ndjson(fragmentos):
+    """Producir (numero_linea, dict | Exception) por cada línea NDJSON no vacía"""
+    numero = 0
+    async for linea in lineas(fragmentos):
+        numero += 1
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+            if not isinstance(registro, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            yield numero, registro
+        except ValueError as e:
+            yield numero, e
+
+async def registros_csv(fragmentos):
+    """Producir (numero_linea, dict) por cada fila CSV usando la primera como encabezado.
+
+    Un campo entre comillas puede contener saltos de línea: se acumulan líneas
+    hasta que el número de comillas es par antes de interpretar la fila.
+    """
+    encabezado = None
+    acumulado = ""
+    inicio = 0
+    numero = 0
+    async for linea in lineas(fragmentos):
+        numero += 1
+        if not acumulado:
+            inicio = numero
+        acumulado = f"{acumulado}\n{linea}" if acumulado else linea
+        if acumulado.count('"') % 2:
+            continue
+        texto, acumulado = acumulado, ""
+        if not texto.strip():
+            continue
+        valores = next(csv.reader(io.StringIO(texto)))
+        if encabezado is None:
+            encabezado = [columna.strip() for columna in valores]
+            continue
+        # Las celdas vacías equivalen a valores nulos
+        yield inicio, {
+            columna: (valor if valor != "" else None)
+            for columna, valor in zip(encabezado, valores)
+        }
+    if acumulado:
+        yield inicio, ValueError("comillas sin cerrar al final del archivo")
+
+def fila_csv(valores, columnas):
+    """Serializar una fila CSV como texto"""
+    salida = io.StringIO()
+    csv.writer(salida, lineterminator="\n").writerow([valores.get(columna) for columna in columnas])
+    return salida.getvalue()
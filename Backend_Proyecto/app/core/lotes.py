@@ -0,0 +1,38 @@
+"""
+Parámetro `ids` de las lecturas por lote (GET /productos/batch, /carrito/batch)
+"""
+from typing import List
+from fastapi import HTTPException, Query, status
+from app.core.config import BATCH_MAX_IDS
+
+def ids_lote(
+    ids: str = Query(..., description=f"IDs separados por comas (máximo {BATCH_MAX_IDS})")
+) -> List[int]:
+    """IDs pedidos, sin repetidos y en el orden de la petición"""
+    try:
+        valores = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids debe ser una lista de enteros separados por comas"
+        )
+
+    unicos = list(dict.fromkeys(valores))
+    if not unicos:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Indique al menos un ID"
+        )
+    if len(unicos) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Se admiten como máximo {BATCH_MAX_IDS} IDs por petición"
+        )
+    return unicos
+
+def en_orden(ids: List[int], encontrados: dict):
+    """(elementos en el orden pedido, IDs que no existen)"""
+    return (
+        [encontrados[id_] for id_ in ids if id_ in encontrados],
+        [id_ for id_ in ids if id_ not in encontrados]
+    )
@@ -0,0 +1,236 @@
+"""
+Métricas de rendimiento por petición en formato Prometheus
+
+- Un middleware ASGI mide la latencia de cada petición por ruta.
+- Eventos de SQLAlchemy cuentan sentencias y tiempo de SQL de la petición
+  en curso (a través de un ContextVar), para separar SQL de serialización.
+- Las peticiones más lentas que SLOW_REQUEST_MS se registran en el log con
+  las sentencias que emitieron.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.core.config import SLOW_REQUEST_MS, SLOW_REQUEST_MAX_STATEMENTS
+
+logger = logging.getLogger("app.lento")
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SENTENCIAS = (1, 2, 5, 10, 25, 50, 100)
+
+class RegistroPeticion:
+    """Sentencias SQL emitidas durante una petición"""
+
+    __slots__ = ("sentencias", "segundos_sql", "detalle")
+
+    def __init__(self):
+        self.sentencias = 0
+        self.segundos_sql = 0.0
+        self.detalle = []
+
+peticion_actual: ContextVar = ContextVar("peticion_actual", default=None)
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+
+class RegistroMetricas:
+    """Almacén en memoria de contadores e histogramas por etiquetas"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.peticiones = {}          # (metodo, ruta, estado) -> total
+        self.latencia = {}            # (metodo, ruta) -> Histograma
+        self.sql_sentencias = {}      # (metodo, ruta) -> Histograma
+        self.sql_segundos = {}        # (metodo, ruta) -> Histograma
+        self.peticiones_lentas = 0
+        self.colectores = []          # funciones que devuelven líneas extra
+
+    def registrar(self, metodo, ruta, estado, segundos, registro: RegistroPeticion):
+        clave = (metodo, ruta)
+        with self._candado:
+            self.peticiones[(metodo, ruta, estado)] = self.peticiones.get((metodo, ruta, estado), 0) + 1
+            self.latencia.setdefault(clave, Histograma(BUCKETS_SEGUNDOS)).observar(segundos)
+            self.sql_sentencias.setdefault(clave, Histograma(BUCKETS_SENTENCIAS)).observar(registro.sentencias)
+            self.sql_segundos.setdefault(clave, Histograma(BUCKETS_SEGUNDOS)).observar(registro.segundos_sql)
+
+    def agregar_colector(self, colector):
+        """Registrar una función que devuelve [(nombre, tipo, ayuda, [(etiquetas, valor)])]"""
+        self.colectores.append(colector)
+
+    def exportar(self) -> str:
+        """Texto en formato de exposición de Prometheus"""
+        lineas = []
+        with self._candado:
+            lineas += encabezado("http_requests_total", "counter", "Peticiones HTTP atendidas")
+            for (metodo, ruta, estado), total in sorted(self.peticiones.items()):
+                lineas.append(f"http_requests_total{etiquetas(method=metodo, route=ruta, status=estado)} {total}")
+            exportar_histogramas(lineas, "http_request_duration_seconds", "Latencia de las peticiones HTTP", self.latencia)
+            exportar_histogramas(lineas, "http_request_sql_statements", "Sentencias SQL por petición", self.sql_sentencias)
+            exportar_histogramas(lineas, "http_request_sql_duration_seconds", "Tiempo de SQL por petición", self.sql_segundos)
+            lineas += encabezado("http_slow_requests_total", "counter", f"Peticiones más lentas que {SLOW_REQUEST_MS} ms")
+            lineas.append(f"http_slow_requests_total {self.peticiones_lentas}")
+        for colector in self.colectores:
+            for nombre, tipo, ayuda, muestras in colector():
+                lineas += encabezado(nombre, tipo, ayuda)
+                for etiquetas_muestra, valor in muestras:
+                    lineas.append(f"{nombre}{etiquetas(**etiquetas_muestra)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+def encabezado(nombre, tipo, ayuda):
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+
+def etiquetas(**valores) -> str:
+    if not valores:
+        return ""
+    partes = []
+    for clave, valor in valores.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{clave}="{texto}"')
+    return "{" + ",".join(partes) + "}"
+
+def exportar_histogramas(lineas, nombre, ayuda, histogramas):
+    lineas += encabezado(nombre, "histogram", ayuda)
+    for (metodo, ruta), histograma in sorted(histogramas.items()):
+        for limite, conteo in zip(histograma.buckets, histograma.conteos):
+            lineas.append(f"{nombre}_bucket{etiquetas(method=metodo, route=ruta, le=limite)} {conteo}")
+        lineas.append(f"{nombre}_bucket{etiquetas(method=metodo, route=ruta, le='+Inf')} {histograma.total}")
+        lineas.append(f"{nombre}_sum{etiquetas(method=metodo, route=ruta)} {histograma.suma}")
+        lineas.append(f"{nombre}_count{etiquetas(method=metodo, route=ruta)} {histograma.total}")
+
+metricas = RegistroMetricas()
+
+def instrumentar_engine(engine):
+    """Contar sentencias y tiempo de SQL de la petición en curso"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_sentencia", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["inicio_sentencia"].pop()
+        registro = peticion_actual.get()
+        if registro is None:
+            return
+        segundos = time.perf_counter() - inicio
+        registro.sentencias += 1
+        registro.segundos_sql += segundos
+        if len(registro.detalle) < SLOW_REQUEST_MAX_STATEMENTS:
+            registro.detalle.append((segundos, statement))
+
+class MetricasMiddleware:
+    """Middleware ASGI que mide latencia y SQL por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+        self._rutas = {}
+
+    def plantilla_ruta(self, scope):
+        """Ruta declarada (p. ej. /productos/{producto_id}) para no disparar la cardinalidad"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "sin_ruta"
+        if endpoint not in self._rutas:
+            self._rutas[endpoint] = next(
+                (ruta.path for ruta in scope["app"].routes if getattr(ruta, "endpoint", None) is endpoint),
+                "sin_ruta"
+            )
+        return self._rutas[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registro = RegistroPeticion()
+        token = peticion_actual.set(registro)
+        estado = {"codigo": 500, "flujo": False}
+        inicio = time.perf_counter()
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                # Los flujos SSE duran lo que dure la conexión: no son peticiones lentas
+                estado["flujo"] = any(
+                    nombre == b"content-type" and valor.startswith(b"text/event-stream")
+                    for nombre, valor in mensaje.get("headers", ())
+                )
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            segundos = time.perf_counter() - inicio
+            peticion_actual.reset(token)
+            ruta = self.plantilla_ruta(scope)
+            metricas.registrar(scope["method"], ruta, estado["codigo"], segundos, registro)
+            if segundos * 1000 >= SLOW_REQUEST_MS and not estado["flujo"]:
+                registrar_peticion_lenta(scope, ruta, estado["codigo"], segundos, registro)
+
+def registrar_peticion_lenta(scope, ruta, codigo, segundos, registro: RegistroPeticion):
+    metricas.peticiones_lentas += 1
+    sentencias = "\n".join(
+        f"  [{duracion * 1000:.1f} ms] {' '.join(sentencia.split())}"
+        for duracion, sentencia in registro.detalle
+    )
+    logger.warning(
+        "Petición lenta %s %s (%s) -> %s en %.1f ms; SQL: %d sentencias, %.1f ms\n%s",
+        scope["method"], scope["path"], ruta, codigo, segundos * 1000,
+        registro.sentencias, registro.segundos_sql * 1000, sentencias
+    )
+
+def colector_pool(obtener_estadisticas):
+    """Colector de métricas del pool a partir de pool_stats()"""
+    campos = (
+        ("db_pool_size", "gauge", "Tamaño configurado del pool", "tamano"),
+        ("db_pool_checked_out", "gauge", "Conexiones en uso", "en_uso"),
+        ("db_pool_checked_in", "gauge", "Conexiones libres en el pool", "libres"),
+        ("db_pool_overflow", "gauge", "Conexiones de overflow abiertas", "overflow"),
+        ("db_pool_checkouts_total", "counter", "Checkouts de conexión", "checkouts"),
+        ("db_pool_checkout_wait_seconds_total", "counter", "Tiempo total esperando una conexión", "espera_total_s"),
+        ("db_pool_checkout_timeouts_total", "counter", "Checkouts que agotaron DB_POOL_TIMEOUT", "timeouts"),
+    )
+
+    def colector():
+        estadisticas = obtener_estadisticas()
+        return [
+            (nombre, tipo, ayuda, [
+                ({"engine": engine}, datos[campo])
+                for engine, datos in estadisticas.items() if campo in datos
+            ])
+            for nombre, tipo, ayuda, campo in campos
+        ]
+
+    return colector
+
+def colector_cache(nombre_cache, obtener_estadisticas):
+    """Colector de métricas de una caché con aciertos/fallos/desalojos"""
+    campos = (
+        ("cache_hits_total", "counter", "Aciertos de caché", "aciertos"),
+        ("cache_misses_total", "counter", "Fallos de caché", "fallos"),
+        ("cache_evictions_total", "counter", "Entradas desalojadas por LRU", "desalojos"),
+        ("cache_invalidations_total", "counter", "Invalidaciones de caché", "invalidaciones"),
+        ("cache_entries", "gauge", "Entradas en caché", "entradas"),
+    )
+
+    def colector():
+        estadisticas = obtener_estadisticas()
+        return [
+            (nombre, tipo, ayuda, [({"cache": nombre_cache}, estadisticas[campo])])
+            for nombre, tipo, ayuda, campo in campos
+        ]
+
+    return colector
@@ -0,0 +1,55 @@
+"""
+Utilidades de paginación: modo cursor (keyset) y conteo total cacheado
+"""
+import time
+from sqlalchemy import select, func
+from app.core.config import COUNT_CACHE_TTL
+
+def paginar(query, columna_id, skip: int, limit: int, after_id=None, orden=()):
+    """Aplicar paginación por cursor (after_id) o por desplazamiento (skip).
+
+    `orden` son columnas de ordenamiento previas al id (que siempre desempata);
+    el modo cursor solo es válido cuando se ordena únicamente por id.
+    """
+    query = query.order_by(*orden, columna_id)
+    if after_id is not None:
+        # Keyset: el índice de la clave primaria salta directo a la página
+        return query.where(columna_id > after_id).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def siguiente_cursor(filas, limit: int):
+    """Cursor para la siguiente página, o None si ya no hay más filas"""
+    if limit > 0 and len(filas) == limit:
+        return filas[-1].id
+    return None
+
+class ContadorTotal:
+    """Conteo total de una tabla con caché por TTL dentro del proceso"""
+
+    def __init__(self, modelo, ttl: float = COUNT_CACHE_TTL):
+        self.modelo = modelo
+        self.ttl = ttl
+        self._valor = None
+        self._expira = 0.0
+
+    async def obtener(self, db, filtros=()):
+        """Devolver el total, consultando la base solo si la caché expiró.
+
+        Con filtros el conteo se calcula siempre (no se cachea).
+        """
+        if filtros:
+            return await db.scalar(
+                select(func.count()).select_from(self.modelo).where(*filtros)
+            )
+        ahora = time.monotonic()
+        if self._valor is not None and ahora < self._expira:
+            return self._valor
+        valor = await db.scalar(select(func.count()).select_from(self.modelo))
+        if self.ttl > 0:
+            self._valor = valor
+            self._expira = ahora + self.ttl
+        return valor
+
+    def invalidar(self):
+        """Descartar el total cacheado (llamar tras altas o bajas)"""
+        self._valor = None
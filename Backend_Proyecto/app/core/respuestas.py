@@ -0,0 +1,18 @@
+"""
+Respuesta JSON serializada con orjson
+
+Es la `default_response_class` de la aplicación. Los endpoints con listados
+grandes pueden devolverla directamente con un modelo de pydantic: en ese caso
+se serializa a bytes con el serializador de pydantic, sin la validación y el
+volcado a diccionarios que FastAPI hace con `response_model`.
+"""
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,62 @@
+"""
+Reserva y liberación de stock con UPDATE condicionales
+
+Toda la reserva de un carrito se hace en una sola sentencia:
+
+    UPDATE productos SET stock = stock - CASE id WHEN ... END
+    WHERE id IN (...) AND stock >= CASE id WHEN ... END
+
+Si alguna fila no cumple la condición el número de filas afectadas no
+coincide y la transacción se revierte, sin bloquear la tabla completa ni
+leer el stock antes de escribirlo.
+"""
+from sqlalchemy import select, update, case, func
+from app.models.models import CarritoItem, Producto
+
+async def cantidades_carrito(db, carrito_id: int):
+    """Cantidad total por producto de un carrito ({producto_id: cantidad})"""
+    result = await db.execute(
+        select(CarritoItem.producto_id, func.sum(CarritoItem.cantidad))
+        .where(CarritoItem.carrito_id == carrito_id)
+        .group_by(CarritoItem.producto_id)
+    )
+    return {producto_id: int(cantidad) for producto_id, cantidad in result.all()}
+
+async def reservar_stock(db, cantidades: dict) -> bool:
+    """Descontar stock de todos los productos solo si alcanza para cada uno.
+
+    Devuelve False (sin descontar nada de forma efectiva) si algún producto
+    no tiene stock suficiente; el llamador debe revertir la transacción.
+    """
+    if not cantidades:
+        return True
+    delta = case(cantidades, value=Producto.id)
+    result = await db.execute(
+        update(Producto)
+        .where(Producto.id.in_(list(cantidades)), Producto.stock >= delta)
+        .values(stock=Producto.stock - delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(cantidades)
+
+async def liberar_stock(db, cantidades: dict):
+    """Devolver al stock las cantidades reservadas"""
+    if not cantidades:
+        return
+    delta = case(cantidades, value=Producto.id)
+    await db.execute(
+        update(Producto)
+        .where(Producto.id.in_(list(cantidades)))
+        .values(stock=Producto.stock + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+async def producto_sin_stock(db, cantidades: dict):
+    """Primer producto (en orden de id) cuyo stock no alcanza la cantidad pedida"""
+    result = await db.execute(
+        select(Producto).where(Producto.id.in_(list(cantidades))).order_by(Producto.id)
+    )
+    for producto in result.scalars():
+        if producto.stock < cantidades[producto.id]:
+            return producto
+    return None
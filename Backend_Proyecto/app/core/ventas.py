@@ -0,0 +1,203 @@
+"""
+Rollup de ventas por día y producto (tabla `ventas_diarias`)
+
+Los reportes leen filas ya agregadas en lugar de recorrer `carrito_items`.
+El rollup se mantiene de forma incremental en la misma transacción que la
+escritura del carrito:
+
+- checkout (activo -> completado): suma las ventas del carrito
+- cancelar o eliminar un carrito completado: las resta
+
+El día de una venta es la fecha en que el carrito se completó (su
+`fecha_actualizacion`, que ya no cambia mientras siga completado), igual que
+en la reconstrucción desde el historial (`python recalcular_ventas.py`), que
+también incluye los carritos archivados.
+"""
+from datetime import date, datetime, time
+from typing import Optional
+from sqlalchemy import select, insert, update, delete, case, func, union_all, text, Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from app.models.models import Carrito, CarritoItem, CarritoArchivado, CarritoItemArchivado, Producto, VentaDiaria
+
+ESTADO_COMPLETADO = "completado"
+
+class dia_de(FunctionElement):
+    """Fecha (sin hora) de una columna DateTime en cada motor"""
+    type = Date()
+    name = "dia_de"
+    inherit_cache = True
+
+@compiles(dia_de)
+def _dia_de(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+@compiles(dia_de, "sqlite")
+def _dia_de_sqlite(element, compiler, **kw):
+    # En SQLite CAST(... AS DATE) se queda con el año; date() devuelve 'YYYY-MM-DD'
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+def fecha_venta(carritos=Carrito):
+    return func.coalesce(carritos.fecha_actualizacion, carritos.fecha_creacion)
+
+def consulta_ventas(*condiciones):
+    """Ventas agrupadas por día y producto a partir de los items de los carritos"""
+    dia = dia_de(fecha_venta())
+    return (
+        select(
+            dia.label("dia"),
+            CarritoItem.producto_id,
+            Producto.categoria,
+            func.sum(CarritoItem.cantidad).label("unidades"),
+            func.sum(CarritoItem.subtotal).label("ingresos")
+        )
+        .select_from(CarritoItem)
+        .join(Carrito, Carrito.id == CarritoItem.carrito_id)
+        .join(Producto, Producto.id == CarritoItem.producto_id)
+        .where(*condiciones)
+        .group_by(dia, CarritoItem.producto_id, Producto.categoria)
+    )
+
+async def ventas_carrito(db, carrito_id: int):
+    """Filas del rollup que aporta un carrito (leer antes de cambiar su estado)"""
+    result = await db.execute(consulta_ventas(Carrito.id == carrito_id))
+    return result.all()
+
+def insertar_faltantes(dialecto: str, filas):
+    """INSERT de filas en cero que ignora las que ya existen (SQLite y PostgreSQL)"""
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    return insert_dialecto(VentaDiaria).values(filas).on_conflict_do_nothing()
+
+def merge_faltantes(filas):
+    """MERGE que crea en cero las filas que faltan (SQL Server).
+
+    HOLDLOCK bloquea el rango de claves hasta el commit: dos checkouts que
+    registran a la vez la primera venta del día de un producto no pueden
+    insertar ambos la misma fila.
+    """
+    valores = ", ".join(f"(:dia_{i}, :producto_id_{i}, :categoria_{i})" for i in range(len(filas)))
+    parametros = {
+        f"{campo}_{i}": fila[campo]
+        for i, fila in enumerate(filas)
+        for campo in ("dia", "producto_id", "categoria")
+    }
+    return text(
+        f"MERGE {VentaDiaria.__tablename__} WITH (HOLDLOCK) AS destino "
+        f"USING (VALUES {valores}) AS origen (dia, producto_id, categoria) "
+        "ON destino.dia = origen.dia AND destino.producto_id = origen.producto_id "
+        "WHEN NOT MATCHED THEN INSERT (dia, producto_id, categoria, unidades, ingresos) "
+        "VALUES (origen.dia, origen.producto_id, origen.categoria, 0, 0);"
+    ).bindparams(**parametros)
+
+async def acumular_ventas(db, ventas, signo: int = 1):
+    """Sumar (signo=1) o restar (signo=-1) las ventas de un carrito al rollup.
+
+    Primero se aseguran las filas (día, producto) con un upsert atómico de cada
+    motor y luego se ajustan todas con un único UPDATE con CASE, como la
+    reserva de stock.
+    """
+    if not ventas:
+        return
+    dia = ventas[0].dia  # un carrito se vende en un solo día
+    producto_ids = [venta.producto_id for venta in ventas]
+    # En orden de producto: las transacciones concurrentes bloquean las claves en el mismo orden
+    nuevas = [
+        {"dia": dia, "producto_id": venta.producto_id, "categoria": venta.categoria, "unidades": 0, "ingresos": 0.0}
+        for venta in sorted(ventas, key=lambda venta: venta.producto_id)
+    ]
+
+    dialecto = db.get_bind().dialect.name
+    if dialecto in ("sqlite", "postgresql"):
+        await db.execute(insertar_faltantes(dialecto, nuevas))
+    elif dialecto == "mssql":
+        await db.execute(merge_faltantes(nuevas))
+    else:
+        existentes = set(await db.scalars(
+            select(VentaDiaria.producto_id)
+            .where(VentaDiaria.dia == dia, VentaDiaria.producto_id.in_(producto_ids))
+        ))
+        faltantes = [fila for fila in nuevas if fila["producto_id"] not in existentes]
+        if faltantes:
+            await db.execute(insert(VentaDiaria), faltantes)
+
+    unidades = case({venta.producto_id: signo * int(venta.unidades) for venta in ventas}, value=VentaDiaria.producto_id)
+    ingresos = case({venta.producto_id: signo * float(venta.ingresos) for venta in ventas}, value=VentaDiaria.producto_id)
+    await db.execute(
+        update(VentaDiaria)
+        .where(VentaDiaria.dia == dia, VentaDiaria.producto_id.in_(producto_ids))
+        .values(unidades=VentaDiaria.unidades + unidades, ingresos=VentaDiaria.ingresos + ingresos)
+        .execution_options(synchronize_session=False)
+    )
+    if signo < 0:
+        # Sin ventas restantes la fila desaparece, igual que en la reconstrucción
+        await db.execute(
+            delete(VentaDiaria)
+            .where(VentaDiaria.dia == dia, VentaDiaria.producto_id.in_(producto_ids), VentaDiaria.unidades <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+def items_vendidos(carritos, items, desde: Optional[date], hasta: Optional[date]):
+    """Items (sin agrupar) de los carritos completados con su día de venta y categoría"""
+    query = (
+        select(
+            dia_de(fecha_venta(carritos)).label("dia"),
+            items.producto_id,
+            Producto.categoria,
+            items.cantidad,
+            items.subtotal
+        )
+        .select_from(items)
+        .join(carritos, carritos.id == items.carrito_id)
+        .join(Producto, Producto.id == items.producto_id)
+        .where(carritos.estado == ESTADO_COMPLETADO)
+    )
+    if desde is not None:
+        query = query.where(fecha_venta(carritos) >= datetime.combine(desde, time()))
+    if hasta is not None:
+        query = query.where(fecha_venta(carritos) < datetime.combine(hasta, time()))
+    return query
+
+def recalcular_ventas(conn, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+    """Reconstruir el rollup desde el historial de carritos completados (activos y archivados).
+
+    `desde`/`hasta` limitan los días recalculados (`hasta` exclusivo); sin
+    ellos se reconstruye todo. Se ejecuta como DELETE + INSERT ... SELECT en
+    la transacción de `conn` y devuelve el número de filas del rollup.
+    """
+    borrar = delete(VentaDiaria)
+    if desde is not None:
+        borrar = borrar.where(VentaDiaria.dia >= desde)
+    if hasta is not None:
+        borrar = borrar.where(VentaDiaria.dia < hasta)
+
+    # Un mismo día puede tener carritos en ambas tablas: se agrupa sobre la unión
+    vendidos = union_all(
+        items_vendidos(Carrito, CarritoItem, desde, hasta),
+        items_vendidos(CarritoArchivado, CarritoItemArchivado, desde, hasta)
+    ).subquery()
+    conn.execute(borrar)
+    result = conn.execute(
+        insert(VentaDiaria).from_select(
+            ["dia", "producto_id", "categoria", "unidades", "ingresos"],
+            select(
+                vendidos.c.dia,
+                vendidos.c.producto_id,
+                vendidos.c.categoria,
+                func.sum(vendidos.c.cantidad),
+                func.sum(vendidos.c.subtotal)
+            ).group_by(vendidos.c.dia, vendidos.c.producto_id, vendidos.c.categoria)
+        )
+    )
+    return result.rowcount
+
+def rango_dias(desde: Optional[date], hasta: Optional[date]):
+    """Condiciones sobre VentaDiaria.dia (`hasta` exclusivo)"""
+    condiciones = []
+    if desde is not None:
+        condiciones.append(VentaDiaria.dia >= desde)
+    if hasta is not None:
+        condiciones.append(VentaDiaria.dia < hasta)
+    return condiciones
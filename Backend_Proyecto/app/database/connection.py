@@ -1,27 +1,152 @@
-from sqlalchemy import create_engine
+import math
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import urllib.parse
+from app.core.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    REPLICA_DATABASE_URL,
+    ASYNC_REPLICA_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_ECHO
+)
+from app.database.pool import QueuePoolMedido, AsyncAdaptedQueuePoolMedido, estadisticas_pool
+from app.database.replica import leer_de_primaria
 
-# Configuración de conexión a SQL Server
-SERVER = 'localhost\\SQLEXPRESS'  # Usando la instancia local SQLEXPRESS común
-DATABASE = 'db_disco'
-USERNAME = 'user_disco'
-PASSWORD = '123456'
+# URL de conexión (SQL Server por defecto, configurable con DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
 
-# URL de conexión para SQL Server
-password_encoded = urllib.parse.quote_plus(PASSWORD)
-SQLALCHEMY_DATABASE_URL = f"mssql+pyodbc://{USERNAME}:{password_encoded}@{SERVER}/{DATABASE}?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+# Drivers asíncronos equivalentes a cada driver síncrono. Los de PostgreSQL no
+# están en requirements.txt (extra opcional): pip install asyncpg psycopg2-binary
+ASYNC_DRIVERS = {
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-# Crear engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def to_async_url(url: str) -> str:
+    """Convertir una URL síncrona en su equivalente con driver asíncrono"""
+    scheme, separator, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+# URL asíncrona (por defecto se deriva de la URL síncrona)
+ASYNC_SQLALCHEMY_DATABASE_URL = ASYNC_DATABASE_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# URL asíncrona de la réplica de lectura (vacía si no hay réplica)
+ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL = ASYNC_REPLICA_DATABASE_URL or (
+    to_async_url(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else ""
+)
+
+def engine_kwargs(url: str, asincrono: bool = False) -> dict:
+    """Argumentos del engine según el backend y la configuración del pool"""
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    kwargs = {"echo": DB_ECHO, "connect_args": {}}
+    
+    if backend == "sqlite":
+        # SQLite se usa desde varios hilos (threadpool de FastAPI, scripts)
+        kwargs["connect_args"]["check_same_thread"] = False
+        if url_obj.database in (None, "", ":memory:"):
+            # Las bases en memoria usan su propio pool de una sola conexión
+            return kwargs
+    
+    kwargs.update({
+        "poolclass": AsyncAdaptedQueuePoolMedido if asincrono else QueuePoolMedido,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    })
+    
+    if DB_STATEMENT_TIMEOUT_MS > 0 and backend == "postgresql":
+        if url_obj.get_driver_name() == "asyncpg":
+            kwargs["connect_args"]["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            kwargs["connect_args"]["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    
+    return kwargs
+
+def configurar_statement_timeout(engine):
+    """Aplicar DB_STATEMENT_TIMEOUT_MS en SQL Server (timeout de consulta de pyodbc)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if DB_STATEMENT_TIMEOUT_MS <= 0 or sync_engine.dialect.name != "mssql":
+        return
+    
+    @event.listens_for(sync_engine, "connect")
+    def fijar_timeout(dbapi_connection, connection_record):
+        conexion = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+        # aioodbc envuelve la conexión de pyodbc en el atributo _conn
+        conexion = getattr(conexion, "_conn", conexion)
+        conexion.timeout = math.ceil(DB_STATEMENT_TIMEOUT_MS / 1000)
+
+# Crear engine síncrono (usado por migrate.py y seed_data.py)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_kwargs(SQLALCHEMY_DATABASE_URL))
+configurar_statement_timeout(engine)
 
 # Crear SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Crear engine asíncrono (usado por los routers)
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **engine_kwargs(ASYNC_SQLALCHEMY_DATABASE_URL, asincrono=True)
+)
+configurar_statement_timeout(async_engine)
+
+# Crear AsyncSessionLocal class
+# expire_on_commit=False evita recargas implícitas (no permitidas en modo asíncrono)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Réplica de solo lectura para los GET; sin réplica las lecturas usan la primaria
+if ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL:
+    async_replica_engine = create_async_engine(
+        ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL,
+        **engine_kwargs(ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL, asincrono=True)
+    )
+    configurar_statement_timeout(async_replica_engine)
+    AsyncSessionReplica = async_sessionmaker(
+        bind=async_replica_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+else:
+    async_replica_engine = None
+    AsyncSessionReplica = AsyncSessionLocal
+
 # Crear Base class
 Base = declarative_base()
 
+def pool_stats():
+    """Estadísticas de los pools síncrono, asíncrono y de la réplica"""
+    estadisticas = {
+        "async": estadisticas_pool(async_engine),
+        "sync": estadisticas_pool(engine),
+    }
+    if async_replica_engine is not None:
+        estadisticas["replica"] = estadisticas_pool(async_replica_engine)
+    return estadisticas
+
+def sesion_lectura(primaria: bool = False) -> AsyncSession:
+    """Sesión para lecturas: la réplica si existe, salvo que se pida la primaria"""
+    return AsyncSessionLocal() if primaria else AsyncSessionReplica()
+
 # Dependency para obtener DB session
 def get_db():
     db = SessionLocal()
@@ -29,3 +154,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency para obtener DB session asíncrona
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency para los GET: réplica, o primaria dentro de la ventana read-your-writes
+async def get_async_db_lectura(request: Request):
+    async with sesion_lectura(leer_de_primaria(request)) as db:
+        yield db
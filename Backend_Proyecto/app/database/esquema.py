@@ -0,0 +1,93 @@
+"""
+Versión del esquema de la base de datos (migraciones de Alembic)
+
+El esquema se crea y actualiza solo con `python migrate.py` (o
+`alembic upgrade head`). Al arrancar, la API compara la revisión guardada en
+`alembic_version` con la última migración del directorio `migrations/`: una
+sola consulta, sin inspeccionar tablas ni ejecutar DDL.
+"""
+import ast
+import logging
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app.core.config import SCHEMA_CHECK
+
+logger = logging.getLogger("app.esquema")
+
+RAIZ_PROYECTO = Path(__file__).resolve().parents[2]
+DIRECTORIO_MIGRACIONES = RAIZ_PROYECTO / "migrations"
+ARCHIVO_ALEMBIC = RAIZ_PROYECTO / "alembic.ini"
+
+def configuracion_alembic(configurar_logging: bool = True):
+    """Config de Alembic con rutas absolutas (funciona desde cualquier directorio)"""
+    from alembic.config import Config
+
+    config = Config(str(ARCHIVO_ALEMBIC))
+    config.set_main_option("script_location", str(DIRECTORIO_MIGRACIONES))
+    config.attributes["configurar_logging"] = configurar_logging
+    return config
+
+def revisiones_migracion(archivo: Path) -> dict:
+    """Valores de `revision` y `down_revision` declarados en un archivo de migración"""
+    valores = {}
+    for nodo in ast.parse(archivo.read_text(encoding="utf-8")).body:
+        if (
+            isinstance(nodo, ast.Assign)
+            and len(nodo.targets) == 1
+            and isinstance(nodo.targets[0], ast.Name)
+            and nodo.targets[0].id in ("revision", "down_revision")
+        ):
+            valores[nodo.targets[0].id] = ast.literal_eval(nodo.value)
+    return valores
+
+def version_esperada() -> str:
+    """Última revisión del directorio de migraciones.
+
+    Se lee de los archivos en lugar de usar ScriptDirectory: importar Alembic
+    al arrancar cuesta bastante más que la propia comprobación.
+    """
+    revisiones, anteriores = set(), set()
+    for archivo in (DIRECTORIO_MIGRACIONES / "versions").glob("*.py"):
+        valores = revisiones_migracion(archivo)
+        if "revision" not in valores:
+            continue
+        revisiones.add(valores["revision"])
+        anterior = valores.get("down_revision")
+        if isinstance(anterior, str):
+            anteriores.add(anterior)
+        elif anterior:
+            anteriores.update(anterior)
+
+    cabezas = revisiones - anteriores
+    if len(cabezas) != 1:
+        raise RuntimeError(f"Se esperaba una única última migración y hay {sorted(cabezas) or 'ninguna'}")
+    return cabezas.pop()
+
+async def version_actual(engine) -> Optional[str]:
+    """Revisión aplicada en la base de datos (None si nunca se migró)"""
+    async with engine.connect() as conn:
+        try:
+            return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+        except (OperationalError, ProgrammingError):
+            # La tabla alembic_version no existe todavía
+            return None
+
+async def verificar_esquema(engine, modo: str = SCHEMA_CHECK):
+    """Comprobar que la base está en la última migración antes de atender peticiones"""
+    if modo == "off":
+        return
+    esperada = version_esperada()
+    actual = await version_actual(engine)
+    if actual == esperada:
+        return
+
+    mensaje = (
+        f"El esquema de la base de datos está en la versión {actual or '(sin migrar)'} "
+        f"y la aplicación espera la {esperada}. Ejecute: python migrate.py"
+    )
+    if modo == "warn":
+        logger.warning(mensaje)
+        return
+    raise RuntimeError(mensaje)
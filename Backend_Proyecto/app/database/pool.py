@@ -0,0 +1,78 @@
+"""
+Pools de conexiones instrumentados
+
+Miden cuánto espera cada checkout por una conexión libre y exponen cuántas
+conexiones están en uso, para dimensionar el pool según el número de workers.
+"""
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+class EstadisticasEspera:
+    """Acumulador de tiempos de espera de checkout (seguro entre hilos)"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.timeouts = 0
+
+    def registrar(self, segundos: float, timeout: bool = False):
+        with self._candado:
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            if timeout:
+                self.timeouts += 1
+
+class MedicionPoolMixin:
+    """Envuelve `_do_get` (donde el pool bloquea esperando una conexión)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.espera = EstadisticasEspera()
+
+    def recreate(self):
+        nuevo = super().recreate()
+        nuevo.espera = self.espera
+        return nuevo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.espera.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.espera.registrar(time.perf_counter() - inicio)
+        return conexion
+
+class QueuePoolMedido(MedicionPoolMixin, QueuePool):
+    pass
+
+class AsyncAdaptedQueuePoolMedido(MedicionPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def estadisticas_pool(engine):
+    """Estado actual del pool de un engine (síncrono o asíncrono)"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    datos = {"clase": type(pool).__name__, "estado": pool.status()}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "libres": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    espera = getattr(pool, "espera", None)
+    if espera is not None:
+        datos.update({
+            "checkouts": espera.checkouts,
+            "espera_total_s": round(espera.espera_total, 6),
+            "espera_media_ms": round(espera.espera_total / espera.checkouts * 1000, 3) if espera.checkouts else 0.0,
+            "espera_maxima_ms": round(espera.espera_maxima * 1000, 3),
+            "timeouts": espera.timeouts,
+        })
+    return datos
@@ -0,0 +1,55 @@
+"""
+Enrutamiento de lecturas a la réplica con ventana read-your-writes
+
+Tras una escritura exitosa (cualquier método distinto de GET/HEAD/OPTIONS con
+estado < 400) el middleware marca al cliente con la cookie `leer_primaria`
+durante READ_YOUR_WRITES_SECONDS. Mientras la cookie esté vigente sus GET se
+sirven desde la primaria, así que ve sus propios cambios aunque la réplica
+vaya con retraso. Los clientes sin almacén de cookies pueden reenviarla a mano.
+"""
+import time
+from http.cookies import SimpleCookie
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from app.core.config import READ_YOUR_WRITES_SECONDS
+
+COOKIE_PRIMARIA = "leer_primaria"
+METODOS_LECTURA = ("GET", "HEAD", "OPTIONS")
+
+def leer_de_primaria(conexion: HTTPConnection) -> bool:
+    """True si el cliente escribió hace menos de READ_YOUR_WRITES_SECONDS"""
+    valor = conexion.cookies.get(COOKIE_PRIMARIA)
+    if not valor:
+        return False
+    try:
+        return time.time() < float(valor)
+    except ValueError:
+        return False
+
+def cookie_primaria(segundos: float = READ_YOUR_WRITES_SECONDS) -> str:
+    cookie = SimpleCookie()
+    cookie[COOKIE_PRIMARIA] = f"{time.time() + segundos:.3f}"
+    cookie[COOKIE_PRIMARIA]["max-age"] = max(1, int(segundos))
+    cookie[COOKIE_PRIMARIA]["path"] = "/"
+    cookie[COOKIE_PRIMARIA]["httponly"] = True
+    cookie[COOKIE_PRIMARIA]["samesite"] = "lax"
+    return cookie.output(header="").strip()
+
+class LecturaPrimariaMiddleware:
+    """Middleware ASGI que abre la ventana read-your-writes tras cada escritura"""
+
+    def __init__(self, app, segundos: float = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.segundos = segundos
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in METODOS_LECTURA or self.segundos <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        async def enviar(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("Set-Cookie", cookie_primaria(self.segundos))
+            await send(message)
+        
+        await self.app(scope, receive, enviar)
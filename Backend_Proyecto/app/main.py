@@ -1,18 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.connection import engine, Base
-from app.routers import productos, carrito
+from fastapi.responses import PlainTextResponse
+from app.database.connection import async_engine, async_replica_engine, pool_stats
+from app.database.esquema import verificar_esquema
+from app.database.replica import LecturaPrimariaMiddleware
+from app.routers import productos, carrito, reportes
+from app.core.cache import cache_productos
+from app.core.config import METRICS_ENABLED, COMPRESSION_ENABLED, ADMISSION_ENABLED, CART_EXPIRY_ENABLED, EVENTS_ENABLED
+from app.core.respuestas import RespuestaJSON
+from app.core.compresion import CompresionMiddleware
+from app.core.admision import admision, AdmisionMiddleware, colector_admision
+from app.core.expiracion import tarea_expiracion, colector_expiracion
+from app.core.eventos import cambios_productos, crear_broker, colector_eventos
+from app.core.metricas import (
+    metricas,
+    MetricasMiddleware,
+    instrumentar_engine,
+    colector_pool,
+    colector_cache
+)
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El esquema lo gestionan las migraciones (python migrate.py); aquí solo se comprueba la versión
+    await verificar_esquema(async_engine)
+    # Expiración periódica de carritos abandonados (también: python expirar_carritos.py)
+    expiracion = asyncio.create_task(tarea_expiracion(async_engine)) if CART_EXPIRY_ENABLED else None
+    # Feed SSE de cambios de productos (GET /productos/eventos)
+    if EVENTS_ENABLED:
+        await cambios_productos.iniciar(async_engine, crear_broker())
+    yield
+    await cambios_productos.detener()
+    if expiracion is not None:
+        expiracion.cancel()
+        try:
+            await expiracion
+        except asyncio.CancelledError:
+            pass
+    # Cerrar las conexiones del pool asíncrono al apagar el servidor
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="Tienda Online API",
     description="API RESTful para gestión de productos y carrito de compras",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RespuestaJSON
 )
 
+# Limitar las peticiones concurrentes: las que exceden la cola reciben 503 con Retry-After.
+# Se registra antes que CORS para quedar por dentro y que el 503 lleve sus cabeceras.
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmisionMiddleware)
+
 # Configurar CORS para permitir conexiones desde Flutter
 app.add_middleware(
     CORSMiddleware,
@@ -22,9 +67,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Con réplica, los GET de un cliente van a la primaria justo después de sus escrituras
+if async_replica_engine is not None:
+    app.add_middleware(LecturaPrimariaMiddleware)
+
+# Comprimir respuestas grandes (gzip/brotli según Accept-Encoding)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompresionMiddleware)
+
+# Métricas de latencia y SQL por petición (expuestas en /metrics)
+if METRICS_ENABLED:
+    instrumentar_engine(async_engine)
+    if async_replica_engine is not None:
+        instrumentar_engine(async_replica_engine)
+    metricas.agregar_colector(colector_pool(pool_stats))
+    metricas.agregar_colector(colector_cache("productos", cache_productos.estadisticas))
+    if ADMISSION_ENABLED:
+        metricas.agregar_colector(colector_admision(admision.estadisticas))
+    if CART_EXPIRY_ENABLED:
+        metricas.agregar_colector(colector_expiracion)
+    if EVENTS_ENABLED:
+        metricas.agregar_colector(colector_eventos(cambios_productos.estadisticas))
+    app.add_middleware(MetricasMiddleware)
+
 # Incluir los routers
 app.include_router(productos.router)
 app.include_router(carrito.router)
+app.include_router(reportes.router)
 
 @app.get("/")
 async def root():
@@ -34,6 +103,7 @@ async def root():
         "endpoints": {
             "productos": "/productos",
             "carrito": "/carrito",
+            "reportes": "/reportes",
             "docs": "/docs",
             "redoc": "/redoc"
         }
@@ -42,3 +112,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "API funcionando correctamente"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"productos": cache_productos.estadisticas()}
+
+@app.get("/pool/stats")
+async def pool_stats_endpoint():
+    return pool_stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return admision.estadisticas()
+
+@app.get("/events/stats")
+async def events_stats():
+    return cambios_productos.estadisticas()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
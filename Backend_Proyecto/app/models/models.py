@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
@@ -19,6 +19,12 @@ class Producto(Base):
     # Relación con items del carrito
     carrito_items = relationship("CarritoItem", back_populates="producto")
 
+    # Índices para los filtros de GET /productos (categoría, rango de precio, en stock)
+    __table_args__ = (
+        Index("ix_productos_categoria_precio", "categoria", "precio"),
+        Index("ix_productos_precio_stock", "precio", "stock"),
+    )
+
 class Carrito(Base):
     __tablename__ = "carritos"
 
@@ -26,17 +32,25 @@ class Carrito(Base):
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
     total = Column(Float, default=0.0)
-    estado = Column(String(50), default="activo")  # activo, completado, cancelado
+    estado = Column(String(50), default="activo", index=True)  # activo, completado, cancelado
+    # Resumen desnormalizado para el listado ligero; se mantiene en cada escritura de items
+    cantidad_items = Column(Integer, nullable=False, default=0, server_default="0")  # unidades
+    productos_distintos = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relación con items del carrito
-    items = relationship("CarritoItem", back_populates="carrito", cascade="all, delete-orphan")
+    items = relationship(
+        "CarritoItem",
+        back_populates="carrito",
+        cascade="all, delete-orphan",
+        order_by="CarritoItem.id"
+    )
 
 class CarritoItem(Base):
     __tablename__ = "carrito_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    carrito_id = Column(Integer, ForeignKey("carritos.id"), nullable=False)
-    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False)
+    carrito_id = Column(Integer, ForeignKey("carritos.id"), nullable=False, index=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False, index=True)
     cantidad = Column(Integer, nullable=False, default=1)
     precio_unitario = Column(Float, nullable=False)
     subtotal = Column(Float, nullable=False)
@@ -44,3 +58,66 @@ class CarritoItem(Base):
     # Relaciones
     carrito = relationship("Carrito", back_populates="items")
     producto = relationship("Producto", back_populates="carrito_items")
+
+    __table_args__ = (
+        # Un item por producto: las ediciones del carrito se aplican por producto_id
+        Index("ix_carrito_items_carrito_producto", "carrito_id", "producto_id", unique=True),
+    )
+
+class VersionCatalogo(Base):
+    __tablename__ = "catalogo_version"
+
+    # Fila única (id=1) cuyo sello se incrementa en cada escritura de productos
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ClaveIdempotencia(Base):
+    __tablename__ = "idempotencia_claves"
+
+    # Respuesta guardada de una petición con Idempotency-Key; se purga al expirar
+    clave = Column(String(300), primary_key=True)
+    huella = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    estado_http = Column(Integer, nullable=False)
+    respuesta = Column(Text, nullable=False)
+    expira = Column(DateTime, nullable=False, index=True)  # UTC
+
+class VentaDiaria(Base):
+    __tablename__ = "ventas_diarias"
+
+    # Rollup de ventas de carritos completados por día y producto (ver app/core/ventas.py)
+    dia = Column(Date, primary_key=True)
+    producto_id = Column(Integer, primary_key=True)  # sin FK: el historial sobrevive al producto
+    categoria = Column(String(100))  # categoría del producto al registrar la venta
+    unidades = Column(Integer, nullable=False, default=0)
+    ingresos = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_ventas_diarias_categoria_dia", "categoria", "dia"),
+    )
+
+class CarritoArchivado(Base):
+    __tablename__ = "carritos_archivados"
+
+    # Carritos completados/cancelados antiguos movidos fuera de `carritos` (ver app/core/archivo.py)
+    id = Column(Integer, primary_key=True)  # el mismo id que tenía en carritos
+    fecha_creacion = Column(DateTime(timezone=True))
+    fecha_actualizacion = Column(DateTime(timezone=True))
+    total = Column(Float, default=0.0)
+    estado = Column(String(50))
+    cantidad_items = Column(Integer, nullable=False, default=0, server_default="0")
+    productos_distintos = Column(Integer, nullable=False, default=0, server_default="0")
+    fecha_archivado = Column(DateTime(timezone=True), server_default=func.now())
+
+    items = relationship("CarritoItemArchivado", order_by="CarritoItemArchivado.id")
+
+class CarritoItemArchivado(Base):
+    __tablename__ = "carrito_items_archivados"
+
+    id = Column(Integer, primary_key=True)
+    carrito_id = Column(Integer, ForeignKey("carritos_archivados.id"), nullable=False, index=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False, index=True)
+    cantidad = Column(Integer, nullable=False)
+    precio_unitario = Column(Float, nullable=False)
+    subtotal = Column(Float, nullable=False)
+
+    producto = relationship("Producto")
@@ -1,15 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database.connection import get_db
-from app.models.models import Carrito as CarritoModel, CarritoItem as CarritoItemModel, Producto as ProductoModel
+import orjson
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+from typing import List, Optional, Union
+from app.database.connection import get_async_db, get_async_db_lectura, sesion_lectura
+from app.database.replica import leer_de_primaria
+from app.core.config import EXPORT_YIELD_PER
+from app.core.importacion import fila_csv
+from app.core.respuestas import RespuestaJSON
+from app.core.paginacion import paginar, siguiente_cursor, ContadorTotal
+from app.core.cache import cache_productos
+from app.core.lotes import ids_lote, en_orden
+from app.core.idempotencia import idempotencia, huella_peticion
+from app.core.stock import cantidades_carrito, reservar_stock, liberar_stock, producto_sin_stock
+from app.core.ventas import ventas_carrito, acumular_ventas
+from app.core.eventos import cambios_productos
+from app.models.models import (
+    Carrito as CarritoModel,
+    CarritoItem as CarritoItemModel,
+    CarritoArchivado as CarritoArchivadoModel,
+    CarritoItemArchivado as CarritoItemArchivadoModel,
+    Producto as ProductoModel
+)
 from app.schemas.schemas import (
     Carrito,
     CarritoCreate,
     CarritoUpdate,
     CarritoResponse,
     CarritosListResponse,
-    CarritoItemCreate
+    CarritoResumen,
+    CarritosResumenListResponse,
+    CarritosBatchResponse,
+    CarritoItemCreate,
+    CarritoItemUpdate,
+    FormatoArchivo
 )
 
 router = APIRouter(
@@ -17,6 +45,14 @@ router = APIRouter(
     tags=["carrito"]
 )
 
+total_carritos = ContadorTotal(CarritoModel)
+total_carritos_archivados = ContadorTotal(CarritoArchivadoModel)
+
+# Estados de Carrito.estado
+ESTADO_ACTIVO = "activo"
+ESTADO_COMPLETADO = "completado"
+ESTADO_CANCELADO = "cancelado"
+
 def calcular_total_carrito(carrito_items):
     """Calcular el total del carrito basado en los items"""
     total = 0.0
@@ -24,28 +60,400 @@ def calcular_total_carrito(carrito_items):
         total += item.subtotal
     return total
 
-@router.get("/", response_model=CarritosListResponse)
+def carrito_con_items(carritos=CarritoModel, items=CarritoItemModel):
+    """Consulta de carritos con items y productos precargados (sin carga diferida).
+
+    Para listados se usa selectinload: una consulta para la página de carritos,
+    una para todos sus items y otra para todos los productos, sin importar el
+    tamaño de la página. Cualquier otra relación queda bloqueada con raiseload
+    para que una carga perezosa accidental falle en lugar de generar N+1.
+    Con los modelos de archivo consulta los carritos archivados.
+    """
+    return select(carritos).options(
+        selectinload(carritos.items).selectinload(items.producto),
+        raiseload("*")
+    )
+
+def carrito_detalle(carritos=CarritoModel, items=CarritoItemModel):
+    """Consulta de un solo carrito con items y productos en un único JOIN"""
+    return select(carritos).options(
+        joinedload(carritos.items).joinedload(items.producto),
+        raiseload("*")
+    )
+
+def modelos(archivado: bool):
+    """(carritos, items, contador) de las tablas activas o del archivo"""
+    if archivado:
+        return CarritoArchivadoModel, CarritoItemArchivadoModel, total_carritos_archivados
+    return CarritoModel, CarritoItemModel, total_carritos
+
+def agrupar_items(items: List[CarritoItemCreate]):
+    """Fusionar items repetidos del mismo producto conservando el orden de aparición"""
+    cantidades = {}
+    for item in items:
+        cantidades[item.producto_id] = cantidades.get(item.producto_id, 0) + item.cantidad
+    return cantidades
+
+async def validar_productos(db: AsyncSession, cantidades: dict):
+    """Verificar existencia y stock de varios productos con una sola consulta IN.
+
+    Devuelve un diccionario {producto_id: producto}.
+    """
+    if not cantidades:
+        return {}
+    
+    result = await db.execute(
+        select(ProductoModel).where(ProductoModel.id.in_(list(cantidades)))
+    )
+    productos = {producto.id: producto for producto in result.scalars()}
+    
+    for producto_id, cantidad in cantidades.items():
+        # Verificar que el producto existe
+        producto = productos.get(producto_id)
+        if not producto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Producto con ID {producto_id} no encontrado"
+            )
+        
+        # Verificar stock suficiente
+        if producto.stock < cantidad:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Stock insuficiente para el producto {producto.nombre}. Stock disponible: {producto.stock}"
+            )
+    
+    return productos
+
+async def preparar_items(db: AsyncSession, items: List[CarritoItemCreate]):
+    """Validar los items contra los productos con una sola consulta IN.
+
+    Devuelve las filas listas para insertar y el total del carrito.
+    """
+    cantidades = agrupar_items(items)
+    productos = await validar_productos(db, cantidades)
+    
+    filas = []
+    total_carrito = 0.0
+    for producto_id, cantidad in cantidades.items():
+        producto = productos[producto_id]
+        subtotal = producto.precio * cantidad
+        filas.append({
+            "producto_id": producto_id,
+            "cantidad": cantidad,
+            "precio_unitario": producto.precio,
+            "subtotal": subtotal
+        })
+        total_carrito += subtotal
+    
+    return filas, total_carrito
+
+async def carrito_activo(db: AsyncSession, carrito_id: int):
+    """Obtener un carrito que pueda modificarse (404 si no existe, 409 si no está activo)"""
+    carrito = await db.get(CarritoModel, carrito_id)
+    
+    if not carrito:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Carrito no encontrado"
+        )
+    
+    if carrito.estado != ESTADO_ACTIVO:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Solo se pueden modificar carritos activos (estado actual: {carrito.estado})"
+        )
+    
+    return carrito
+
+async def items_existentes(db: AsyncSession, carrito_id: int, producto_ids=None):
+    """Items actuales del carrito indexados por producto_id"""
+    query = select(CarritoItemModel).where(CarritoItemModel.carrito_id == carrito_id)
+    if producto_ids is not None:
+        query = query.where(CarritoItemModel.producto_id.in_(list(producto_ids)))
+    result = await db.execute(query)
+    return {item.producto_id: item for item in result.scalars()}
+
+async def aplicar_cambios(db: AsyncSession, carrito_id: int, deseadas: dict, existentes: dict):
+    """Llevar los items indicados a la cantidad deseada tocando solo las filas que cambian.
+
+    `deseadas` es {producto_id: cantidad}; una cantidad 0 elimina el item.
+    Solo se validan los productos que se agregan o cambian de cantidad, y el
+    total y el resumen del carrito (unidades y productos distintos) se ajustan
+    con incrementos en SQL en lugar de recalcularse.
+
+    El UPDATE del carrito va antes que los items y exige `estado = 'activo'`:
+    bloquea la fila frente a un checkout concurrente y, si el checkout ganó,
+    no afecta filas y la edición se rechaza con 409 sin tocar ningún item.
+    """
+    a_validar = {
+        producto_id: cantidad
+        for producto_id, cantidad in deseadas.items()
+        if cantidad > 0 and (producto_id not in existentes or existentes[producto_id].cantidad != cantidad)
+    }
+    a_borrar = [
+        existentes[producto_id]
+        for producto_id, cantidad in deseadas.items()
+        if cantidad == 0 and producto_id in existentes
+    ]
+    if not a_validar and not a_borrar:
+        return
+    productos = await validar_productos(db, a_validar)
+    
+    delta = -sum(item.subtotal for item in a_borrar)
+    delta_unidades = -sum(item.cantidad for item in a_borrar)
+    delta_productos = -len(a_borrar)
+    for producto_id, cantidad in a_validar.items():
+        subtotal = productos[producto_id].precio * cantidad
+        item = existentes.get(producto_id)
+        if item is not None:
+            delta += subtotal - item.subtotal
+            delta_unidades += cantidad - item.cantidad
+        else:
+            delta += subtotal
+            delta_unidades += cantidad
+            delta_productos += 1
+    
+    result = await db.execute(
+        update(CarritoModel)
+        .where(CarritoModel.id == carrito_id, CarritoModel.estado == ESTADO_ACTIVO)
+        .values(
+            total=CarritoModel.total + delta,
+            cantidad_items=CarritoModel.cantidad_items + delta_unidades,
+            productos_distintos=CarritoModel.productos_distintos + delta_productos
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Solo se pueden modificar carritos activos"
+        )
+    
+    nuevos = []
+    for producto_id, cantidad in a_validar.items():
+        producto = productos[producto_id]
+        item = existentes.get(producto_id)
+        if item is not None:
+            # UPDATE de una sola fila al hacer flush
+            item.cantidad = cantidad
+            item.precio_unitario = producto.precio
+            item.subtotal = producto.precio * cantidad
+        else:
+            nuevos.append({
+                "carrito_id": carrito_id,
+                "producto_id": producto_id,
+                "cantidad": cantidad,
+                "precio_unitario": producto.precio,
+                "subtotal": producto.precio * cantidad
+            })
+    
+    if a_borrar:
+        await db.execute(
+            delete(CarritoItemModel).where(CarritoItemModel.id.in_([item.id for item in a_borrar]))
+        )
+    
+    if nuevos:
+        await db.execute(insert(CarritoItemModel), nuevos)
+
+async def obtener_carrito(db: AsyncSession, carrito_id: int):
+    """Obtener un carrito con sus items y productos ya cargados"""
+    result = await db.execute(
+        carrito_detalle()
+        .where(CarritoModel.id == carrito_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.unique().scalars().first()
+
+# Columnas del listado resumido: una sola consulta sobre carritos, sin items ni productos
+def columnas_resumen(carritos):
+    return [getattr(carritos, campo) for campo in CarritoResumen.model_fields]
+
+@router.get("/", response_model=Union[CarritosListResponse, CarritosResumenListResponse])
 async def get_carritos(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = None,
+    include_total: bool = True,
+    resumen: bool = False,
+    archivado: bool = False,
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
-    """Obtener lista de todos los carritos"""
-    carritos = db.query(CarritoModel).order_by(CarritoModel.id).offset(skip).limit(limit).all()
-    total = db.query(CarritoModel).count()
+    """Obtener lista de todos los carritos (por skip/limit o por cursor con after_id).
+
+    Con `resumen=true` devuelve filas compactas (id, fecha, estado, total y
+    conteos de items) leídas de las columnas desnormalizadas del carrito.
+    Con `archivado=true` lista los carritos archivados en lugar de los activos.
+    """
+    carritos_modelo, items_modelo, contador = modelos(archivado)
+    if resumen:
+        result = await db.execute(
+            paginar(select(*columnas_resumen(carritos_modelo)), carritos_modelo.id, skip, limit, after_id)
+        )
+        filas = result.all()
+        total = await contador.obtener(db) if include_total else None
+        return RespuestaJSON(CarritosResumenListResponse(
+            carritos=filas,
+            total=total,
+            next_cursor=siguiente_cursor(filas, limit)
+        ))
     
-    return CarritosListResponse(
+    result = await db.execute(
+        paginar(carrito_con_items(carritos_modelo, items_modelo), carritos_modelo.id, skip, limit, after_id)
+    )
+    carritos = result.scalars().all()
+    total = await contador.obtener(db) if include_total else None
+    
+    # Páginas grandes: se serializan directamente a JSON sin revalidar el modelo
+    return RespuestaJSON(CarritosListResponse(
         carritos=carritos,
-        total=total
+        total=total,
+        next_cursor=siguiente_cursor(carritos, limit)
+    ))
+
+@router.get("/batch", response_model=CarritosBatchResponse)
+async def get_carritos_batch(
+    ids: List[int] = Depends(ids_lote),
+    archivado: bool = False,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Obtener varios carritos por ID (`?ids=3,1,7`) con sus items y productos.
+
+    Un único `IN` para los carritos más la precarga de items y productos del
+    listado. Se devuelven en el orden pedido; los IDs que no existen se listan
+    en `no_encontrados` sin que la petición falle. Con `archivado=true` se
+    buscan en el archivo.
+    """
+    carritos_modelo, items_modelo, _ = modelos(archivado)
+    result = await db.execute(carrito_con_items(carritos_modelo, items_modelo).where(carritos_modelo.id.in_(ids)))
+    carritos, no_encontrados = en_orden(ids, {carrito.id: carrito for carrito in result.scalars()})
+    return RespuestaJSON(CarritosBatchResponse(carritos=carritos, no_encontrados=no_encontrados))
+
+# Columnas del export CSV (una fila por item; los carritos vacíos tienen una fila sin item)
+COLUMNAS_EXPORT = [
+    "carrito_id", "fecha_creacion", "fecha_actualizacion", "estado", "total",
+    "item_id", "producto_id", "producto_nombre", "categoria",
+    "cantidad", "precio_unitario", "subtotal"
+]
+
+def consulta_export(desde: Optional[datetime], hasta: Optional[datetime], estado: Optional[str]):
+    """Carritos con sus items y productos en una sola consulta plana ordenada por carrito"""
+    query = (
+        select(
+            CarritoModel.id.label("carrito_id"),
+            CarritoModel.fecha_creacion,
+            CarritoModel.fecha_actualizacion,
+            CarritoModel.estado,
+            CarritoModel.total,
+            CarritoItemModel.id.label("item_id"),
+            CarritoItemModel.producto_id,
+            ProductoModel.nombre.label("producto_nombre"),
+            ProductoModel.categoria,
+            CarritoItemModel.cantidad,
+            CarritoItemModel.precio_unitario,
+            CarritoItemModel.subtotal
+        )
+        .select_from(CarritoModel)
+        .outerjoin(CarritoItemModel, CarritoItemModel.carrito_id == CarritoModel.id)
+        .outerjoin(ProductoModel, ProductoModel.id == CarritoItemModel.producto_id)
+        .order_by(CarritoModel.id, CarritoItemModel.id)
+    )
+    if desde is not None:
+        query = query.where(CarritoModel.fecha_creacion >= desde)
+    if hasta is not None:
+        query = query.where(CarritoModel.fecha_creacion < hasta)
+    if estado is not None:
+        query = query.where(CarritoModel.estado == estado)
+    return query
+
+def valor_json(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+async def filas_export(query, primaria: bool):
+    """Recorrer el resultado con un cursor del lado del servidor en lotes de EXPORT_YIELD_PER"""
+    # Sesión propia: debe seguir abierta mientras se envía la respuesta
+    async with sesion_lectura(primaria) as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_YIELD_PER))
+        async for particion in result.mappings().partitions():
+            yield particion
+
+async def carritos_ndjson(query, primaria: bool):
+    """Un carrito por línea con sus items anidados, agrupando filas consecutivas"""
+    actual = None
+    async for particion in filas_export(query, primaria):
+        lineas = []
+        for fila in particion:
+            if actual is None or actual["id"] != fila["carrito_id"]:
+                if actual is not None:
+                    lineas.append(orjson.dumps(actual) + b"\n")
+                actual = {
+                    "id": fila["carrito_id"],
+                    "fecha_creacion": valor_json(fila["fecha_creacion"]),
+                    "fecha_actualizacion": valor_json(fila["fecha_actualizacion"]),
+                    "estado": fila["estado"],
+                    "total": fila["total"],
+                    "items": []
+                }
+            if fila["item_id"] is not None:
+                actual["items"].append({
+                    "id": fila["item_id"],
+                    "producto_id": fila["producto_id"],
+                    "producto_nombre": fila["producto_nombre"],
+                    "categoria": fila["categoria"],
+                    "cantidad": fila["cantidad"],
+                    "precio_unitario": fila["precio_unitario"],
+                    "subtotal": fila["subtotal"]
+                })
+        if lineas:
+            yield b"".join(lineas)
+    if actual is not None:
+        yield orjson.dumps(actual) + b"\n"
+
+async def carritos_csv(query, primaria: bool):
+    yield fila_csv({columna: columna for columna in COLUMNAS_EXPORT}, COLUMNAS_EXPORT)
+    async for particion in filas_export(query, primaria):
+        yield "".join(
+            fila_csv({columna: valor_json(valor) for columna, valor in fila.items()}, COLUMNAS_EXPORT)
+            for fila in particion
+        )
+
+@router.get("/export")
+async def exportar_carritos(
+    request: Request,
+    formato: FormatoArchivo = FormatoArchivo.ndjson,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    estado: Optional[str] = None
+):
+    """Exportar el historial de carritos con items y productos por streaming (NDJSON o CSV)"""
+    query = consulta_export(desde, hasta, estado)
+    primaria = leer_de_primaria(request)
+    if formato == FormatoArchivo.csv:
+        contenido, media_type = carritos_csv(query, primaria), "text/csv"
+    else:
+        contenido, media_type = carritos_ndjson(query, primaria), "application/x-ndjson"
+    
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="carritos.{formato.value}"'}
     )
 
 @router.get("/{carrito_id}", response_model=Carrito)
 async def get_carrito(
     carrito_id: int,
-    db: Session = Depends(get_db)
+    archivado: bool = False,
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
-    """Obtener detalle de un carrito específico"""
-    carrito = db.query(CarritoModel).filter(CarritoModel.id == carrito_id).first()
+    """Obtener detalle de un carrito específico (`archivado=true` para uno ya archivado)"""
+    if archivado:
+        result = await db.execute(
+            carrito_detalle(CarritoArchivadoModel, CarritoItemArchivadoModel)
+            .where(CarritoArchivadoModel.id == carrito_id)
+        )
+        carrito = result.unique().scalars().first()
+    else:
+        carrito = await obtener_carrito(db, carrito_id)
     
     if not carrito:
         raise HTTPException(
@@ -58,63 +466,78 @@ async def get_carrito(
 @router.post("/", response_model=CarritoResponse, status_code=status.HTTP_201_CREATED)
 async def create_carrito(
     carrito_data: CarritoCreate,
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Crear un nuevo carrito con productos"""
+    """Crear un nuevo carrito con productos.
+
+    Con la cabecera `Idempotency-Key` los reintentos devuelven la respuesta del
+    primer intento (con `Idempotent-Replayed: true`) sin volver a validar
+    productos ni crear otro carrito.
+    """
+    if idempotency_key is None:
+        return await crear_carrito(db, carrito_data)
+    
+    clave = f"POST /carrito:{idempotency_key}"
+    huella = huella_peticion(carrito_data)
+    async with idempotencia.exclusiva(clave):
+        guardada = await idempotencia.buscar(db, clave, huella)
+        if guardada is not None:
+            return guardada
+        return await crear_carrito(db, carrito_data, clave, huella)
+
+async def crear_carrito(db: AsyncSession, carrito_data: CarritoCreate, clave: Optional[str] = None, huella: Optional[str] = None):
+    """Insertar el carrito y sus items; con `clave` guarda la respuesta en la misma transacción"""
     try:
+        # Validar todos los items con una sola consulta de productos
+        filas, total_carrito = await preparar_items(db, carrito_data.items)
+        
         # Crear el carrito
-        db_carrito = CarritoModel()
+        db_carrito = CarritoModel(
+            total=total_carrito,
+            cantidad_items=sum(fila["cantidad"] for fila in filas),
+            productos_distintos=len(filas)
+        )
         db.add(db_carrito)
-        db.flush()  # Para obtener el ID
-        
-        total_carrito = 0.0
-        
-        # Agregar items al carrito
-        for item_data in carrito_data.items:
-            # Verificar que el producto existe
-            producto = db.query(ProductoModel).filter(ProductoModel.id == item_data.producto_id).first()
-            if not producto:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Producto con ID {item_data.producto_id} no encontrado"
-                )
-            
-            # Verificar stock suficiente
-            if producto.stock < item_data.cantidad:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente para el producto {producto.nombre}. Stock disponible: {producto.stock}"
-                )
-            
-            # Crear item del carrito
-            subtotal = producto.precio * item_data.cantidad
-            db_item = CarritoItemModel(
-                carrito_id=db_carrito.id,
-                producto_id=item_data.producto_id,
-                cantidad=item_data.cantidad,
-                precio_unitario=producto.precio,
-                subtotal=subtotal
-            )
-            
-            db.add(db_item)
-            total_carrito += subtotal
-        
-        # Actualizar total del carrito
-        db_carrito.total = total_carrito
+        await db.flush()  # Para obtener el ID
         
-        db.commit()
-        db.refresh(db_carrito)
+        # Insertar todos los items en un solo executemany
+        if filas:
+            await db.execute(
+                insert(CarritoItemModel),
+                [{"carrito_id": db_carrito.id, **fila} for fila in filas]
+            )
         
-        return CarritoResponse(
+        respuesta = CarritoResponse(
             message="Carrito creado exitosamente",
-            carrito=db_carrito
+            carrito=await obtener_carrito(db, db_carrito.id)
         )
+        if clave is not None:
+            cuerpo = respuesta.model_dump_json()
+            await idempotencia.guardar(db, clave, huella, status.HTTP_201_CREATED, cuerpo)
+        
+        await db.commit()
+        total_carritos.invalidar()
+        
+        if clave is not None:
+            return Response(content=cuerpo, status_code=status.HTTP_201_CREATED, media_type="application/json")
+        return respuesta
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
+    except IntegrityError as e:
+        await db.rollback()
+        # Otro worker confirmó antes la misma Idempotency-Key: devolver su respuesta
+        guardada = await idempotencia.buscar(db, clave, huella) if clave is not None else None
+        if guardada is not None:
+            return guardada
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al crear el carrito: {str(e)}"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al crear el carrito: {str(e)}"
@@ -124,10 +547,151 @@ async def create_carrito(
 async def update_carrito(
     carrito_id: int,
     carrito_update: CarritoUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Actualizar productos y cantidades en un carrito"""
-    carrito = db.query(CarritoModel).filter(CarritoModel.id == carrito_id).first()
+    """Actualizar productos y cantidades en un carrito (solo se tocan las filas que cambian)"""
+    await carrito_activo(db, carrito_id)
+    
+    try:
+        existentes = await items_existentes(db, carrito_id)
+        
+        # Los productos que ya no vienen en el payload se eliminan
+        deseadas = {producto_id: 0 for producto_id in existentes}
+        deseadas.update(agrupar_items(carrito_update.items))
+        await aplicar_cambios(db, carrito_id, deseadas, existentes)
+        
+        await db.commit()
+        carrito = await obtener_carrito(db, carrito_id)
+        
+        return CarritoResponse(
+            message="Carrito actualizado exitosamente",
+            carrito=carrito
+        )
+        
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IntegrityError:
+        await db.rollback()
+        # Otra petición agregó el mismo producto al carrito al mismo tiempo
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El carrito cambió durante la actualización; vuelva a intentarlo"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al actualizar el carrito: {str(e)}"
+        )
+
+async def modificar_item(db: AsyncSession, carrito_id: int, producto_id: int, calcular_cantidad, mensaje: str):
+    """Cambiar un solo item del carrito; `calcular_cantidad` recibe el item actual (o None)"""
+    await carrito_activo(db, carrito_id)
+    
+    try:
+        existentes = await items_existentes(db, carrito_id, [producto_id])
+        cantidad = calcular_cantidad(existentes.get(producto_id))
+        await aplicar_cambios(db, carrito_id, {producto_id: cantidad}, existentes)
+        
+        await db.commit()
+        carrito = await obtener_carrito(db, carrito_id)
+        
+        return CarritoResponse(
+            message=mensaje,
+            carrito=carrito
+        )
+        
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IntegrityError:
+        await db.rollback()
+        # Otra petición agregó el mismo producto al carrito al mismo tiempo
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El carrito cambió durante la actualización; vuelva a intentarlo"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al actualizar el carrito: {str(e)}"
+        )
+
+def item_requerido(item):
+    """Verificar que el producto forma parte del carrito"""
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="El producto no está en el carrito"
+        )
+
+@router.post("/{carrito_id}/items", response_model=CarritoResponse)
+async def add_item(
+    carrito_id: int,
+    item_data: CarritoItemCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Agregar un producto al carrito (suma a la cantidad si ya estaba)"""
+    def nueva_cantidad(item):
+        return (item.cantidad if item else 0) + item_data.cantidad
+    
+    return await modificar_item(
+        db, carrito_id, item_data.producto_id, nueva_cantidad,
+        "Producto agregado al carrito"
+    )
+
+@router.put("/{carrito_id}/items/{producto_id}", response_model=CarritoResponse)
+async def update_item(
+    carrito_id: int,
+    producto_id: int,
+    item_update: CarritoItemUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fijar la cantidad de un producto que ya está en el carrito"""
+    def nueva_cantidad(item):
+        item_requerido(item)
+        return item_update.cantidad
+    
+    return await modificar_item(
+        db, carrito_id, producto_id, nueva_cantidad,
+        "Cantidad actualizada exitosamente"
+    )
+
+@router.delete("/{carrito_id}/items/{producto_id}", response_model=CarritoResponse)
+async def remove_item(
+    carrito_id: int,
+    producto_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Quitar un producto del carrito"""
+    def nueva_cantidad(item):
+        item_requerido(item)
+        return 0
+    
+    return await modificar_item(
+        db, carrito_id, producto_id, nueva_cantidad,
+        "Producto eliminado del carrito"
+    )
+
+async def cambiar_estado(db: AsyncSession, carrito_id: int, desde: str, hacia: str) -> bool:
+    """Transición condicional de estado; False si el carrito ya no estaba en `desde`"""
+    result = await db.execute(
+        update(CarritoModel)
+        .where(CarritoModel.id == carrito_id, CarritoModel.estado == desde)
+        .values(estado=hacia)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+@router.post("/{carrito_id}/checkout", response_model=CarritoResponse)
+async def checkout_carrito(
+    carrito_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Completar un carrito activo reservando el stock de todos sus productos"""
+    carrito = await db.get(CarritoModel, carrito_id)
     
     if not carrito:
         raise HTTPException(
@@ -136,69 +700,110 @@ async def update_carrito(
         )
     
     try:
-        # Eliminar todos los items existentes
-        db.query(CarritoItemModel).filter(CarritoItemModel.carrito_id == carrito_id).delete()
-        
-        total_carrito = 0.0
-        
-        # Agregar los nuevos items
-        for item_data in carrito_update.items:
-            # Verificar que el producto existe
-            producto = db.query(ProductoModel).filter(ProductoModel.id == item_data.producto_id).first()
-            if not producto:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Producto con ID {item_data.producto_id} no encontrado"
-                )
-            
-            # Verificar stock suficiente
-            if producto.stock < item_data.cantidad:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente para el producto {producto.nombre}. Stock disponible: {producto.stock}"
+        # La transición condicional impide que dos checkouts del mismo carrito reserven dos veces
+        if not await cambiar_estado(db, carrito_id, ESTADO_ACTIVO, ESTADO_COMPLETADO):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Solo se pueden completar carritos activos"
+            )
+        
+        cantidades = await cantidades_carrito(db, carrito_id)
+        if not await reservar_stock(db, cantidades):
+            await db.rollback()
+            producto = await producto_sin_stock(db, cantidades)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    f"Stock insuficiente para el producto {producto.nombre}. Stock disponible: {producto.stock}"
+                    if producto else "Stock insuficiente para completar el carrito"
                 )
-            
-            # Crear nuevo item
-            subtotal = producto.precio * item_data.cantidad
-            db_item = CarritoItemModel(
-                carrito_id=carrito_id,
-                producto_id=item_data.producto_id,
-                cantidad=item_data.cantidad,
-                precio_unitario=producto.precio,
-                subtotal=subtotal
             )
-            
-            db.add(db_item)
-            total_carrito += subtotal
         
-        # Actualizar total del carrito
-        carrito.total = total_carrito
+        # Las ventas del carrito pasan al rollup de reportes en la misma transacción
+        await acumular_ventas(db, await ventas_carrito(db, carrito_id))
         
-        db.commit()
-        db.refresh(carrito)
+        # El stock forma parte del catálogo cacheado
+        if cantidades:
+            await cache_productos.marcar_cambio(db)
+        await db.commit()
+        for producto_id in cantidades:
+            cache_productos.invalidar_producto(producto_id)
+        cambios_productos.marcar(cantidades)
+        carrito = await obtener_carrito(db, carrito_id)
         
         return CarritoResponse(
-            message="Carrito actualizado exitosamente",
+            message="Carrito completado exitosamente",
             carrito=carrito
         )
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error al actualizar el carrito: {str(e)}"
+            detail=f"Error al completar el carrito: {str(e)}"
+        )
+
+@router.post("/{carrito_id}/cancelar", response_model=CarritoResponse)
+async def cancelar_carrito(
+    carrito_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancelar un carrito; si estaba completado se libera el stock reservado"""
+    carrito = await db.get(CarritoModel, carrito_id)
+    
+    if not carrito:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Carrito no encontrado"
+        )
+    
+    try:
+        cantidades = {}
+        # El día de la venta sale de fecha_actualizacion: leerla antes de la transición
+        ventas = await ventas_carrito(db, carrito_id) if carrito.estado == ESTADO_COMPLETADO else []
+        if await cambiar_estado(db, carrito_id, ESTADO_COMPLETADO, ESTADO_CANCELADO):
+            cantidades = await cantidades_carrito(db, carrito_id)
+            await liberar_stock(db, cantidades)
+            await acumular_ventas(db, ventas, signo=-1)
+            if cantidades:
+                await cache_productos.marcar_cambio(db)
+        elif not await cambiar_estado(db, carrito_id, ESTADO_ACTIVO, ESTADO_CANCELADO):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El carrito ya está cancelado"
+            )
+        
+        await db.commit()
+        for producto_id in cantidades:
+            cache_productos.invalidar_producto(producto_id)
+        cambios_productos.marcar(cantidades)
+        carrito = await obtener_carrito(db, carrito_id)
+        
+        return CarritoResponse(
+            message="Carrito cancelado exitosamente",
+            carrito=carrito
+        )
+        
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al cancelar el carrito: {str(e)}"
         )
 
 @router.delete("/{carrito_id}", response_model=CarritoResponse)
 async def delete_carrito(
     carrito_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un carrito"""
-    carrito = db.query(CarritoModel).filter(CarritoModel.id == carrito_id).first()
+    carrito = await obtener_carrito(db, carrito_id)
     
     if not carrito:
         raise HTTPException(
@@ -207,14 +812,18 @@ async def delete_carrito(
         )
     
     try:
-        db.delete(carrito)
-        db.commit()
+        if carrito.estado == ESTADO_COMPLETADO:
+            # La venta desaparece del historial: descontarla del rollup
+            await acumular_ventas(db, await ventas_carrito(db, carrito_id), signo=-1)
+        await db.delete(carrito)
+        await db.commit()
+        total_carritos.invalidar()
         
         return CarritoResponse(
             message="Carrito eliminado exitosamente"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al eliminar el carrito: {str(e)}"
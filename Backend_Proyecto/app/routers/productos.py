@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database.connection import get_db
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database.connection import get_async_db, get_async_db_lectura, sesion_lectura
+from app.database.replica import leer_de_primaria
+from app.core.config import IMPORT_BATCH_SIZE, EXPORT_YIELD_PER
+from app.core.paginacion import paginar, siguiente_cursor, ContadorTotal
+from app.core.cache import cache_productos, consulta_version, lectura_de_replica
+from app.core.condicional import calcular_etag, valores_fila, cabeceras_cache, no_modificado, respuesta_304
+from app.core.importacion import registros_ndjson, registros_csv, fila_csv
+from app.core.respuestas import RespuestaJSON
+from app.core.lotes import ids_lote, en_orden
+from app.core.eventos import cambios_productos, flujo_sse
 from app.models.models import Producto as ProductoModel
 from app.schemas.schemas import (
     Producto, 
     ProductoCreate, 
     ProductoUpdate, 
     ProductoResponse,
-    ProductosListResponse
+    ProductosListResponse,
+    ProductosBatchResponse,
+    OrdenProductos,
+    FormatoArchivo,
+    ErrorImportacion,
+    ImportacionResponse
 )
 
 router = APIRouter(
@@ -16,56 +34,273 @@ router = APIRouter(
     tags=["productos"]
 )
 
+# Columnas de ordenamiento para cada valor de `orden`
+ORDENES = {
+    OrdenProductos.id: (),
+    OrdenProductos.precio_asc: (ProductoModel.precio.asc(),),
+    OrdenProductos.precio_desc: (ProductoModel.precio.desc(),),
+    OrdenProductos.nombre: (ProductoModel.nombre.asc(),),
+    OrdenProductos.recientes: (ProductoModel.fecha_creacion.desc(),),
+}
+
+def filtros_productos(categoria, precio_min, precio_max, en_stock, q):
+    """Construir las condiciones WHERE de la búsqueda de productos"""
+    filtros = []
+    if categoria is not None:
+        filtros.append(ProductoModel.categoria == categoria)
+    if precio_min is not None:
+        filtros.append(ProductoModel.precio >= precio_min)
+    if precio_max is not None:
+        filtros.append(ProductoModel.precio <= precio_max)
+    if en_stock:
+        filtros.append(ProductoModel.stock > 0)
+    if q:
+        filtros.append(or_(
+            ProductoModel.nombre.icontains(q, autoescape=True),
+            ProductoModel.descripcion.icontains(q, autoescape=True)
+        ))
+    return filtros
+
+def entrada_producto(db_producto):
+    """Entrada de caché de un producto: (modelo, ETag, última modificación)"""
+    return (
+        Producto.model_validate(db_producto),
+        calcular_etag(*valores_fila(db_producto)),
+        db_producto.fecha_actualizacion or db_producto.fecha_creacion
+    )
+
+total_productos = ContadorTotal(ProductoModel)
+
 @router.get("/", response_model=ProductosListResponse)
 async def get_productos(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = None,
+    include_total: bool = True,
+    categoria: Optional[str] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    en_stock: bool = False,
+    q: Optional[str] = None,
+    orden: OrdenProductos = OrdenProductos.id,
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
-    """Obtener lista de productos"""
-    productos = db.query(ProductoModel).order_by(ProductoModel.id).offset(skip).limit(limit).all()
-    total = db.query(ProductoModel).count()
+    """Obtener lista de productos con filtros, búsqueda y ordenamiento.
+
+    El ETag de la página sale de sus parámetros y del sello del catálogo, sin
+    recorrer la tabla. No se envía Last-Modified: una baja o un producto que
+    deja de cumplir el filtro no cambian la fecha máxima de la página.
+    """
+    if after_id is not None and orden != OrdenProductos.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_id solo puede usarse con orden=id"
+        )
+    
+    # Dentro de la ventana read-your-writes se lee la primaria sin pasar por la caché
+    usar_cache = not leer_de_primaria(request)
+    await cache_productos.sincronizar()
+    clave = ("lista", skip, limit, after_id, include_total, categoria, precio_min, precio_max, en_stock, q, orden)
+    entrada = cache_productos.obtener(clave) if usar_cache else None
+    if entrada is not None:
+        respuesta, etag = entrada
+        if no_modificado(request, etag):
+            return respuesta_304(cabeceras_cache(etag))
+        return RespuestaJSON(respuesta, headers=cabeceras_cache(etag))
+    generacion = cache_productos.generacion
+    
+    version = await db.scalar(consulta_version()) or 0
+    etag = calcular_etag(*clave, version)
+    if no_modificado(request, etag):
+        # La página no cambió: no se consulta ni se serializa
+        return respuesta_304(cabeceras_cache(etag))
+    
+    filtros = filtros_productos(categoria, precio_min, precio_max, en_stock, q)
     
-    return ProductosListResponse(
+    result = await db.execute(
+        paginar(
+            select(ProductoModel).where(*filtros),
+            ProductoModel.id, skip, limit, after_id, ORDENES[orden]
+        )
+    )
+    productos = result.scalars().all()
+    
+    respuesta = ProductosListResponse(
         productos=productos,
-        total=total
+        total=await total_productos.obtener(db, filtros) if include_total else None,
+        next_cursor=siguiente_cursor(productos, limit) if orden == OrdenProductos.id else None
+    )
+    if usar_cache:
+        cache_productos.guardar(
+            clave, (respuesta, etag), generacion, version if lectura_de_replica(db) else None
+        )
+    
+    # Páginas grandes: se serializan directamente a JSON sin revalidar el modelo
+    return RespuestaJSON(respuesta, headers=cabeceras_cache(etag))
+
+@router.get("/batch", response_model=ProductosBatchResponse)
+async def get_productos_batch(
+    request: Request,
+    ids: List[int] = Depends(ids_lote),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Obtener varios productos por ID (`?ids=3,1,7`) en una sola petición.
+
+    Los productos que están en la caché no se consultan y el resto se lee con
+    un único `IN`. Se devuelven en el orden pedido; los IDs que no existen se
+    listan en `no_encontrados` sin que la petición falle.
+    """
+    usar_cache = not leer_de_primaria(request)
+    await cache_productos.sincronizar()
+    encontrados = {}
+    pendientes = []
+    for producto_id in ids:
+        entrada = cache_productos.obtener(("producto", producto_id)) if usar_cache else None
+        if entrada is None:
+            pendientes.append(producto_id)
+        else:
+            encontrados[producto_id] = entrada[0]
+    
+    if pendientes:
+        generacion = cache_productos.generacion
+        version = await cache_productos.version_lectura(db) if usar_cache else None
+        result = await db.execute(select(ProductoModel).where(ProductoModel.id.in_(pendientes)))
+        for db_producto in result.scalars():
+            entrada = entrada_producto(db_producto)
+            if usar_cache:
+                cache_productos.guardar(("producto", db_producto.id), entrada, generacion, version)
+            encontrados[db_producto.id] = entrada[0]
+    
+    productos, no_encontrados = en_orden(ids, encontrados)
+    return RespuestaJSON(ProductosBatchResponse(productos=productos, no_encontrados=no_encontrados))
+
+@router.get("/export")
+async def exportar_productos(
+    request: Request,
+    formato: FormatoArchivo = FormatoArchivo.ndjson,
+    categoria: Optional[str] = None
+):
+    """Exportar el catálogo por streaming (NDJSON o CSV) sin cargarlo completo en memoria"""
+    columnas = ["id"] + [columna for columna in Producto.model_fields if columna != "id"]
+    query = select(ProductoModel).order_by(ProductoModel.id)
+    if categoria is not None:
+        query = query.where(ProductoModel.categoria == categoria)
+    primaria = leer_de_primaria(request)
+    
+    async def generar():
+        # Sesión propia: debe seguir abierta mientras se envía la respuesta
+        async with sesion_lectura(primaria) as db:
+            result = await db.stream_scalars(query.execution_options(yield_per=EXPORT_YIELD_PER))
+            if formato == FormatoArchivo.csv:
+                yield fila_csv({columna: columna for columna in columnas}, columnas)
+            async for particion in result.partitions():
+                filas = [Producto.model_validate(producto).model_dump(mode="json") for producto in particion]
+                if formato == FormatoArchivo.csv:
+                    yield "".join(fila_csv(fila, columnas) for fila in filas)
+                else:
+                    yield b"".join(orjson.dumps(fila) + b"\n" for fila in filas)
+    
+    media_type = "text/csv" if formato == FormatoArchivo.csv else "application/x-ndjson"
+    return StreamingResponse(
+        generar(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="productos.{formato.value}"'}
+    )
+
+@router.get("/eventos")
+async def eventos_productos():
+    """Feed de cambios de stock y precio por server-sent events.
+
+    Cada mensaje `productos` trae una lista JSON de cambios agrupados
+    (`{"id", "stock", "precio"}` o `{"id", "eliminado": true}`); un mensaje
+    `resincronizar` indica que se perdieron cambios y hay que recargar
+    GET /productos. El servidor cierra el flujo periódicamente y el cliente
+    debe reconectar.
+    """
+    if not cambios_productos.activo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="El feed de eventos está desactivado"
+        )
+    suscripcion = cambios_productos.suscribir()
+    if suscripcion is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiados clientes conectados al feed de eventos",
+            headers={"Retry-After": "5"}
+        )
+    
+    return StreamingResponse(
+        flujo_sse(cambios_productos, suscripcion),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @router.get("/{producto_id}", response_model=Producto)
 async def get_producto(
     producto_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
     """Obtener un producto por ID"""
-    producto = db.query(ProductoModel).filter(ProductoModel.id == producto_id).first()
+    usar_cache = not leer_de_primaria(request)
+    await cache_productos.sincronizar()
+    clave = ("producto", producto_id)
+    entrada = cache_productos.obtener(clave) if usar_cache else None
+    if entrada is not None:
+        producto, etag, ultima_modificacion = entrada
+        if no_modificado(request, etag, ultima_modificacion):
+            return respuesta_304(cabeceras_cache(etag, ultima_modificacion))
+        response.headers.update(cabeceras_cache(etag, ultima_modificacion))
+        return producto
+    generacion = cache_productos.generacion
+    version = await cache_productos.version_lectura(db) if usar_cache else None
+    
+    db_producto = await db.get(ProductoModel, producto_id)
     
-    if not producto:
+    if not db_producto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Producto no encontrado"
         )
     
+    etag = calcular_etag(*valores_fila(db_producto))
+    ultima_modificacion = db_producto.fecha_actualizacion or db_producto.fecha_creacion
+    if no_modificado(request, etag, ultima_modificacion):
+        # Se responde antes de serializar el modelo
+        return respuesta_304(cabeceras_cache(etag, ultima_modificacion))
+    
+    producto = Producto.model_validate(db_producto)
+    if usar_cache:
+        cache_productos.guardar(clave, (producto, etag, ultima_modificacion), generacion, version)
+    
+    response.headers.update(cabeceras_cache(etag, ultima_modificacion))
     return producto
 
 @router.post("/", response_model=ProductoResponse, status_code=status.HTTP_201_CREATED)
 async def create_producto(
     producto: ProductoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un nuevo producto"""
     db_producto = ProductoModel(**producto.dict())
     
     try:
         db.add(db_producto)
-        db.commit()
-        db.refresh(db_producto)
+        await cache_productos.marcar_cambio(db)
+        await db.commit()
+        await db.refresh(db_producto)
+        cache_productos.invalidar_producto(db_producto.id)
+        total_productos.invalidar()
         
         return ProductoResponse(
             message="Producto creado exitosamente",
             producto=db_producto
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al crear el producto: {str(e)}"
@@ -75,10 +310,10 @@ async def create_producto(
 async def update_producto(
     producto_id: int,
     producto_update: ProductoUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar un producto"""
-    db_producto = db.query(ProductoModel).filter(ProductoModel.id == producto_id).first()
+    db_producto = await db.get(ProductoModel, producto_id)
     
     if not db_producto:
         raise HTTPException(
@@ -93,15 +328,19 @@ async def update_producto(
         for field, value in update_data.items():
             setattr(db_producto, field, value)
         
-        db.commit()
-        db.refresh(db_producto)
+        await cache_productos.marcar_cambio(db)
+        await db.commit()
+        await db.refresh(db_producto)
+        cache_productos.invalidar_producto(producto_id)
+        if "stock" in update_data or "precio" in update_data:
+            cambios_productos.marcar([producto_id])
         
         return ProductoResponse(
             message="Producto actualizado exitosamente",
             producto=db_producto
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al actualizar el producto: {str(e)}"
@@ -110,10 +349,10 @@ async def update_producto(
 @router.delete("/{producto_id}", response_model=ProductoResponse)
 async def delete_producto(
     producto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un producto"""
-    db_producto = db.query(ProductoModel).filter(ProductoModel.id == producto_id).first()
+    db_producto = await db.get(ProductoModel, producto_id)
     
     if not db_producto:
         raise HTTPException(
@@ -122,15 +361,129 @@ async def delete_producto(
         )
     
     try:
-        db.delete(db_producto)
-        db.commit()
+        await db.delete(db_producto)
+        await cache_productos.marcar_cambio(db)
+        await db.commit()
+        cache_productos.invalidar_producto(producto_id)
+        total_productos.invalidar()
+        cambios_productos.marcar([producto_id])
         
         return ProductoResponse(
             message="Producto eliminado exitosamente"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al eliminar el producto: {str(e)}"
         )
+
+def describir_error(error: Exception) -> str:
+    """Mensaje compacto de un error de validación de una fila"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(parte) for parte in detalle['loc'])}: {detalle['msg']}"
+            for detalle in error.errors()
+        )
+    return str(error)
+
+async def guardar_lote(db: AsyncSession, lote, errores: List[ErrorImportacion]):
+    """Insertar y actualizar un lote con executemany; devuelve (insertados, actualizados)"""
+    ids = {producto_id for _, producto_id, _ in lote if producto_id is not None}
+    existentes = set()
+    if ids:
+        existentes = set(await db.scalars(select(ProductoModel.id).where(ProductoModel.id.in_(ids))))
+    
+    nuevos = []
+    cambios = []
+    lineas = []
+    for linea, producto_id, datos in lote:
+        if producto_id is None:
+            nuevos.append(datos)
+        elif producto_id in existentes:
+            cambios.append({"id": producto_id, **datos})
+        else:
+            errores.append(ErrorImportacion(linea=linea, error=f"Producto con ID {producto_id} no encontrado"))
+            continue
+        lineas.append(linea)
+    
+    if not nuevos and not cambios:
+        return 0, 0
+    
+    try:
+        if nuevos:
+            await db.execute(insert(ProductoModel), nuevos)
+        if cambios:
+            # UPDATE masivo por clave primaria (executemany)
+            await db.execute(update(ProductoModel), cambios)
+        await cache_productos.marcar_cambio(db)
+        await db.commit()
+        cambios_productos.marcar(cambio["id"] for cambio in cambios)
+    except Exception as e:
+        await db.rollback()
+        errores.extend(
+            ErrorImportacion(linea=linea, error=f"Error al guardar el lote: {str(e)}")
+            for linea in lineas
+        )
+        return 0, 0
+    
+    return len(nuevos), len(cambios)
+
+@router.post("/bulk", response_model=ImportacionResponse)
+async def importar_productos(
+    request: Request,
+    formato: Optional[FormatoArchivo] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Crear o actualizar productos en lote a partir de NDJSON o CSV enviado por streaming.
+
+    Las filas con `id` actualizan el producto existente y las demás se insertan.
+    Las filas inválidas se reportan sin interrumpir la importación.
+    """
+    if formato is None:
+        tipo = request.headers.get("content-type", "")
+        formato = FormatoArchivo.csv if "csv" in tipo else FormatoArchivo.ndjson
+    lector = registros_csv if formato == FormatoArchivo.csv else registros_ndjson
+    
+    insertados = 0
+    actualizados = 0
+    errores = []
+    lote = []
+    
+    async def procesar_lote():
+        nonlocal insertados, actualizados, lote
+        nuevos, cambiados = await guardar_lote(db, lote, errores)
+        insertados += nuevos
+        actualizados += cambiados
+        lote = []
+    
+    async for linea, registro in lector(request.stream()):
+        if isinstance(registro, Exception):
+            errores.append(ErrorImportacion(linea=linea, error=describir_error(registro)))
+            continue
+        try:
+            producto_id = registro.pop("id", None)
+            producto_id = int(producto_id) if producto_id is not None else None
+            datos = ProductoCreate.model_validate(registro).model_dump()
+        except (ValidationError, ValueError, TypeError) as e:
+            errores.append(ErrorImportacion(linea=linea, error=describir_error(e)))
+            continue
+        
+        lote.append((linea, producto_id, datos))
+        if len(lote) >= IMPORT_BATCH_SIZE:
+            await procesar_lote()
+    
+    if lote:
+        await procesar_lote()
+    
+    if insertados or actualizados:
+        cache_productos.limpiar()
+    if insertados:
+        total_productos.invalidar()
+    
+    return ImportacionResponse(
+        message="Importación finalizada",
+        insertados=insertados,
+        actualizados=actualizados,
+        errores=errores
+    )
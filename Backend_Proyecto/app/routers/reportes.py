@@ -0,0 +1,115 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database.connection import get_async_db_lectura
+from app.core.respuestas import RespuestaJSON
+from app.core.ventas import rango_dias
+from app.models.models import Producto as ProductoModel, VentaDiaria
+from app.schemas.schemas import (
+    VentasPorDiaResponse,
+    VentasPorProductoResponse,
+    VentasPorCategoriaResponse,
+    InventarioResponse
+)
+
+router = APIRouter(
+    prefix="/reportes",
+    tags=["reportes"]
+)
+
+# Los reportes de ventas agregan el rollup ventas_diarias (una fila por día y
+# producto), nunca carrito_items. `hasta` es exclusivo, como en los exports.
+
+UNIDADES = func.sum(VentaDiaria.unidades).label("unidades")
+INGRESOS = func.sum(VentaDiaria.ingresos).label("ingresos")
+
+@router.get("/ventas/dias", response_model=VentasPorDiaResponse)
+async def ventas_por_dia(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria: Optional[str] = None,
+    producto_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Unidades vendidas e ingresos por día (carritos completados)"""
+    condiciones = rango_dias(desde, hasta)
+    if categoria is not None:
+        condiciones.append(VentaDiaria.categoria == categoria)
+    if producto_id is not None:
+        condiciones.append(VentaDiaria.producto_id == producto_id)
+    
+    result = await db.execute(
+        select(VentaDiaria.dia, UNIDADES, INGRESOS)
+        .where(*condiciones)
+        .group_by(VentaDiaria.dia)
+        .order_by(VentaDiaria.dia)
+    )
+    dias = result.all()
+    return RespuestaJSON(VentasPorDiaResponse(
+        dias=dias,
+        unidades=sum(dia.unidades for dia in dias),
+        ingresos=sum(dia.ingresos for dia in dias)
+    ))
+
+@router.get("/ventas/productos", response_model=VentasPorProductoResponse)
+async def ventas_por_producto(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Productos más vendidos por ingresos en el período"""
+    condiciones = rango_dias(desde, hasta)
+    if categoria is not None:
+        condiciones.append(VentaDiaria.categoria == categoria)
+    
+    ventas = (
+        select(VentaDiaria.producto_id, func.max(VentaDiaria.categoria).label("categoria"), UNIDADES, INGRESOS)
+        .where(*condiciones)
+        .group_by(VentaDiaria.producto_id)
+        .order_by(INGRESOS.desc(), VentaDiaria.producto_id)
+        .limit(limit)
+        .subquery()
+    )
+    result = await db.execute(
+        select(ventas, ProductoModel.nombre)
+        .outerjoin(ProductoModel, ProductoModel.id == ventas.c.producto_id)
+        .order_by(ventas.c.ingresos.desc(), ventas.c.producto_id)
+    )
+    return RespuestaJSON(VentasPorProductoResponse(productos=result.all()))
+
+@router.get("/ventas/categorias", response_model=VentasPorCategoriaResponse)
+async def ventas_por_categoria(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Unidades vendidas e ingresos por categoría en el período"""
+    result = await db.execute(
+        select(VentaDiaria.categoria, UNIDADES, INGRESOS)
+        .where(*rango_dias(desde, hasta))
+        .group_by(VentaDiaria.categoria)
+        .order_by(INGRESOS.desc())
+    )
+    return RespuestaJSON(VentasPorCategoriaResponse(categorias=result.all()))
+
+@router.get("/inventario", response_model=InventarioResponse)
+async def inventario_por_categoria(
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """Stock actual por categoría: productos, agotados, unidades y valor a precio de venta"""
+    result = await db.execute(
+        select(
+            ProductoModel.categoria,
+            func.count(ProductoModel.id).label("productos"),
+            func.sum(case((ProductoModel.stock == 0, 1), else_=0)).label("sin_stock"),
+            func.sum(ProductoModel.stock).label("unidades"),
+            func.sum(ProductoModel.stock * ProductoModel.precio).label("valor")
+        )
+        .group_by(ProductoModel.categoria)
+        .order_by(ProductoModel.categoria)
+    )
+    return RespuestaJSON(InventarioResponse(categorias=result.all()))
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
+from enum import Enum
 
 # Esquemas para Producto
 class ProductoBase(BaseModel):
@@ -11,6 +12,17 @@ class ProductoBase(BaseModel):
     imagen_url: Optional[str] = None
     categoria: Optional[str] = None
 
+class OrdenProductos(str, Enum):
+    id = "id"
+    precio_asc = "precio_asc"
+    precio_desc = "precio_desc"
+    nombre = "nombre"
+    recientes = "recientes"
+
+class FormatoArchivo(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
 class ProductoCreate(ProductoBase):
     pass
 
@@ -66,11 +78,25 @@ class Carrito(CarritoBase):
     fecha_actualizacion: Optional[datetime] = None
     total: float
     estado: str
+    cantidad_items: int = 0
+    productos_distintos: int = 0
     items: List[CarritoItem] = []
 
     class Config:
         from_attributes = True
 
+class CarritoResumen(BaseModel):
+    """Fila compacta del historial (sin items ni productos)"""
+    id: int
+    fecha_creacion: datetime
+    estado: str
+    total: float
+    cantidad_items: int
+    productos_distintos: int
+
+    class Config:
+        from_attributes = True
+
 # Esquemas de respuesta
 class ProductoResponse(BaseModel):
     message: str
@@ -82,8 +108,85 @@ class CarritoResponse(BaseModel):
 
 class ProductosListResponse(BaseModel):
     productos: List[Producto]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[int] = None
 
 class CarritosListResponse(BaseModel):
     carritos: List[Carrito]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[int] = None
+
+class CarritosResumenListResponse(BaseModel):
+    carritos: List[CarritoResumen]
+    total: Optional[int] = None
+    next_cursor: Optional[int] = None
+
+class ProductosBatchResponse(BaseModel):
+    productos: List[Producto]
+    no_encontrados: List[int] = []
+
+class CarritosBatchResponse(BaseModel):
+    carritos: List[Carrito]
+    no_encontrados: List[int] = []
+
+# Esquemas de importación masiva
+class ErrorImportacion(BaseModel):
+    linea: int
+    error: str
+
+class ImportacionResponse(BaseModel):
+    message: str
+    insertados: int
+    actualizados: int
+    errores: List[ErrorImportacion] = []
+
+# Esquemas de reportes (leídos del rollup ventas_diarias y de productos)
+class VentaDia(BaseModel):
+    dia: date
+    unidades: int
+    ingresos: float
+
+    class Config:
+        from_attributes = True
+
+class VentaProducto(BaseModel):
+    producto_id: int
+    nombre: Optional[str] = None  # None si el producto ya no existe
+    categoria: Optional[str] = None
+    unidades: int
+    ingresos: float
+
+    class Config:
+        from_attributes = True
+
+class VentaCategoria(BaseModel):
+    categoria: Optional[str] = None
+    unidades: int
+    ingresos: float
+
+    class Config:
+        from_attributes = True
+
+class InventarioCategoria(BaseModel):
+    categoria: Optional[str] = None
+    productos: int
+    sin_stock: int
+    unidades: int  # stock total
+    valor: float  # stock * precio
+
+    class Config:
+        from_attributes = True
+
+class VentasPorDiaResponse(BaseModel):
+    dias: List[VentaDia]
+    unidades: int
+    ingresos: float
+
+class VentasPorProductoResponse(BaseModel):
+    productos: List[VentaProducto]
+
+class VentasPorCategoriaResponse(BaseModel):
+    categorias: List[VentaCategoria]
+
+class InventarioResponse(BaseModel):
+    categorias: List[InventarioCategoria]
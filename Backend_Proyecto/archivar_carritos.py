@@ -0,0 +1,41 @@
+"""
+Script para archivar los carritos completados/cancelados antiguos
+
+    python archivar_carritos.py                      # última actividad hace más de ARCHIVE_AFTER_DAYS (180)
+    python archivar_carritos.py --dias 365 --lote 1000
+    python archivar_carritos.py --simular            # solo contar los que se archivarían
+
+Mueve los carritos y sus items a carritos_archivados/carrito_items_archivados
+en lotes transaccionales; si se interrumpe, basta con volver a ejecutarlo.
+Los archivados se consultan con `?archivado=true` en GET /carrito.
+"""
+import argparse
+from app.core.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_PAUSE
+from app.database.connection import engine
+from app.core.archivo import archivar_carritos, contar_archivables, limite_archivo
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archivar los carritos cerrados antiguos")
+    parser.add_argument("--dias", type=float, default=ARCHIVE_AFTER_DAYS, help="Días desde la última actividad")
+    parser.add_argument("--lote", type=int, default=ARCHIVE_BATCH_SIZE, help="Carritos por transacción")
+    parser.add_argument("--pausa", type=float, default=ARCHIVE_PAUSE, help="Segundos entre lotes")
+    parser.add_argument("--simular", action="store_true", help="Contar sin modificar")
+    parser.add_argument("--progreso", action="store_true", help="Mostrar el avance de cada lote")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.simular:
+            with engine.connect() as conn:
+                total = contar_archivables(conn, limite_archivo(args.dias))
+            print(f"{total} carritos completados/cancelados sin actividad en {args.dias:g} días")
+        else:
+            print(f"Archivando carritos cerrados sin actividad en {args.dias:g} días (lotes de {args.lote})...")
+            progreso = (lambda resultado: print(f"  {resultado}")) if args.progreso else None
+            resultado = archivar_carritos(engine, args.dias, args.lote, args.pausa, progreso)
+            print(f"✅ {resultado}")
+    except KeyboardInterrupt:
+        print("⏸️  Interrumpido: los lotes ya confirmados quedan archivados; vuelva a ejecutarlo para continuar")
+    except Exception as e:
+        print(f"❌ Error al archivar los carritos: {e}")
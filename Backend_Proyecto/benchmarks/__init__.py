@@ -0,0 +1 @@
+# Inicialización del paquete benchmarks
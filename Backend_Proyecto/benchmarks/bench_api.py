@@ -0,0 +1,208 @@
+"""
+Benchmark de carga de la API: throughput y latencia por endpoint
+
+Siembra una base SQLite temporal con `seed_data.generar_datos` y lanza
+clientes concurrentes contra la aplicación real, en proceso
+(httpx.ASGITransport) y/o por HTTP con uvicorn. Para cada endpoint reporta
+peticiones por segundo y p50/p95/p99, y con --json guarda el resultado para
+compararlo entre commits con `benchmarks.comparar`.
+
+Uso:
+    python -m benchmarks.bench_api --productos 20000 --carritos 50000 --clientes 16 --peticiones 500 --json antes.json
+    python -m benchmarks.bench_api --modo uvicorn --endpoints detalle_producto,crear_carrito
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, puerto_libre, iniciar_servidor, resumen
+
+MODOS = ("inproc", "uvicorn")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=20000)
+    parser.add_argument("--carritos", type=int, default=50000)
+    parser.add_argument("--items", type=int, default=4, help="Máximo de productos por carrito sembrado")
+    parser.add_argument("--clientes", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones medidas por endpoint")
+    parser.add_argument("--calentamiento", type=int, default=20, help="Peticiones previas sin medir")
+    parser.add_argument("--modo", choices=MODOS + ("ambos",), default="ambos")
+    parser.add_argument("--endpoints", default="", help="Lista separada por comas (por defecto todos)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", dest="salida_json", default="", help="Archivo donde guardar los resultados")
+    return parser.parse_args()
+
+def crear_escenarios(ids_productos, ids_carritos, ids_activos):
+    """Una función por endpoint que hace una petición con parámetros aleatorios"""
+
+    def items_aleatorios(azar):
+        return [
+            {"producto_id": producto_id, "cantidad": 1}
+            for producto_id in azar.sample(ids_productos, k=azar.randint(1, 3))
+        ]
+
+    async def listar_productos(client, azar):
+        return await client.get("/productos/", params={
+            "after_id": azar.choice(ids_productos), "limit": 50, "include_total": "false"
+        })
+
+    async def detalle_producto(client, azar):
+        return await client.get(f"/productos/{azar.choice(ids_productos)}")
+
+    async def listar_carritos(client, azar):
+        return await client.get("/carrito/", params={
+            "after_id": azar.choice(ids_carritos), "limit": 20, "include_total": "false"
+        })
+
+    async def detalle_carrito(client, azar):
+        return await client.get(f"/carrito/{azar.choice(ids_carritos)}")
+
+    async def lote_productos(client, azar):
+        # Lo que antes eran 20 GET /productos/{id} de una pantalla
+        return await client.get("/productos/batch", params={
+            "ids": ",".join(map(str, azar.sample(ids_productos, k=20)))
+        })
+
+    async def lote_carritos(client, azar):
+        return await client.get("/carrito/batch", params={
+            "ids": ",".join(map(str, azar.sample(ids_carritos, k=10)))
+        })
+
+    async def crear_carrito(client, azar):
+        return await client.post("/carrito/", json={"items": items_aleatorios(azar)})
+
+    async def actualizar_carrito(client, azar):
+        return await client.put(f"/carrito/{azar.choice(ids_activos)}", json={"items": items_aleatorios(azar)})
+
+    return {
+        "listar_productos": listar_productos,
+        "detalle_producto": detalle_producto,
+        "listar_carritos": listar_carritos,
+        "detalle_carrito": detalle_carrito,
+        "lote_productos": lote_productos,
+        "lote_carritos": lote_carritos,
+        "crear_carrito": crear_carrito,
+        "actualizar_carrito": actualizar_carrito,
+    }
+
+async def ejecutar(client, escenario, peticiones, clientes, semilla):
+    """Repartir `peticiones` entre `clientes` tareas concurrentes y medir cada una"""
+    latencias = []
+    errores = 0
+    pendientes = iter(range(peticiones))
+
+    async def cliente(numero):
+        nonlocal errores
+        azar = random.Random(semilla + numero)
+        for _ in pendientes:
+            inicio = time.perf_counter()
+            respuesta = await escenario(client, azar)
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code >= 400:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(numero) for numero in range(clientes)))
+    duracion = time.perf_counter() - inicio
+    return {
+        "peticiones": peticiones,
+        "errores": errores,
+        "throughput_rps": round(peticiones / duracion, 1),
+        **resumen(latencias),
+    }
+
+async def medir_modo(client, escenarios, args):
+    resultados = {}
+    for nombre, escenario in escenarios.items():
+        if args.calentamiento:
+            await ejecutar(client, escenario, args.calentamiento, args.clientes, args.semilla)
+        resultados[nombre] = await ejecutar(client, escenario, args.peticiones, args.clientes, args.semilla)
+        r = resultados[nombre]
+        print(
+            f"{nombre:<20} {r['throughput_rps']:>9.1f} {r['p50_ms']:>8.2f}ms {r['p95_ms']:>8.2f}ms "
+            f"{r['p99_ms']:>8.2f}ms {r['errores']:>7}"
+        )
+    return resultados
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_api_")
+    # El log de peticiones lentas ensuciaría la salida bajo carga
+    os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+
+    import httpx
+    from sqlalchemy import select
+    from app.database.connection import engine, async_engine
+    from app.models.models import Producto, Carrito
+    from seed_data import generar_datos
+
+    crear_tablas()
+    print(f"Sembrando {args.productos} productos y {args.carritos} carritos...")
+    inicio = time.perf_counter()
+    ids_productos, ids_carritos = generar_datos(args.productos, args.carritos, args.items, args.semilla)
+    print(f"Siembra completada en {time.perf_counter() - inicio:.1f}s")
+
+    with engine.connect() as conn:
+        # Productos con stock de sobra para que crear/actualizar no falle por validación
+        ids_con_stock = list(conn.scalars(select(Producto.id).where(Producto.stock >= 50)))
+        ids_activos = list(conn.scalars(select(Carrito.id).where(Carrito.estado == "activo")))
+
+    escenarios = crear_escenarios(ids_con_stock, ids_carritos, ids_activos)
+    if args.endpoints:
+        escenarios = {nombre: escenarios[nombre] for nombre in args.endpoints.split(",")}
+    modos = MODOS if args.modo == "ambos" else (args.modo,)
+
+    from app.main import app
+    from app.core.cache import cache_productos
+
+    resultados = {}
+    for modo in modos:
+        print(f"\n[{modo}] {args.clientes} clientes, {args.peticiones} peticiones por endpoint")
+        print(f"{'endpoint':<20} {'req/s':>9} {'p50':>10} {'p95':>10} {'p99':>10} {'errores':>7}")
+        cache_productos.limpiar()
+        limites = httpx.Limits(max_connections=args.clientes)
+        if modo == "inproc":
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limites) as client:
+                resultados[modo] = await medir_modo(client, escenarios, args)
+            # Las conexiones asíncronas pertenecen a este event loop; uvicorn usa el suyo
+            await async_engine.dispose()
+        else:
+            puerto = puerto_libre()
+            servidor, hilo = iniciar_servidor(puerto)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", limits=limites, timeout=60) as client:
+                resultados[modo] = await medir_modo(client, escenarios, args)
+            servidor.should_exit = True
+            hilo.join()
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as archivo:
+            json.dump({
+                "commit": commit_actual(),
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "parametros": vars(args),
+                "resultados": resultados,
+            }, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida_json}")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark del archivo de carritos: throughput del traslado y latencia de las lecturas antes/después
+
+Siembra un historial grande con `seed_data.generar_datos` (carritos repartidos
+en `--dias` días), mide las consultas de GET /carrito (conteo, página por
+cursor, página profunda por skip, detalle y resumen), archiva los carritos
+cerrados anteriores a `--archivar-dias` reportando filas/s y la transacción
+más larga, y repite las mismas consultas sobre las tablas ya reducidas.
+
+Uso:
+    python -m benchmarks.bench_archivo --carritos 2000000 --lote 500
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=5000)
+    parser.add_argument("--carritos", type=int, default=2000000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--dias", type=int, default=730, help="Antigüedad máxima del historial sembrado")
+    parser.add_argument("--archivar-dias", type=float, default=180)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    return parser.parse_args()
+
+def consultas(ids_detalle):
+    """(nombre, función que construye la consulta a partir del total de carritos)"""
+    from sqlalchemy import select, func
+    from app.models.models import Carrito, CarritoItem
+    from app.routers.carrito import carrito_con_items, carrito_detalle, columnas_resumen
+    from app.core.paginacion import paginar
+
+    return [
+        ("conteo", lambda total: select(func.count()).select_from(Carrito)),
+        ("cursor", lambda total: paginar(carrito_con_items(), Carrito.id, 0, 50, ids_detalle[len(ids_detalle) // 2])),
+        ("skip_profundo", lambda total: paginar(select(*columnas_resumen(Carrito)), Carrito.id, total // 2, 50)),
+        ("detalle", lambda total: carrito_detalle().where(Carrito.id == ids_detalle[-1])),
+        ("items_carrito", lambda total: select(CarritoItem).where(CarritoItem.carrito_id == ids_detalle[-1])),
+    ]
+
+def medir(engine, ids_detalle, repeticiones):
+    from sqlalchemy import select, func
+    from sqlalchemy.orm import Session
+    from app.models.models import Carrito
+
+    tiempos = {}
+    with Session(engine) as sesion:
+        total = sesion.scalar(select(func.count(Carrito.id)))
+        for nombre, consulta in consultas(ids_detalle):
+            sesion.execute(consulta(total)).unique().all()  # calentar la caché de páginas
+            sesion.expunge_all()
+            muestras = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                sesion.execute(consulta(total)).unique().all()
+                muestras.append(time.perf_counter() - inicio)
+                sesion.expunge_all()
+            tiempos[nombre] = statistics.median(muestras) * 1000
+    return tiempos
+
+def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_archivo_")
+
+    from sqlalchemy import select, func
+    from app.database.connection import engine
+    from app.core.archivo import archivar_carritos, contar_archivables, limite_archivo
+    from app.models.models import Carrito
+    from seed_data import generar_datos
+
+    crear_tablas()
+    print(f"Sembrando {args.productos} productos y {args.carritos} carritos en {args.dias} días...")
+    inicio = time.perf_counter()
+    generar_datos(args.productos, args.carritos, args.items, dias=args.dias)
+    print(f"Sembrado en {time.perf_counter() - inicio:.1f}s")
+
+    with engine.connect() as conn:
+        archivables = contar_archivables(conn, limite_archivo(args.archivar_dias))
+        # Carritos que siguen en las tablas activas tras archivar (para medir lo mismo antes y después)
+        recientes = conn.scalars(
+            select(Carrito.id).where(Carrito.estado == "activo").order_by(Carrito.id).limit(1000)
+        ).all()
+    print(f"{archivables} carritos cerrados con más de {args.archivar_dias:g} días")
+
+    antes = medir(engine, recientes, args.repeticiones)
+
+    duraciones = []
+    anterior = [0.0]
+
+    def al_terminar_lote(resultado):
+        duraciones.append(resultado.segundos - anterior[0])
+        anterior[0] = resultado.segundos
+        if resultado.lotes % 500 == 0:
+            print(f"  {resultado}")
+
+    resultado = archivar_carritos(engine, args.archivar_dias, args.lote, pausa=0, al_terminar_lote=al_terminar_lote)
+    print(f"Archivo: {resultado}")
+    if duraciones:
+        print(
+            f"Transacción por lote: p50 {statistics.median(duraciones) * 1000:.1f}ms, "
+            f"máx {max(duraciones) * 1000:.1f}ms"
+        )
+    with engine.connect() as conn:
+        print(f"Quedan {conn.scalar(select(func.count(Carrito.id)))} carritos en las tablas activas")
+
+    despues = medir(engine, recientes, args.repeticiones)
+    print(f"\n{'consulta':<15} {'antes':>10} {'después':>10} {'mejora':>8}")
+    for nombre in antes:
+        print(f"{nombre:<15} {antes[nombre]:>8.2f}ms {despues[nombre]:>8.2f}ms {antes[nombre] / despues[nombre]:>7.1f}x")
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark de arranque: create_all al importar vs verificación de la versión del esquema
+
+Cada medición es un intérprete nuevo que importa `app.main` y prepara el
+esquema como lo hacía antes la API (Base.metadata.create_all en cada arranque,
+que inspecciona cada tabla e índice) o como lo hace ahora (una consulta a
+`alembic_version` en el lifespan). Con --latencia-ms se suma una latencia
+artificial por sentencia para simular una base de datos remota.
+
+Uso:
+    python -m benchmarks.bench_arranque --repeticiones 10 --latencia-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas
+
+MODOS = ("create_all", "version")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--hijo", choices=MODOS, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def contar_sentencias(engine, latencia):
+    """Contar las sentencias ejecutadas y, opcionalmente, simular latencia de red en cada una"""
+    from sqlalchemy import event
+
+    contador = {"sentencias": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar(*_args):
+        contador["sentencias"] += 1
+        if latencia:
+            time.sleep(latencia)
+
+    return contador
+
+def medir_hijo(modo, latencia):
+    """Medición dentro de un intérprete nuevo; imprime el resultado en JSON"""
+    inicio = time.perf_counter()
+    from app.main import app, lifespan
+    importar = time.perf_counter() - inicio
+
+    from app.database.connection import engine, async_engine, Base
+
+    if modo == "create_all":
+        contador = contar_sentencias(engine, latencia)
+        inicio = time.perf_counter()
+        Base.metadata.create_all(bind=engine)
+        esquema = time.perf_counter() - inicio
+    else:
+        contador = contar_sentencias(async_engine.sync_engine, latencia)
+
+        async def arrancar():
+            inicio = time.perf_counter()
+            async with lifespan(app):
+                duracion = time.perf_counter() - inicio
+            return duracion
+
+        esquema = asyncio.run(arrancar())
+
+    print(json.dumps({"importar_s": importar, "esquema_s": esquema, "sentencias": contador["sentencias"]}))
+
+def medir(modo, args):
+    resultados = []
+    for _ in range(args.repeticiones):
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_arranque", "--hijo", modo, "--latencia-ms", str(args.latencia_ms)],
+            capture_output=True, text=True, check=True, env=os.environ.copy()
+        ).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+    return {
+        "importar_ms": statistics.median(r["importar_s"] for r in resultados) * 1000,
+        "esquema_ms": statistics.median(r["esquema_s"] for r in resultados) * 1000,
+        "sentencias": resultados[-1]["sentencias"],
+    }
+
+def main():
+    args = parse_args()
+    if args.hijo:
+        medir_hijo(args.hijo, args.latencia_ms / 1000)
+        return
+
+    configurar_base_de_datos("bench_arranque_")
+    crear_tablas()
+
+    print(f"{args.repeticiones} arranques por modo, latencia {args.latencia_ms}ms por sentencia (mediana)")
+    print(f"{'modo':<12} {'importar':>10} {'esquema':>10} {'total':>10} {'sentencias':>11}")
+    for modo in MODOS:
+        r = medir(modo, args)
+        print(
+            f"{modo:<12} {r['importar_ms']:>8.1f}ms {r['esquema_ms']:>8.1f}ms "
+            f"{r['importar_ms'] + r['esquema_ms']:>8.1f}ms {r['sentencias']:>11}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark de concurrencia: sesión síncrona vs sesión asíncrona
+
+Compara el throughput de GET /productos cuando el handler `async def` usa una
+Session síncrona (bloquea el event loop en cada consulta) frente al router real
+que usa AsyncSession. Se usa SQLite con una latencia artificial por sentencia
+para simular el round trip de red de un servidor de base de datos real.
+
+Nota: con la sesión síncrona una concurrencia mayor que el pool (DB_POOL_SIZE +
+DB_MAX_OVERFLOW, 15 por defecto) bloquea el event loop esperando una conexión
+que solo se libera desde el propio loop, por eso la concurrencia por defecto es 10.
+
+Uso:
+    python -m benchmarks.bench_async --peticiones 400 --concurrencia 10 --latencia-ms 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, insertar_productos, percentil
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--concurrencia", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--productos", type=int, default=200)
+    return parser.parse_args()
+
+def instalar_latencia(engine, async_engine, latencia):
+    """Simular latencia de red dentro del hilo del driver en cada sentencia"""
+    from sqlalchemy import event
+
+    def esperar(_sentencia):
+        time.sleep(latencia)
+
+    @event.listens_for(engine, "connect")
+    def latencia_sync(dbapi_connection, _record):
+        dbapi_connection.set_trace_callback(esperar)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def latencia_async(dbapi_connection, _record):
+        dbapi_connection.run_async(lambda conn: conn.set_trace_callback(esperar))
+
+def crear_app_sincrona():
+    """Aplicación con el patrón anterior: async def + Session síncrona"""
+    from fastapi import FastAPI, Depends
+    from sqlalchemy.orm import Session
+    from app.database.connection import get_db
+    from app.models.models import Producto as ProductoModel
+    from app.schemas.schemas import ProductosListResponse
+
+    app = FastAPI()
+
+    @app.get("/productos/", response_model=ProductosListResponse)
+    async def get_productos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        productos = db.query(ProductoModel).order_by(ProductoModel.id).offset(skip).limit(limit).all()
+        total = db.query(ProductoModel).count()
+        return ProductosListResponse(productos=productos, total=total)
+
+    return app
+
+async def medir(app, peticiones, concurrencia):
+    """Lanzar peticiones concurrentes y devolver (throughput, latencias)"""
+    import httpx
+
+    latencias = []
+    semaforo = asyncio.Semaphore(concurrencia)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def una_peticion():
+            async with semaforo:
+                inicio = time.perf_counter()
+                respuesta = await client.get("/productos/", params={"limit": 20})
+                respuesta.raise_for_status()
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una_peticion() for _ in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+
+    return peticiones / duracion, latencias
+
+def imprimir(nombre, throughput, latencias):
+    print(
+        f"{nombre:<10} {throughput:>9.1f} req/s   "
+        f"p50={statistics.median(latencias) * 1000:>7.1f} ms   "
+        f"p99={percentil(latencias, 99) * 1000:>7.1f} ms"
+    )
+
+async def main():
+    args = parse_args()
+    ruta = configurar_base_de_datos("bench_async_")
+
+    from app.database.connection import engine, async_engine
+
+    crear_tablas()
+    insertar_productos(engine, args.productos)
+
+    instalar_latencia(engine, async_engine, args.latencia_ms / 1000)
+
+    from app.main import app as app_asincrona
+
+    print(f"Base de datos: {ruta}")
+    print(f"{args.peticiones} peticiones, concurrencia {args.concurrencia}, latencia {args.latencia_ms} ms/sentencia\n")
+
+    imprimir("sync", *await medir(crear_app_sincrona(), args.peticiones, args.concurrencia))
+    imprimir("async", *await medir(app_asincrona, args.peticiones, args.concurrencia))
+
+    await async_engine.dispose()
+    engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
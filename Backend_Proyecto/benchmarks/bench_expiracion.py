@@ -0,0 +1,73 @@
+"""
+Benchmark de expiración de carritos: tamaño de lote vs filas/s y duración de cada transacción
+
+Siembra un historial con `seed_data.generar_datos` (los carritos activos
+quedan repartidos en el último año) y cancela los abandonados con distintos
+tamaños de lote. Para cada uno reporta filas/s y la transacción más larga,
+que es lo que bloquea a los checkouts concurrentes (en SQLite, toda la base).
+"Sin lotes" es un único UPDATE. Entre pasadas se restauran los carritos.
+
+Uso:
+    python -m benchmarks.bench_expiracion --carritos 500000 --lotes 100,1000,10000
+"""
+import argparse
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--carritos", type=int, default=200000)
+    parser.add_argument("--horas", type=float, default=24 * 30, help="Horas sin actividad")
+    parser.add_argument("--lotes", default="100,1000,10000", help="Tamaños de lote separados por coma")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_expiracion_")
+
+    from sqlalchemy import update
+    from app.database.connection import engine
+    from app.core.expiracion import expirar_carritos, contar_abandonados, limite_inactividad
+    from app.models.models import Carrito
+    from seed_data import generar_datos
+
+    crear_tablas()
+    print(f"Sembrando {args.productos} productos y {args.carritos} carritos...")
+    generar_datos(args.productos, args.carritos)
+    with engine.connect() as conn:
+        abandonados = contar_abandonados(conn, limite_inactividad(args.horas))
+    print(f"{abandonados} carritos activos sin actividad en {args.horas:g} horas")
+
+    def restaurar():
+        # El seed no rellena fecha_actualizacion: solo la tienen los que canceló la pasada
+        with engine.begin() as conn:
+            conn.execute(
+                update(Carrito)
+                .where(Carrito.estado == "cancelado", Carrito.fecha_actualizacion.is_not(None))
+                .values(estado="activo", fecha_actualizacion=None)
+            )
+
+    print(f"\n{'lote':>10} {'filas':>9} {'lotes':>7} {'total':>9} {'filas/s':>11} {'tx más larga':>13}")
+    for tamano in [int(lote) for lote in args.lotes.split(",")] + [None]:
+        duraciones = []
+        anterior = [0.0]
+
+        def al_terminar_lote(resultado):
+            duraciones.append(resultado.segundos - anterior[0])
+            anterior[0] = resultado.segundos
+
+        resultado = expirar_carritos(
+            engine, args.horas, tamano or abandonados + 1, pausa=0, al_terminar_lote=al_terminar_lote
+        )
+        etiqueta = str(tamano) if tamano else "sin lotes"
+        print(
+            f"{etiqueta:>10} {resultado.filas:>9} {resultado.lotes:>7} {resultado.segundos:>8.2f}s "
+            f"{resultado.filas_por_segundo:>11,.0f} {max(duraciones) * 1000:>11.1f}ms"
+        )
+        restaurar()
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
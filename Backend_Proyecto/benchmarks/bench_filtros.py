@@ -0,0 +1,72 @@
+"""
+Benchmark de búsqueda y filtros de productos
+
+Siembra un catálogo grande en SQLite y mide GET /productos con distintas
+combinaciones de filtros, primero con los índices compuestos del modelo y
+después sin ellos.
+
+Uso:
+    python -m benchmarks.bench_filtros --productos 200000 --repeticiones 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, insertar_productos, resumen
+
+CONSULTAS = {
+    "categoria": {"categoria": "Categoria 7"},
+    "categoria+precio": {"categoria": "Categoria 7", "precio_min": 100, "precio_max": 120},
+    "precio+en_stock": {"precio_min": 100, "precio_max": 105, "en_stock": "true"},
+    "orden precio_desc": {"orden": "precio_desc"},
+    "texto": {"q": "producto 1999"},
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    return parser.parse_args()
+
+async def medir_todas(client, args, etiqueta):
+    for nombre, params in CONSULTAS.items():
+        latencias = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            respuesta = await client.get("/productos/", params={**params, "limit": args.limit})
+            respuesta.raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+        r = resumen(latencias)
+        print(f"{etiqueta:<12} {nombre:<20} {r['p50_ms']:>8.2f}ms {r['p95_ms']:>8.2f}ms")
+
+async def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_filtros_")
+
+    import httpx
+    from app.database.connection import engine, async_engine
+    from app.models.models import Producto
+
+    crear_tablas()
+    print(f"Insertando {args.productos} productos...")
+    insertar_productos(engine, args.productos)
+
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"\n{'índices':<12} {'consulta':<20} {'p50':>10} {'p95':>10}")
+        await medir_todas(client, args, "con")
+
+        await async_engine.dispose()
+        for index in Producto.__table__.indexes:
+            if index.name.startswith("ix_productos_") and len(index.columns) > 1:
+                index.drop(bind=engine)
+        await medir_todas(client, args, "sin")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""
+Benchmark de paginación: desplazamiento (skip/limit) vs cursor (after_id)
+
+Siembra un catálogo grande en SQLite y mide la latencia de GET /productos
+para páginas cada vez más profundas en ambos modos, con y sin total.
+
+Uso:
+    python -m benchmarks.bench_paginacion --productos 200000 --repeticiones 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, insertar_productos, resumen
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    return parser.parse_args()
+
+async def medir(client, params, repeticiones):
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = await client.get("/productos/", params=params)
+        respuesta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+    return resumen(latencias)
+
+async def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_paginacion_")
+
+    import httpx
+    from app.database.connection import engine, async_engine
+
+    crear_tablas()
+    print(f"Insertando {args.productos} productos...")
+    insertar_productos(engine, args.productos)
+
+    from app.main import app
+
+    profundidades = [0, args.productos // 10, args.productos // 2, args.productos - args.limit]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"\n{'profundidad':>12} {'modo':<22} {'p50':>9} {'p95':>9}")
+        for profundidad in profundidades:
+            modos = {
+                "skip": {"skip": profundidad, "limit": args.limit},
+                "after_id": {"after_id": profundidad, "limit": args.limit},
+                "after_id sin total": {"after_id": profundidad, "limit": args.limit, "include_total": "false"},
+            }
+            for modo, params in modos.items():
+                r = await medir(client, params, args.repeticiones)
+                print(f"{profundidad:>12} {modo:<22} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Benchmark de reportes de ventas: rollup ventas_diarias vs agregación sobre carrito_items
+
+Siembra un historial con `seed_data.generar_datos`, reconstruye el rollup
+(midiendo filas por segundo) y compara la latencia de cada reporte leído del
+rollup frente a la misma agregación con GROUP BY sobre carrito_items,
+carritos y productos (lo que haría falta sin el rollup).
+
+Uso:
+    python -m benchmarks.bench_reportes --productos 5000 --carritos 200000 --repeticiones 20
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=5000)
+    parser.add_argument("--carritos", type=int, default=200000)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    return parser.parse_args()
+
+def consultas():
+    """(nombre, consulta sobre el rollup, consulta equivalente sobre el historial)"""
+    from sqlalchemy import select, func
+    from app.core.ventas import consulta_ventas, ESTADO_COMPLETADO
+    from app.models.models import Carrito, VentaDiaria
+
+    historial = consulta_ventas(Carrito.estado == ESTADO_COMPLETADO).subquery()
+    unidades, ingresos = func.sum(VentaDiaria.unidades), func.sum(VentaDiaria.ingresos)
+    return [
+        (
+            "por_dia",
+            select(VentaDiaria.dia, unidades, ingresos).group_by(VentaDiaria.dia),
+            select(historial.c.dia, func.sum(historial.c.unidades), func.sum(historial.c.ingresos))
+            .group_by(historial.c.dia),
+        ),
+        (
+            "por_categoria",
+            select(VentaDiaria.categoria, unidades, ingresos).group_by(VentaDiaria.categoria),
+            select(historial.c.categoria, func.sum(historial.c.unidades), func.sum(historial.c.ingresos))
+            .group_by(historial.c.categoria),
+        ),
+        (
+            "top_productos",
+            select(VentaDiaria.producto_id, ingresos).group_by(VentaDiaria.producto_id)
+            .order_by(ingresos.desc()).limit(50),
+            select(historial.c.producto_id, func.sum(historial.c.ingresos)).group_by(historial.c.producto_id)
+            .order_by(func.sum(historial.c.ingresos).desc()).limit(50),
+        ),
+    ]
+
+def medir(conn, consulta, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conn.execute(consulta).all()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+def main():
+    args = parse_args()
+    configurar_base_de_datos("bench_reportes_")
+
+    from sqlalchemy import select, func
+    from app.database.connection import engine
+    from app.core.ventas import recalcular_ventas
+    from app.models.models import CarritoItem
+    from seed_data import generar_datos
+
+    crear_tablas()
+    print(f"Sembrando {args.productos} productos y {args.carritos} carritos...")
+    generar_datos(args.productos, args.carritos, args.items)
+
+    with engine.begin() as conn:
+        items = conn.scalar(select(func.count(CarritoItem.id)))
+        inicio = time.perf_counter()
+        filas = recalcular_ventas(conn)
+        duracion = time.perf_counter() - inicio
+    print(f"Rollup reconstruido: {items} items -> {filas} filas en {duracion:.2f}s ({items / duracion:,.0f} items/s)")
+
+    print(f"\n{'reporte':<15} {'rollup':>10} {'historial':>11} {'mejora':>8}")
+    with engine.connect() as conn:
+        for nombre, rollup, historial in consultas():
+            t_rollup = medir(conn, rollup, args.repeticiones)
+            t_historial = medir(conn, historial, max(1, args.repeticiones // 4))
+            print(f"{nombre:<15} {t_rollup:>8.2f}ms {t_historial:>9.2f}ms {t_historial / t_rollup:>7.1f}x")
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark de serialización y tamaño de respuesta
+
+Construye páginas de carritos con items y productos anidados (como las de
+GET /carrito) y mide, sin base de datos ni red:
+
+- antes: validación + volcado de `response_model` de FastAPI y JSONResponse (json)
+- orjson: el mismo camino de FastAPI con RespuestaJSON (orjson)
+- directo: RespuestaJSON con el modelo (serializador de pydantic, sin revalidar)
+
+y el tamaño del cuerpo sin comprimir, con gzip y con brotli (si está instalado).
+
+Uso:
+    python -m benchmarks.bench_serializacion --carritos 100 --items 5 --repeticiones 200
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import benchmarks.comun  # noqa: F401 (agrega el proyecto al sys.path)
+from benchmarks.comun import resumen
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--carritos", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    return parser.parse_args()
+
+def construir_pagina(carritos: int, items: int):
+    from app.schemas.schemas import CarritosListResponse
+
+    ahora = datetime.now()
+    return CarritosListResponse(
+        carritos=[
+            {
+                "id": c,
+                "fecha_creacion": ahora,
+                "fecha_actualizacion": ahora,
+                "total": 19.9 * items,
+                "estado": "activo",
+                "items": [
+                    {
+                        "id": c * items + i,
+                        "producto_id": (c * 7 + i) % 1000,
+                        "cantidad": 1 + i % 3,
+                        "precio_unitario": 19.9,
+                        "subtotal": 19.9 * (1 + i % 3),
+                        "producto": {
+                            "id": (c * 7 + i) % 1000,
+                            "nombre": f"Producto {(c * 7 + i) % 1000}",
+                            "descripcion": f"Descripción del producto {(c * 7 + i) % 1000} con detalles de uso",
+                            "precio": 19.9,
+                            "stock": (c + i) % 50,
+                            "imagen_url": f"https://cdn.ejemplo.com/productos/{(c * 7 + i) % 1000}.jpg",
+                            "categoria": f"Categoria {i % 20}",
+                            "fecha_creacion": ahora,
+                        },
+                    }
+                    for i in range(items)
+                ],
+            }
+            for c in range(carritos)
+        ],
+        total=carritos * 10,
+        next_cursor=carritos,
+    )
+
+async def medir(funcion, repeticiones):
+    latencias = []
+    cuerpo = b""
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = await funcion()
+        latencias.append(time.perf_counter() - inicio)
+    return resumen(latencias), cuerpo
+
+async def main():
+    args = parse_args()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from app.schemas.schemas import CarritosListResponse
+    from app.core.respuestas import RespuestaJSON
+    from app.core.compresion import CompresorGzip, CompresorBrotli, brotli
+
+    pagina = construir_pagina(args.carritos, args.items)
+    campo = create_model_field("Response", CarritosListResponse, mode="serialization")
+
+    async def antes():
+        return JSONResponse(await serialize_response(field=campo, response_content=pagina)).body
+
+    async def con_orjson():
+        return RespuestaJSON(await serialize_response(field=campo, response_content=pagina)).body
+
+    async def directo():
+        return RespuestaJSON(pagina).body
+
+    print(f"Página de {args.carritos} carritos con {args.items} items cada uno\n")
+    print(f"{'modo':<10} {'p50':>9} {'p95':>9} {'bytes':>10}")
+    cuerpo = b""
+    for nombre, funcion in (("antes", antes), ("orjson", con_orjson), ("directo", directo)):
+        r, cuerpo = await medir(funcion, args.repeticiones)
+        print(f"{nombre:<10} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {len(cuerpo):>10}")
+
+    compresores = {"gzip": CompresorGzip}
+    if brotli is not None:
+        compresores["br"] = CompresorBrotli
+    print(f"\n{'codificación':<12} {'p50':>9} {'bytes':>10} {'ratio':>7}")
+    for nombre, clase in compresores.items():
+        async def comprimir():
+            compresor = clase()
+            return compresor.comprimir(cuerpo) + compresor.terminar()
+        r, comprimido = await medir(comprimir, args.repeticiones)
+        print(f"{nombre:<12} {r['p50_ms']:>7.2f}ms {len(comprimido):>10} {len(comprimido) / len(cuerpo):>7.1%}")
+    if brotli is None:
+        print("(brotli no está instalado: pip install brotli)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""
+Comparar dos resultados JSON de benchmarks.bench_api (por ejemplo, entre commits)
+
+Uso:
+    python -m benchmarks.comparar antes.json despues.json
+"""
+import argparse
+import json
+
+METRICAS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    return parser.parse_args()
+
+def cargar(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+def variacion(antes, despues):
+    if not antes:
+        return "   n/a"
+    return f"{(despues - antes) / antes:+6.1%}"
+
+def main():
+    args = parse_args()
+    base, nuevo = cargar(args.base), cargar(args.nuevo)
+    print(f"base: {base.get('commit')} ({base.get('fecha')})  nuevo: {nuevo.get('commit')} ({nuevo.get('fecha')})")
+
+    for modo, endpoints in nuevo["resultados"].items():
+        anteriores = base["resultados"].get(modo, {})
+        print(f"\n[{modo}]")
+        print(f"{'endpoint':<20}" + "".join(f"{metrica:>26}" for metrica in METRICAS))
+        for nombre, actual in endpoints.items():
+            anterior = anteriores.get(nombre)
+            if anterior is None:
+                continue
+            celdas = "".join(
+                f"{anterior[m]:>9} -> {actual[m]:>9} {variacion(anterior[m], actual[m])}"
+                for m in METRICAS
+            )
+            print(f"{nombre:<20}{celdas}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Utilidades compartidas por los benchmarks
+"""
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def configurar_base_de_datos(prefijo: str = "bench_"):
+    """Crear una base SQLite temporal y apuntar la aplicación a ella.
+
+    Debe llamarse antes de importar cualquier módulo de `app`.
+    """
+    directorio = tempfile.mkdtemp(prefix=prefijo)
+    ruta = os.path.join(directorio, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    return ruta
+
+def crear_tablas():
+    """Crear el esquema completo en la base temporal con las migraciones"""
+    from alembic import command
+    from app.database.esquema import configuracion_alembic
+
+    command.upgrade(configuracion_alembic(configurar_logging=False), "head")
+
+def insertar_productos(engine, cantidad: int, lote: int = 10000):
+    """Insertar productos sintéticos en lotes con executemany"""
+    from sqlalchemy import insert
+    from app.models.models import Producto
+
+    with engine.begin() as conn:
+        for inicio in range(0, cantidad, lote):
+            conn.execute(insert(Producto), [
+                {
+                    "nombre": f"Producto {i}",
+                    "descripcion": f"Descripción del producto {i}",
+                    "precio": 10.0 + (i % 500),
+                    "stock": i % 50,
+                    "categoria": f"Categoria {i % 20}",
+                }
+                for i in range(inicio, min(inicio + lote, cantidad))
+            ])
+
+def percentil(valores, p):
+    """Percentil por el método del rango más cercano"""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def resumen(latencias):
+    """p50/p95/p99 en milisegundos"""
+    return {
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+    }
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(puerto):
+    """Levantar la API con uvicorn en un hilo; devuelve (servidor, hilo)"""
+    import uvicorn
+    from app.main import app
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, hilo
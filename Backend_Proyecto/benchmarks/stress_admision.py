@@ -0,0 +1,149 @@
+"""
+Estrés de sobrecarga: control de admisión activado vs desactivado
+
+Lanza más clientes concurrentes de los que admite el pool (exports y reportes,
+lecturas de listados y escrituras de carrito a la vez) con una latencia
+artificial por sentencia y un pool pequeño. Cada modo corre en un intérprete
+nuevo sobre la misma base sembrada y reporta, por clase de petición, cuántas
+terminaron bien, cuántas recibieron 503 (rechazo rápido) o un error, y la
+latencia de las exitosas.
+
+Uso:
+    python -m benchmarks.stress_admision --clientes 200 --duracion 15 --latencia-ms 5 --pool 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, resumen
+
+MODOS = {"con_admision": "1", "sin_admision": "0"}
+CLASES = ("carrito", "general", "masiva")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clientes", type=int, default=60)
+    parser.add_argument("--duracion", type=float, default=15, help="Segundos de carga por modo")
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--carritos", type=int, default=20000)
+    parser.add_argument("--pool", type=int, default=5, help="DB_POOL_SIZE (sin overflow); también el límite de admisión")
+    parser.add_argument("--limite-carrito", type=int, default=0, help="ADMISSION_CART_MAX_CONCURRENT (0 = sin límite propio)")
+    parser.add_argument("--espera-cola", type=float, default=2, help="ADMISSION_QUEUE_TIMEOUT en segundos")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+async def cargar(args):
+    """Carga dentro del intérprete hijo; imprime el resultado por clase en JSON"""
+    import httpx
+    from sqlalchemy import select
+    from app.main import app
+    from app.database.connection import async_engine
+    from app.models.models import Producto, Carrito
+    from benchmarks.bench_async import instalar_latencia
+    from app.database.connection import engine
+
+    with engine.connect() as conn:
+        ids_productos = list(conn.scalars(select(Producto.id).where(Producto.stock >= 50)))
+        ids_activos = list(conn.scalars(select(Carrito.id).where(Carrito.estado == "activo")))
+    instalar_latencia(engine, async_engine, args.latencia_ms / 1000)
+
+    peticiones = {
+        "carrito": lambda client, azar: client.put(f"/carrito/{azar.choice(ids_activos)}", json={
+            "items": [{"producto_id": azar.choice(ids_productos), "cantidad": 1}]
+        }),
+        "general": lambda client, azar: client.get("/carrito/", params={
+            "after_id": azar.randint(1, args.carritos), "limit": 20, "include_total": "false"
+        }),
+        "masiva": lambda client, azar: client.get("/reportes/ventas/productos", params={"limit": 20}),
+    }
+    resultados = {clase: {"ok": 0, "503": 0, "error": 0, "latencias": []} for clase in CLASES}
+    fin = time.perf_counter() + args.duracion
+
+    async def cliente(numero, client):
+        azar = random.Random(numero)
+        # Mezcla de tráfico: 10% escrituras de carrito, 20% reportes, 70% listados
+        clase = CLASES[0] if numero % 10 == 0 else CLASES[2] if numero % 10 in (1, 2) else CLASES[1]
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                respuesta = await peticiones[clase](client, azar)
+                codigo = respuesta.status_code
+            except Exception:
+                codigo = 500
+            registro = resultados[clase]
+            if codigo < 400:
+                registro["ok"] += 1
+                registro["latencias"].append(time.perf_counter() - inicio)
+            elif codigo == 503:
+                registro["503"] += 1
+                await asyncio.sleep(float(respuesta.headers.get("retry-after", 1)) * azar.random())
+            else:
+                registro["error"] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=120) as client:
+        await asyncio.gather(*(cliente(numero, client) for numero in range(args.clientes)))
+    await async_engine.dispose()
+
+    print(json.dumps({
+        clase: {
+            "ok": datos["ok"], "503": datos["503"], "error": datos["error"],
+            **(resumen(datos["latencias"]) if datos["latencias"] else {}),
+        }
+        for clase, datos in resultados.items()
+    }))
+
+def main():
+    args = parse_args()
+    if args.hijo:
+        asyncio.run(cargar(args))
+        return
+
+    configurar_base_de_datos("stress_admision_")
+    from app.database.connection import engine
+    from app.core.ventas import recalcular_ventas
+    from seed_data import generar_datos
+
+    crear_tablas()
+    print(f"Sembrando {args.productos} productos y {args.carritos} carritos...")
+    generar_datos(args.productos, args.carritos)
+    with engine.begin() as conn:
+        recalcular_ventas(conn)
+    engine.dispose()
+
+    entorno = {
+        **os.environ,
+        # Pool pequeño y espera corta para que la saturación se vea en segundos
+        "DB_POOL_SIZE": str(args.pool), "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": "5",
+        "ADMISSION_QUEUE_TIMEOUT": str(args.espera_cola),
+        "ADMISSION_CART_MAX_CONCURRENT": str(args.limite_carrito),
+        "SLOW_REQUEST_MS": "60000", "PRODUCT_CACHE_ENABLED": "0",
+    }
+    print(
+        f"{args.clientes} clientes durante {args.duracion}s, latencia {args.latencia_ms}ms por sentencia, "
+        f"pool de {args.pool}, espera máxima en cola {args.espera_cola}s"
+    )
+    for modo, habilitado in MODOS.items():
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.stress_admision", "--hijo",
+             "--clientes", str(args.clientes), "--duracion", str(args.duracion),
+             "--latencia-ms", str(args.latencia_ms), "--carritos", str(args.carritos)],
+            capture_output=True, text=True, check=True, env={**entorno, "ADMISSION_ENABLED": habilitado}
+        ).stdout
+        resultados = json.loads(salida.strip().splitlines()[-1])
+        print(f"\n[{modo}]")
+        print(f"{'clase':<10} {'ok':>7} {'503':>7} {'error':>7} {'p50':>10} {'p95':>10} {'p99':>10}")
+        for clase, r in resultados.items():
+            print(
+                f"{clase:<10} {r['ok']:>7} {r['503']:>7} {r['error']:>7} "
+                f"{r.get('p50_ms', 0):>8.1f}ms {r.get('p95_ms', 0):>8.1f}ms {r.get('p99_ms', 0):>8.1f}ms"
+            )
+
+if __name__ == "__main__":
+    main()
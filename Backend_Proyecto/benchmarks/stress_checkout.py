@@ -0,0 +1,132 @@
+"""
+Prueba de estrés de checkout concurrente contra SQLite
+
+Levanta la API con uvicorn en un hilo y lanza muchos hilos que crean
+carritos y los completan a la vez sobre pocos productos con poco stock.
+Mientras cada checkout está en curso, otro hilo agrega un item al mismo
+carrito (edición contra checkout): la edición debe aplicarse antes del
+checkout o rechazarse con 409. Al final comprueba que ningún stock quedó
+negativo y que el stock vendido coincide exactamente con los items de los
+carritos completados.
+
+Uso:
+    python -m benchmarks.stress_checkout --hilos 16 --carritos 400 --stock 50
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, puerto_libre, iniciar_servidor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--carritos", type=int, default=400)
+    parser.add_argument("--productos", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=50)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configurar_base_de_datos("stress_checkout_")
+
+    import httpx
+    from sqlalchemy import insert, select
+    from app.database.connection import engine, SessionLocal
+    from app.models.models import Producto, Carrito
+
+    crear_tablas()
+    with engine.begin() as conn:
+        conn.execute(insert(Producto), [
+            {"nombre": f"Producto {i}", "precio": 10.0, "stock": args.stock}
+            for i in range(args.productos)
+        ])
+
+    puerto = puerto_libre()
+    servidor, hilo = iniciar_servidor(puerto)
+    base_url = f"http://127.0.0.1:{puerto}"
+    resultados = {"completados": 0, "rechazados": 0, "errores": 0}
+    ediciones = {"aplicadas": 0, "rechazadas": 0, "errores": 0}
+    candado = threading.Lock()
+
+    def editar(carrito_id):
+        """Agregar un item durante el checkout del carrito"""
+        item = {"producto_id": random.randint(1, args.productos), "cantidad": 1}
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            respuesta = client.post(f"/carrito/{carrito_id}/items", json=item)
+        if respuesta.status_code == 200:
+            clave = "aplicadas"
+        elif respuesta.status_code in (400, 409):
+            clave = "rechazadas"
+        else:
+            clave = "errores"
+        with candado:
+            ediciones[clave] += 1
+
+    def comprar(_):
+        items = [
+            {"producto_id": producto_id, "cantidad": random.randint(1, 3)}
+            for producto_id in random.sample(range(1, args.productos + 1), k=random.randint(1, args.productos))
+        ]
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            creado = client.post("/carrito/", json={"items": [{**i, "cantidad": 1} for i in items]})
+            if creado.status_code != 201:
+                clave = "rechazados" if creado.status_code == 400 else "errores"
+            else:
+                carrito_id = creado.json()["carrito"]["id"]
+                # Fijar las cantidades reales y completar de inmediato para maximizar la contención
+                client.put(f"/carrito/{carrito_id}", json={"items": items})
+                edicion = threading.Thread(target=editar, args=(carrito_id,))
+                edicion.start()
+                respuesta = client.post(f"/carrito/{carrito_id}/checkout")
+                edicion.join()
+                if respuesta.status_code == 200:
+                    clave = "completados"
+                elif respuesta.status_code in (400, 409):
+                    clave = "rechazados"
+                else:
+                    clave = "errores"
+        with candado:
+            resultados[clave] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as pool:
+        list(pool.map(comprar, range(args.carritos)))
+    duracion = time.perf_counter() - inicio
+
+    servidor.should_exit = True
+    hilo.join()
+
+    db = SessionLocal()
+    stocks = dict(db.execute(select(Producto.id, Producto.stock)).all())
+    completados = db.scalars(select(Carrito).where(Carrito.estado == "completado")).all()
+    vendido = {}
+    for carrito in completados:
+        for item in carrito.items:
+            vendido[item.producto_id] = vendido.get(item.producto_id, 0) + item.cantidad
+    db.close()
+
+    print(f"{args.carritos} carritos en {duracion:.2f}s ({args.carritos / duracion:.1f} checkouts/s)")
+    print(f"Resultados: {resultados}")
+    print(f"Ediciones durante el checkout: {ediciones}")
+    print(f"Stock final: {stocks}")
+
+    negativos = {pid: stock for pid, stock in stocks.items() if stock < 0}
+    descuadres = {
+        pid: (stock, vendido.get(pid, 0))
+        for pid, stock in stocks.items()
+        if stock + vendido.get(pid, 0) != args.stock
+    }
+    if negativos or descuadres or resultados["errores"] or ediciones["errores"]:
+        print(
+            f"❌ Stock negativo: {negativos} / descuadres (stock, vendido): {descuadres} / "
+            f"errores: {resultados['errores']} checkouts, {ediciones['errores']} ediciones"
+        )
+        sys.exit(1)
+    print("✅ Ningún stock negativo y el stock vendido coincide con los items de los carritos completados")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Estrés del feed SSE de productos: ráfagas de escrituras con clientes rápidos y lentos
+
+Varios escritores cambian el stock de un conjunto pequeño de productos con
+PUT /productos/{id} (cada escritura fija un valor único) mientras clientes
+conectados a GET /productos/eventos leen el flujo; una parte de ellos es
+lenta (duerme tras cada mensaje). La API corre con uvicorn porque el
+transporte ASGI de httpx no entrega las respuestas en streaming. Reporta
+escrituras, publicaciones y eventos agrupados, mensajes por cliente, la
+latencia escritura → evento y cuántas veces hubo que resincronizar.
+
+Uso:
+    python -m benchmarks.stress_eventos --clientes 50 --lentos 10 --escritores 8 --duracion 10
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+import orjson
+
+from benchmarks.comun import configurar_base_de_datos, crear_tablas, puerto_libre, iniciar_servidor, resumen
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=20, help="Productos que reciben las escrituras")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--lentos", type=int, default=10, help="Cuántos de los clientes son lentos")
+    parser.add_argument("--pausa-lento", type=float, default=0.5, help="Segundos que duerme un cliente lento por mensaje")
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--duracion", type=float, default=10)
+    return parser.parse_args()
+
+async def ejecutar(args):
+    import httpx
+    from app.core.eventos import cambios_productos
+
+    escrituras = {}  # (producto_id, stock) -> instante de la escritura
+    contador = itertools.count(1000)
+    fin = time.perf_counter() + args.duracion
+
+    async def escritor(client, ids, numero):
+        while time.perf_counter() < fin:
+            producto_id = ids[(numero + next(contador)) % len(ids)]
+            stock = next(contador)
+            inicio = time.perf_counter()
+            respuesta = await client.put(f"/productos/{producto_id}", json={"stock": stock})
+            if respuesta.status_code == 200:
+                escrituras[(producto_id, stock)] = inicio
+
+    async def cliente(client, lento: bool, resultado: dict):
+        async with client.stream("GET", "/productos/eventos") as respuesta:
+            pendiente = b""
+            async for trozo in respuesta.aiter_bytes():
+                pendiente += trozo
+                while b"\n\n" in pendiente:
+                    mensaje, pendiente = pendiente.split(b"\n\n", 1)
+                    recibido = time.perf_counter()
+                    if mensaje.startswith(b"event: resincronizar"):
+                        resultado["resincronizar"] += 1
+                    elif mensaje.startswith(b"event: productos"):
+                        resultado["mensajes"] += 1
+                        for evento in orjson.loads(mensaje.split(b"data: ", 1)[1]):
+                            resultado["eventos"] += 1
+                            escrito = escrituras.get((evento["id"], evento.get("stock")))
+                            if escrito is not None:
+                                resultado["latencias"].append(recibido - escrito)
+                    if lento:
+                        await asyncio.sleep(args.pausa_lento)
+                if time.perf_counter() >= fin + 1:
+                    return
+
+    puerto = puerto_libre()
+    servidor, hilo = iniciar_servidor(puerto)
+    try:
+        limites = httpx.Limits(max_connections=args.clientes + args.escritores + 10)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", timeout=60, limits=limites) as client:
+            ids = []
+            for numero in range(args.productos):
+                respuesta = await client.post("/productos/", json={
+                    "nombre": f"Producto {numero}", "precio": 10.0, "stock": 100, "categoria": "stress"
+                })
+                ids.append(respuesta.json()["producto"]["id"])
+
+            resultados = [
+                {"lento": numero < args.lentos, "mensajes": 0, "eventos": 0, "resincronizar": 0, "latencias": []}
+                for numero in range(args.clientes)
+            ]
+            lectores = [asyncio.create_task(cliente(client, r["lento"], r)) for r in resultados]
+            await asyncio.sleep(0.2)
+            await asyncio.gather(*(escritor(client, ids, numero) for numero in range(args.escritores)))
+            await asyncio.sleep(1)
+            estadisticas = cambios_productos.estadisticas()
+            for lector in lectores:
+                lector.cancel()
+            await asyncio.gather(*lectores, return_exceptions=True)
+    finally:
+        servidor.should_exit = True
+        hilo.join()
+    return escrituras, resultados, estadisticas
+
+def main():
+    args = parse_args()
+    configurar_base_de_datos("stress_eventos_")
+    crear_tablas()
+
+    escrituras, resultados, estadisticas = asyncio.run(ejecutar(args))
+    print(
+        f"{len(escrituras)} escrituras en {args.duracion}s sobre {args.productos} productos → "
+        f"{estadisticas['publicaciones']} publicaciones con {estadisticas['eventos_publicados']} eventos"
+    )
+    print(
+        f"Pendientes reemplazados en clientes: {estadisticas['reemplazados']}, "
+        f"resincronizaciones: {estadisticas['resincronizaciones']}"
+    )
+    for tipo, lento in (("rápidos", False), ("lentos", True)):
+        grupo = [r for r in resultados if r["lento"] == lento]
+        if not grupo:
+            continue
+        latencias = [latencia for r in grupo for latencia in r["latencias"]]
+        mensajes = sum(r["mensajes"] for r in grupo) / len(grupo)
+        eventos = sum(r["eventos"] for r in grupo) / len(grupo)
+        linea = f"Clientes {tipo} ({len(grupo)}): {mensajes:.0f} mensajes y {eventos:.0f} eventos por cliente"
+        if latencias:
+            r = resumen(latencias)
+            linea += f", escritura → evento p50 {r['p50_ms']:.0f}ms p95 {r['p95_ms']:.0f}ms p99 {r['p99_ms']:.0f}ms"
+        print(linea)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Script para cancelar los carritos activos abandonados
+
+    python expirar_carritos.py                       # sin actividad en CART_EXPIRY_HOURS (72)
+    python expirar_carritos.py --horas 24 --lote 500
+    python expirar_carritos.py --simular             # solo contar los que se cancelarían
+
+Pensado para cron o un job programado; con CART_EXPIRY_ENABLED=true la API
+hace lo mismo en segundo plano. Cada lote es un UPDATE en su propia
+transacción, así que puede ejecutarse con la API en marcha.
+"""
+import argparse
+from app.core.config import CART_EXPIRY_HOURS, CART_EXPIRY_BATCH_SIZE, CART_EXPIRY_PAUSE
+from app.database.connection import engine
+from app.core.expiracion import expirar_carritos, contar_abandonados, limite_inactividad
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cancelar los carritos activos sin actividad reciente")
+    parser.add_argument("--horas", type=float, default=CART_EXPIRY_HOURS, help="Horas sin actividad")
+    parser.add_argument("--lote", type=int, default=CART_EXPIRY_BATCH_SIZE, help="Carritos por UPDATE")
+    parser.add_argument("--pausa", type=float, default=CART_EXPIRY_PAUSE, help="Segundos entre lotes")
+    parser.add_argument("--simular", action="store_true", help="Contar sin modificar")
+    parser.add_argument("--progreso", action="store_true", help="Mostrar el avance de cada lote")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.simular:
+            with engine.connect() as conn:
+                total = contar_abandonados(conn, limite_inactividad(args.horas))
+            print(f"{total} carritos activos sin actividad en {args.horas:g} horas")
+        else:
+            print(f"Cancelando carritos activos sin actividad en {args.horas:g} horas (lotes de {args.lote})...")
+            progreso = (lambda resultado: print(f"  {resultado}")) if args.progreso else None
+            resultado = expirar_carritos(engine, args.horas, args.lote, args.pausa, progreso)
+            print(f"✅ {resultado}")
+    except Exception as e:
+        print(f"❌ Error al expirar los carritos: {e}")
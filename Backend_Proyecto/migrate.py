@@ -1,51 +1,70 @@
 """
-Script para ejecutar las migraciones y crear las tablas en la base de datos
+Script para ejecutar las migraciones de la base de datos (Alembic)
+
+    python migrate.py            # aplicar las migraciones pendientes (upgrade head)
+    python migrate.py status     # versión aplicada y versión esperada
+    python migrate.py drop       # deshacer todas las migraciones (elimina las tablas)
+    python migrate.py reset      # drop + upgrade
+
+Las migraciones viven en migrations/versions; para crear una nueva:
+    alembic revision -m "descripcion"
 """
-from app.database.connection import engine, Base
-from app.models.models import Producto, Carrito, CarritoItem
+from alembic import command
+from sqlalchemy import inspect
+from app.database.connection import engine
+from app.database.esquema import configuracion_alembic, version_esperada
 
 def create_tables():
-    """Crear todas las tablas en la base de datos"""
+    """Aplicar todas las migraciones pendientes"""
     try:
-        print("Creando tablas en la base de datos...")
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tablas creadas exitosamente!")
-        
-        # Mostrar las tablas que se crearon
-        print("\nTablas creadas:")
-        for table in Base.metadata.tables.keys():
-            print(f"  - {table}")
-            
+        print("Aplicando migraciones...")
+        command.upgrade(configuracion_alembic(), "head")
+        print(f"✅ Base de datos en la versión {version_esperada()}")
     except Exception as e:
-        print(f"❌ Error al crear las tablas: {e}")
+        print(f"❌ Error al aplicar las migraciones: {e}")
         return False
-    
+
     return True
 
 def drop_tables():
-    """Eliminar todas las tablas de la base de datos"""
+    """Deshacer todas las migraciones (elimina las tablas)"""
     try:
         print("Eliminando tablas de la base de datos...")
-        Base.metadata.drop_all(bind=engine)
+        command.downgrade(configuracion_alembic(), "base")
         print("✅ Tablas eliminadas exitosamente!")
     except Exception as e:
         print(f"❌ Error al eliminar las tablas: {e}")
         return False
-    
+
     return True
 
+def status():
+    """Mostrar la versión aplicada y la esperada por la aplicación"""
+    with engine.connect() as conn:
+        if "alembic_version" in inspect(conn).get_table_names():
+            actual = conn.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+        else:
+            actual = None
+    esperada = version_esperada()
+    print(f"Versión aplicada: {actual or '(sin migrar)'}")
+    print(f"Versión esperada: {esperada}")
+    if actual != esperada:
+        print("Hay migraciones pendientes: python migrate.py")
+
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) > 1:
         if sys.argv[1] == "drop":
             drop_tables()
-        elif sys.argv[1] == "create":
+        elif sys.argv[1] in ("create", "upgrade"):
             create_tables()
         elif sys.argv[1] == "reset":
             drop_tables()
             create_tables()
+        elif sys.argv[1] == "status":
+            status()
         else:
-            print("Uso: python migrate.py [create|drop|reset]")
+            print("Uso: python migrate.py [upgrade|status|drop|reset]")
     else:
         create_tables()
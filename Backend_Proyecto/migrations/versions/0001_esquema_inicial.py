@@ -0,0 +1,117 @@
+"""Esquema inicial (productos, carritos, items, versión del catálogo e idempotencia)
+
+Las bases creadas antes de Alembic (con create_all y el antiguo migrate.py)
+se adoptan sin perder datos: solo se crea lo que falte y, si faltaban las
+columnas de resumen de los carritos, se recalculan.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def tablas_existentes():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def indices_existentes(tabla):
+    return {indice["name"] for indice in sa.inspect(op.get_bind()).get_indexes(tabla)}
+
+def columnas_existentes(tabla):
+    return {columna["name"] for columna in sa.inspect(op.get_bind()).get_columns(tabla)}
+
+def crear_indice(nombre, tabla, columnas):
+    if nombre not in indices_existentes(tabla):
+        op.create_index(nombre, tabla, columnas)
+
+def upgrade():
+    tablas = tablas_existentes()
+
+    if "productos" not in tablas:
+        op.create_table(
+            "productos",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("nombre", sa.String(255), nullable=False),
+            sa.Column("descripcion", sa.Text()),
+            sa.Column("precio", sa.Float(), nullable=False),
+            sa.Column("stock", sa.Integer(), nullable=False),
+            sa.Column("imagen_url", sa.String(500)),
+            sa.Column("categoria", sa.String(100)),
+            sa.Column("fecha_creacion", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("fecha_actualizacion", sa.DateTime(timezone=True)),
+        )
+    crear_indice("ix_productos_id", "productos", ["id"])
+    crear_indice("ix_productos_categoria_precio", "productos", ["categoria", "precio"])
+    crear_indice("ix_productos_precio_stock", "productos", ["precio", "stock"])
+
+    resumen_nuevo = False
+    if "carritos" not in tablas:
+        op.create_table(
+            "carritos",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("fecha_creacion", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("fecha_actualizacion", sa.DateTime(timezone=True)),
+            sa.Column("total", sa.Float()),
+            sa.Column("estado", sa.String(50)),
+            sa.Column("cantidad_items", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("productos_distintos", sa.Integer(), nullable=False, server_default="0"),
+        )
+    else:
+        existentes = columnas_existentes("carritos")
+        for nombre in ("cantidad_items", "productos_distintos"):
+            if nombre not in existentes:
+                op.add_column("carritos", sa.Column(nombre, sa.Integer(), nullable=False, server_default="0"))
+                resumen_nuevo = True
+    crear_indice("ix_carritos_id", "carritos", ["id"])
+
+    if "carrito_items" not in tablas:
+        op.create_table(
+            "carrito_items",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("carrito_id", sa.Integer(), sa.ForeignKey("carritos.id"), nullable=False),
+            sa.Column("producto_id", sa.Integer(), sa.ForeignKey("productos.id"), nullable=False),
+            sa.Column("cantidad", sa.Integer(), nullable=False),
+            sa.Column("precio_unitario", sa.Float(), nullable=False),
+            sa.Column("subtotal", sa.Float(), nullable=False),
+        )
+    crear_indice("ix_carrito_items_id", "carrito_items", ["id"])
+
+    if "catalogo_version" not in tablas:
+        op.create_table(
+            "catalogo_version",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+
+    if "idempotencia_claves" not in tablas:
+        op.create_table(
+            "idempotencia_claves",
+            sa.Column("clave", sa.String(300), primary_key=True),
+            sa.Column("huella", sa.String(64), nullable=False),
+            sa.Column("estado_http", sa.Integer(), nullable=False),
+            sa.Column("respuesta", sa.Text(), nullable=False),
+            sa.Column("expira", sa.DateTime(), nullable=False),
+        )
+    crear_indice("ix_idempotencia_claves_expira", "idempotencia_claves", ["expira"])
+
+    if resumen_nuevo:
+        # Recalcular el resumen de los carritos existentes sin tocar su fecha de actualización
+        op.execute(
+            "UPDATE carritos SET "
+            "cantidad_items = (SELECT COALESCE(SUM(cantidad), 0) FROM carrito_items "
+            "WHERE carrito_items.carrito_id = carritos.id), "
+            "productos_distintos = (SELECT COUNT(DISTINCT producto_id) FROM carrito_items "
+            "WHERE carrito_items.carrito_id = carritos.id)"
+        )
+
+def downgrade():
+    op.drop_table("idempotencia_claves")
+    op.drop_table("catalogo_version")
+    op.drop_table("carrito_items")
+    op.drop_table("carritos")
+    op.drop_table("productos")
@@ -0,0 +1,25 @@
+"""Índices de claves foráneas de carrito_items y del estado de los carritos
+
+Sin ellos, cargar los items de un carrito, contar los carritos que usan un
+producto o filtrar por estado recorre la tabla completa.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-15 00:00:00
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_carrito_items_carrito_id", "carrito_items", ["carrito_id"])
+    op.create_index("ix_carrito_items_producto_id", "carrito_items", ["producto_id"])
+    op.create_index("ix_carritos_estado", "carritos", ["estado"])
+
+def downgrade():
+    op.drop_index("ix_carritos_estado", table_name="carritos")
+    op.drop_index("ix_carrito_items_producto_id", table_name="carrito_items")
+    op.drop_index("ix_carrito_items_carrito_id", table_name="carrito_items")
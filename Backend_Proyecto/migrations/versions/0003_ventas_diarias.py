@@ -0,0 +1,31 @@
+"""Rollup de ventas por día y producto
+
+Se llena con `python recalcular_ventas.py` y después se mantiene al
+completar, cancelar o eliminar carritos.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-08-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "ventas_diarias",
+        sa.Column("dia", sa.Date(), primary_key=True),
+        sa.Column("producto_id", sa.Integer(), primary_key=True),
+        sa.Column("categoria", sa.String(100)),
+        sa.Column("unidades", sa.Integer(), nullable=False),
+        sa.Column("ingresos", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_ventas_diarias_categoria_dia", "ventas_diarias", ["categoria", "dia"])
+
+def downgrade():
+    op.drop_index("ix_ventas_diarias_categoria_dia", table_name="ventas_diarias")
+    op.drop_table("ventas_diarias")
@@ -0,0 +1,46 @@
+"""Tablas de archivo para carritos completados/cancelados antiguos
+
+Se llenan con `python archivar_carritos.py`; las filas se mueven (no se
+copian) desde carritos y carrito_items conservando sus ids.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-08-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "carritos_archivados",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fecha_creacion", sa.DateTime(timezone=True)),
+        sa.Column("fecha_actualizacion", sa.DateTime(timezone=True)),
+        sa.Column("total", sa.Float()),
+        sa.Column("estado", sa.String(50)),
+        sa.Column("cantidad_items", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("productos_distintos", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fecha_archivado", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "carrito_items_archivados",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("carrito_id", sa.Integer(), sa.ForeignKey("carritos_archivados.id"), nullable=False),
+        sa.Column("producto_id", sa.Integer(), sa.ForeignKey("productos.id"), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("precio_unitario", sa.Float(), nullable=False),
+        sa.Column("subtotal", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_carrito_items_archivados_carrito_id", "carrito_items_archivados", ["carrito_id"])
+    op.create_index("ix_carrito_items_archivados_producto_id", "carrito_items_archivados", ["producto_id"])
+
+def downgrade():
+    op.drop_index("ix_carrito_items_archivados_producto_id", table_name="carrito_items_archivados")
+    op.drop_index("ix_carrito_items_archivados_carrito_id", table_name="carrito_items_archivados")
+    op.drop_table("carrito_items_archivados")
+    op.drop_table("carritos_archivados")
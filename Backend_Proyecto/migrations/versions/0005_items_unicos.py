@@ -0,0 +1,51 @@
+"""Un solo item por producto en cada carrito
+
+Antes de agrupar el payload por producto, POST /carrito insertaba una fila
+por línea, así que hay carritos con varias filas del mismo producto. El PUT
+por diferencias y los endpoints de items asumen una sola: las repetidas se
+fusionan en la de menor id (sumando cantidad y subtotal, con lo que el total
+y las unidades del carrito no cambian), se corrige `productos_distintos` y se
+añade un índice único (carrito_id, producto_id).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-09-01 00:00:00
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Filas de carrito_items con otra anterior del mismo carrito y producto
+REPETIDA = (
+    "EXISTS (SELECT 1 FROM carrito_items anterior "
+    "WHERE anterior.carrito_id = carrito_items.carrito_id "
+    "AND anterior.producto_id = carrito_items.producto_id "
+    "AND anterior.id < carrito_items.id)"
+)
+
+def upgrade():
+    op.execute(
+        "UPDATE carritos SET productos_distintos = (SELECT COUNT(DISTINCT producto_id) FROM carrito_items "
+        "WHERE carrito_items.carrito_id = carritos.id) "
+        f"WHERE id IN (SELECT carrito_id FROM carrito_items WHERE {REPETIDA})"
+    )
+    op.execute(
+        "UPDATE carrito_items SET "
+        "cantidad = (SELECT SUM(grupo.cantidad) FROM carrito_items grupo "
+        "WHERE grupo.carrito_id = carrito_items.carrito_id AND grupo.producto_id = carrito_items.producto_id), "
+        "subtotal = (SELECT SUM(grupo.subtotal) FROM carrito_items grupo "
+        "WHERE grupo.carrito_id = carrito_items.carrito_id AND grupo.producto_id = carrito_items.producto_id) "
+        f"WHERE NOT {REPETIDA} AND EXISTS (SELECT 1 FROM carrito_items otra "
+        "WHERE otra.carrito_id = carrito_items.carrito_id AND otra.producto_id = carrito_items.producto_id "
+        "AND otra.id > carrito_items.id)"
+    )
+    op.execute(f"DELETE FROM carrito_items WHERE {REPETIDA}")
+    op.create_index(
+        "ix_carrito_items_carrito_producto", "carrito_items", ["carrito_id", "producto_id"], unique=True
+    )
+
+def downgrade():
+    op.drop_index("ix_carrito_items_carrito_producto", table_name="carrito_items")
@@ -0,0 +1,33 @@
+"""
+Script para reconstruir el rollup de ventas (tabla ventas_diarias) desde el historial
+
+    python recalcular_ventas.py                                    # todo el historial
+    python recalcular_ventas.py --desde 2025-01-01 --hasta 2025-02-01
+
+Úselo tras migrar una base con historial o si el rollup se desincroniza (por
+ejemplo, después de editar carritos directamente en la base). Durante la
+reconstrucción de un rango conviene que no haya checkouts en esos días.
+"""
+import argparse
+import time
+from datetime import date
+from app.database.connection import engine
+from app.core.ventas import recalcular_ventas
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reconstruir el rollup de ventas desde los carritos completados")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="Primer día (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Día final, exclusivo (AAAA-MM-DD)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    rango = f"{args.desde or 'inicio'} → {args.hasta or 'hoy'}"
+    print(f"Recalculando ventas ({rango})...")
+    inicio = time.perf_counter()
+    try:
+        with engine.begin() as conn:
+            filas = recalcular_ventas(conn, args.desde, args.hasta)
+        print(f"✅ {filas} filas (día, producto) en {time.perf_counter() - inicio:.1f}s")
+    except Exception as e:
+        print(f"❌ Error al recalcular las ventas: {e}")
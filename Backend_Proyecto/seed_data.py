@@ -1,8 +1,24 @@
 """
 Script para insertar datos de ejemplo en la base de datos
+
+Sin argumentos inserta el catálogo de ejemplo. Con --productos/--carritos
+genera datos sintéticos a escala (para benchmarks y pruebas de carga):
+
+    python seed_data.py --productos 100000 --carritos 200000 --items 4
 """
-from app.database.connection import SessionLocal
-from app.models.models import Producto
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, func
+from app.database.connection import SessionLocal, engine
+from app.models.models import Producto, Carrito, CarritoItem
+from app.core.ventas import recalcular_ventas
+from app.core.cache import incrementar_version
+
+CATEGORIAS = ["Smartphones", "Laptops", "Tablets", "Audio", "Wearables", "Gaming", "Hogar", "Accesorios"]
+
+# Proporción de estados de los carritos generados (historial realista)
+ESTADOS = (("completado", 0.7), ("activo", 0.2), ("cancelado", 0.1))
 
 def create_sample_data():
     """Crear productos de ejemplo"""
@@ -84,10 +100,9 @@ def create_sample_data():
         
         print("📝 Insertando productos de ejemplo...")
         
-        for producto_data in productos_ejemplo:
-            producto = Producto(**producto_data)
-            db.add(producto)
-        
+        # Un solo INSERT con executemany para todos los productos
+        db.execute(insert(Producto), productos_ejemplo)
+        incrementar_version(db)
         db.commit()
         print(f"✅ Se insertaron {len(productos_ejemplo)} productos exitosamente!")
         
@@ -103,5 +118,109 @@ def create_sample_data():
     finally:
         db.close()
 
+def generar_datos(productos: int, carritos: int, items: int = 3, semilla: int = 42, lote: int = 5000, dias: int = 365):
+    """Insertar productos y carritos sintéticos en lotes con executemany.
+
+    Los IDs se asignan de forma explícita a partir del máximo actual, así que
+    puede ejecutarse sobre una base con datos. Cada carrito tiene entre 1 e
+    `items` productos distintos y una fecha dentro de los últimos `dias` días.
+    Devuelve (ids de productos, ids de carritos) generados.
+    """
+    azar = random.Random(semilla)
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)  # UTC, como CURRENT_TIMESTAMP
+    
+    with engine.begin() as conn:
+        primer_producto = (conn.scalar(select(func.max(Producto.id))) or 0) + 1
+        primer_carrito = (conn.scalar(select(func.max(Carrito.id))) or 0) + 1
+        primer_item = (conn.scalar(select(func.max(CarritoItem.id))) or 0) + 1
+    ids_productos = range(primer_producto, primer_producto + productos)
+    ids_carritos = range(primer_carrito, primer_carrito + carritos)
+    precios = {}
+    
+    with engine.begin() as conn:
+        for inicio in range(0, productos, lote):
+            filas = []
+            for producto_id in ids_productos[inicio:inicio + lote]:
+                precios[producto_id] = round(azar.uniform(5, 1500), 2)
+                filas.append({
+                    "id": producto_id,
+                    "nombre": f"Producto {producto_id}",
+                    "descripcion": f"Descripción del producto {producto_id}",
+                    "precio": precios[producto_id],
+                    "stock": azar.randint(0, 500),
+                    "categoria": azar.choice(CATEGORIAS),
+                    "imagen_url": f"https://example.com/productos/{producto_id}.jpg",
+                    "fecha_creacion": ahora - timedelta(days=azar.uniform(0, dias)),
+                })
+            conn.execute(insert(Producto), filas)
+        if productos:
+            # Las cachés y los ETag de listados de una API en marcha dependen del sello
+            incrementar_version(conn)
+    
+    if not precios:
+        # Sin productos nuevos: los carritos usan el catálogo existente
+        with engine.connect() as conn:
+            precios = dict(conn.execute(select(Producto.id, Producto.precio)).all())
+    catalogo = list(precios)
+    if carritos and not catalogo:
+        raise ValueError("Se necesitan productos para generar carritos")
+    
+    estados = [estado for estado, _ in ESTADOS]
+    pesos = [peso for _, peso in ESTADOS]
+    item_id = primer_item
+    with engine.begin() as conn:
+        for inicio in range(0, carritos, lote):
+            filas_carritos = []
+            filas_items = []
+            for carrito_id in ids_carritos[inicio:inicio + lote]:
+                elegidos = azar.sample(catalogo, k=min(len(catalogo), azar.randint(1, items)))
+                fecha = ahora - timedelta(days=azar.uniform(0, dias))
+                total = 0.0
+                unidades = 0
+                for producto_id in elegidos:
+                    cantidad = azar.randint(1, 3)
+                    subtotal = precios[producto_id] * cantidad
+                    filas_items.append({
+                        "id": item_id,
+                        "carrito_id": carrito_id,
+                        "producto_id": producto_id,
+                        "cantidad": cantidad,
+                        "precio_unitario": precios[producto_id],
+                        "subtotal": subtotal,
+                    })
+                    item_id += 1
+                    total += subtotal
+                    unidades += cantidad
+                filas_carritos.append({
+                    "id": carrito_id,
+                    "fecha_creacion": fecha,
+                    "total": total,
+                    "estado": azar.choices(estados, pesos)[0],
+                    "cantidad_items": unidades,
+                    "productos_distintos": len(elegidos),
+                })
+            conn.execute(insert(Carrito), filas_carritos)
+            conn.execute(insert(CarritoItem), filas_items)
+    
+    return list(ids_productos), list(ids_carritos)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Insertar datos de ejemplo o sintéticos a escala")
+    parser.add_argument("--productos", type=int, default=0, help="Productos sintéticos a generar")
+    parser.add_argument("--carritos", type=int, default=0, help="Carritos sintéticos a generar")
+    parser.add_argument("--items", type=int, default=3, help="Máximo de productos distintos por carrito")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=5000)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    create_sample_data()
+    args = parse_args()
+    if args.productos or args.carritos:
+        print(f"📝 Generando {args.productos} productos y {args.carritos} carritos...")
+        generar_datos(args.productos, args.carritos, args.items, args.semilla, args.lote)
+        # Los carritos se insertan ya completados: el rollup de ventas se calcula al final
+        with engine.begin() as conn:
+            recalcular_ventas(conn)
+        print("✅ Datos sintéticos insertados")
+    else:
+        create_sample_data()
@@ -0,0 +1,59 @@
+"""
+Configuración común de las pruebas: API sobre una base SQLite temporal
+
+Las variables de entorno se fijan antes de importar `app` (la configuración
+se lee al importar). El esquema se crea con las migraciones, igual que en
+producción.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_directorio = tempfile.mkdtemp(prefix="pruebas_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'pruebas.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("REPLICA_DATABASE_URL", None)
+# Conteos sin caché: cada petición emite siempre las mismas sentencias
+os.environ["COUNT_CACHE_TTL"] = "0"
+
+@pytest.fixture(scope="session")
+def client():
+    from alembic import command
+    from fastapi.testclient import TestClient
+    from app.database.esquema import configuracion_alembic
+    from app.main import app
+
+    command.upgrade(configuracion_alembic(configurar_logging=False), "head")
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def sentencias(client):
+    """Lista con el SQL de cada sentencia que la API envía a la base mientras dura la prueba"""
+    from sqlalchemy import event
+    from app.database.connection import async_engine
+
+    ejecutadas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        ejecutadas.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", registrar)
+    yield ejecutadas
+    event.remove(async_engine.sync_engine, "before_cursor_execute", registrar)
+
+@pytest.fixture
+def productos(client):
+    """Crear 50 productos con stock de sobra y devolver sus IDs"""
+    ids = []
+    for numero in range(50):
+        respuesta = client.post("/productos/", json={
+            "nombre": f"Producto {numero}", "precio": 1.0 + numero, "stock": 1000, "categoria": "pruebas"
+        })
+        assert respuesta.status_code == 201
+        ids.append(respuesta.json()["producto"]["id"])
+    return ids
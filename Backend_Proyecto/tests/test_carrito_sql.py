@@ -0,0 +1,104 @@
+"""
+Sentencias SQL por petición de los endpoints de carrito
+
+Crear o actualizar un carrito debe emitir el mismo número de sentencias sin
+importar cuántas líneas traiga: los productos se resuelven con un solo IN y
+los items se insertan con un único executemany. Las lecturas precargan items
+y productos, así que el listado y el detalle tampoco dependen del tamaño de
+la página ni del carrito.
+"""
+
+def lineas(producto_ids, cantidad=1):
+    return [{"producto_id": producto_id, "cantidad": cantidad} for producto_id in producto_ids]
+
+def crear_carrito(client, items):
+    respuesta = client.post("/carrito/", json={"items": items})
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["carrito"]
+
+def test_crear_carrito_sentencias_constantes(client, sentencias, productos):
+    conteos = {}
+    for cantidad in (1, 50):
+        sentencias.clear()
+        carrito = crear_carrito(client, lineas(productos[:cantidad]))
+        assert len(carrito["items"]) == cantidad
+        conteos[cantidad] = len(sentencias)
+    assert conteos[1] == conteos[50], conteos
+
+def test_actualizar_carrito_sentencias_constantes(client, sentencias, productos):
+    conteos = {}
+    for cantidad in (1, 50):
+        carrito = crear_carrito(client, [])
+        sentencias.clear()
+        respuesta = client.put(f"/carrito/{carrito['id']}", json={"items": lineas(productos[:cantidad])})
+        assert respuesta.status_code == 200, respuesta.text
+        assert len(respuesta.json()["carrito"]["items"]) == cantidad
+        conteos[cantidad] = len(sentencias)
+    assert conteos[1] == conteos[50], conteos
+
+def test_crear_carrito_fusiona_productos_repetidos(client, productos):
+    producto_id = productos[0]
+    carrito = crear_carrito(client, lineas([producto_id], 2) + lineas([productos[1]]) + lineas([producto_id], 3))
+
+    cantidades = {item["producto_id"]: item["cantidad"] for item in carrito["items"]}
+    assert cantidades == {producto_id: 5, productos[1]: 1}
+    item = next(item for item in carrito["items"] if item["producto_id"] == producto_id)
+    assert item["subtotal"] == item["precio_unitario"] * 5
+    assert carrito["total"] == sum(item["subtotal"] for item in carrito["items"])
+
+def test_actualizar_carrito_fusiona_productos_repetidos(client, productos):
+    carrito = crear_carrito(client, lineas(productos[:1]))
+    respuesta = client.put(
+        f"/carrito/{carrito['id']}",
+        json={"items": lineas(productos[1:2], 4) + lineas(productos[1:2], 6)}
+    )
+    assert respuesta.status_code == 200, respuesta.text
+
+    items = respuesta.json()["carrito"]["items"]
+    assert [(item["producto_id"], item["cantidad"]) for item in items] == [(productos[1], 10)]
+
+CAMPOS_CARRITO = {
+    "id", "fecha_creacion", "fecha_actualizacion", "total", "estado", "cantidad_items", "productos_distintos", "items"
+}
+CAMPOS_ITEM = {"id", "producto_id", "cantidad", "precio_unitario", "subtotal", "producto"}
+CAMPOS_PRODUCTO = {
+    "id", "nombre", "descripcion", "precio", "stock", "imagen_url", "categoria", "fecha_creacion", "fecha_actualizacion"
+}
+
+def test_listar_carritos_sentencias_constantes(client, sentencias, productos):
+    for numero in range(32):
+        crear_carrito(client, lineas(productos[numero:numero + 3]))
+
+    conteos = {}
+    for limite in (1, 32):
+        sentencias.clear()
+        respuesta = client.get("/carrito/", params={"limit": limite})
+        assert respuesta.status_code == 200, respuesta.text
+        assert len(respuesta.json()["carritos"]) == limite
+        conteos[limite] = len(sentencias)
+    assert conteos[1] == conteos[32], conteos
+
+def test_detalle_carrito_sentencias_constantes(client, sentencias, productos):
+    conteos = {}
+    for cantidad in (1, 50):
+        carrito = crear_carrito(client, lineas(productos[:cantidad]))
+        sentencias.clear()
+        respuesta = client.get(f"/carrito/{carrito['id']}")
+        assert respuesta.status_code == 200, respuesta.text
+        assert len(respuesta.json()["items"]) == cantidad
+        conteos[cantidad] = len(sentencias)
+    assert conteos[1] == conteos[50] == 1, conteos
+
+def test_forma_json_de_listado_y_detalle(client, productos):
+    carrito = crear_carrito(client, lineas(productos[:2]))
+    detalle = client.get(f"/carrito/{carrito['id']}").json()
+    listado = client.get("/carrito/", params={"after_id": carrito["id"] - 1, "limit": 1}).json()
+
+    assert set(listado) == {"carritos", "total", "next_cursor"}
+    assert listado["carritos"] == [detalle]
+    assert set(detalle) == CAMPOS_CARRITO
+    assert len(detalle["items"]) == 2
+    for item in detalle["items"]:
+        assert set(item) == CAMPOS_ITEM
+        assert set(item["producto"]) == CAMPOS_PRODUCTO
+        assert item["producto"]["id"] == item["producto_id"]
@@ -0,0 +1,64 @@
+"""
+Checkouts y ediciones concurrentes sobre el mismo stock
+
+Varios hilos completan carritos que compiten por un producto con poco stock
+mientras otros agregan unidades a esos mismos carritos. La reserva es un
+UPDATE condicional y el estado cambia con una transición condicional, así
+que el stock nunca queda negativo, lo vendido coincide con los carritos
+completados y un carrito ya completado no admite ediciones (409).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+STOCK_INICIAL = 10
+
+def crear_producto(client, stock):
+    respuesta = client.post("/productos/", json={
+        "nombre": "Producto escaso", "precio": 5.0, "stock": stock, "categoria": "pruebas"
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["producto"]["id"]
+
+def crear_carrito(client, producto_id, cantidad):
+    respuesta = client.post("/carrito/", json={"items": [{"producto_id": producto_id, "cantidad": cantidad}]})
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["carrito"]["id"]
+
+def competir(client, producto_id, carritos):
+    """Lanzar a la vez el checkout de cada carrito y una edición del mismo carrito"""
+    def checkout(carrito_id):
+        return client.post(f"/carrito/{carrito_id}/checkout").status_code
+
+    def agregar(carrito_id):
+        return client.post(f"/carrito/{carrito_id}/items", json={"producto_id": producto_id, "cantidad": 1}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as hilos:
+        tareas = []
+        for carrito_id in carritos:
+            tareas += [hilos.submit(checkout, carrito_id), hilos.submit(agregar, carrito_id)]
+        return [tarea.result() for tarea in tareas]
+
+def test_checkouts_concurrentes_no_venden_de_mas(client):
+    # Varias rondas: el orden en que se intercalan las peticiones cambia en cada una
+    for _ in range(5):
+        producto_id = crear_producto(client, STOCK_INICIAL)
+        carritos = [crear_carrito(client, producto_id, 3) for _ in range(8)]
+
+        estados = competir(client, producto_id, carritos)
+        assert set(estados) <= {200, 400, 409}, estados
+
+        stock = client.get(f"/productos/{producto_id}").json()["stock"]
+        assert stock >= 0
+
+        completados = [
+            carrito for carrito in (client.get(f"/carrito/{carrito_id}").json() for carrito_id in carritos)
+            if carrito["estado"] == "completado"
+        ]
+        assert completados
+        vendido = sum(item["cantidad"] for carrito in completados for item in carrito["items"])
+        assert vendido == STOCK_INICIAL - stock
+
+        for carrito in completados:
+            respuesta = client.post(
+                f"/carrito/{carrito['id']}/items", json={"producto_id": producto_id, "cantidad": 1}
+            )
+            assert respuesta.status_code == 409, respuesta.text
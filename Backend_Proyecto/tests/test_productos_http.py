@@ -0,0 +1,37 @@
+"""
+Peticiones condicionales y costo del listado de productos
+"""
+
+def crear_producto(client, nombre, categoria="condicional"):
+    respuesta = client.post("/productos/", json={"nombre": nombre, "precio": 5.0, "stock": 3, "categoria": categoria})
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["producto"]["id"]
+
+def test_listado_no_responde_304_tras_una_baja(client):
+    ids = [crear_producto(client, f"Condicional {numero}") for numero in range(3)]
+    params = {"categoria": "condicional"}
+    primera = client.get("/productos/", params=params)
+    assert primera.status_code == 200
+    assert "last-modified" not in primera.headers
+
+    assert client.delete(f"/productos/{ids[1]}").status_code == 200
+
+    # If-Modified-Since no se usa en listados: una baja no cambia la última fecha de modificación
+    segunda = client.get("/productos/", params=params, headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert segunda.status_code == 200
+    assert [producto["id"] for producto in segunda.json()["productos"]] == [ids[0], ids[2]]
+
+    tercera = client.get("/productos/", params=params, headers={"If-None-Match": primera.headers["etag"]})
+    assert tercera.status_code == 200
+    assert tercera.headers["etag"] != primera.headers["etag"]
+    cuarta = client.get("/productos/", params=params, headers={"If-None-Match": tercera.headers["etag"]})
+    assert cuarta.status_code == 304
+
+def test_listado_sin_total_no_recorre_la_tabla(client, sentencias):
+    producto_id = crear_producto(client, "Sin total")
+    sentencias.clear()
+    respuesta = client.get("/productos/", params={"after_id": producto_id - 1, "limit": 1, "include_total": "false"})
+    assert respuesta.status_code == 200
+    assert respuesta.json()["total"] is None
+    assert not [sentencia for sentencia in sentencias if "count(" in sentencia.lower()], sentencias
+    assert not [sentencia for sentencia in sentencias if "max(" in sentencia.lower()], sentencias
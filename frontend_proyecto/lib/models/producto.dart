@@ -37,6 +37,21 @@ class Producto {
     );
   }
 
+  /// Copia con el stock y/o el precio actualizados (feed de cambios)
+  Producto copyWith({int? stock, double? precio}) {
+    return Producto(
+      id: id,
+      nombre: nombre,
+      descripcion: descripcion,
+      precio: precio ?? this.precio,
+      stock: stock ?? this.stock,
+      imagenUrl: imagenUrl,
+      categoria: categoria,
+      fechaCreacion: fechaCreacion,
+      fechaActualizacion: fechaActualizacion,
+    );
+  }
+
   Map<String, dynamic> toJson() {
     return {
       'id': id,
@@ -51,3 +66,39 @@ class Producto {
     };
   }
 }
+
+/// Cambio de stock o precio recibido por GET /productos/eventos
+class CambioProducto {
+  final int id;
+  final int? stock;
+  final double? precio;
+  final bool eliminado;
+
+  CambioProducto({
+    required this.id,
+    this.stock,
+    this.precio,
+    this.eliminado = false,
+  });
+
+  factory CambioProducto.fromJson(Map<String, dynamic> json) {
+    return CambioProducto(
+      id: json['id'],
+      stock: json['stock'],
+      precio: json['precio']?.toDouble(),
+      eliminado: json['eliminado'] ?? false,
+    );
+  }
+}
+
+/// Mensaje del feed: una lista de cambios o la orden de recargar el catálogo
+class CambiosProductos {
+  final List<CambioProducto> cambios;
+  final bool resincronizar;
+
+  CambiosProductos(this.cambios) : resincronizar = false;
+
+  CambiosProductos.resincronizar()
+      : cambios = const [],
+        resincronizar = true;
+}
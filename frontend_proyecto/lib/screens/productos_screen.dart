@@ -1,3 +1,4 @@
+import 'dart:async';
 import 'package:flutter/material.dart';
 import 'package:provider/provider.dart';
 import '../models/producto.dart';
@@ -17,26 +18,38 @@ class _ProductosScreenState extends State<ProductosScreen> {
   List<Producto> productos = [];
   bool isLoading = true;
   String? error;
+  StreamSubscription<CambiosProductos>? _cambios;
 
   @override
   void initState() {
     super.initState();
     _cargarProductos();
+    _escucharCambios();
   }
 
-  Future<void> _cargarProductos() async {
-    setState(() {
-      isLoading = true;
-      error = null;
-    });
+  @override
+  void dispose() {
+    _cambios?.cancel();
+    super.dispose();
+  }
+
+  Future<void> _cargarProductos({bool silencioso = false}) async {
+    if (!silencioso) {
+      setState(() {
+        isLoading = true;
+        error = null;
+      });
+    }
 
     try {
       final productosResponse = await ApiService.getProductos();
+      if (!mounted) return;
       setState(() {
         productos = productosResponse;
         isLoading = false;
       });
     } catch (e) {
+      if (!mounted || silencioso) return;
       setState(() {
         error = e.toString();
         isLoading = false;
@@ -44,6 +57,45 @@ class _ProductosScreenState extends State<ProductosScreen> {
     }
   }
 
+  /// Recibir los cambios de stock y precio en lugar de recargar la lista
+  void _escucharCambios() {
+    _cambios = ApiService.escucharCambiosProductos().listen(
+      _aplicarCambios,
+      onError: (_) => _reconectar(),
+      onDone: _reconectar,
+      cancelOnError: true,
+    );
+  }
+
+  void _reconectar() {
+    Future.delayed(const Duration(seconds: 3), () {
+      if (!mounted) return;
+      // Los cambios ocurridos sin conexión se recuperan recargando la lista
+      _cargarProductos(silencioso: true);
+      _escucharCambios();
+    });
+  }
+
+  void _aplicarCambios(CambiosProductos mensaje) {
+    if (mensaje.resincronizar) {
+      _cargarProductos(silencioso: true);
+      return;
+    }
+    final cambios = {for (final cambio in mensaje.cambios) cambio.id: cambio};
+    setState(() {
+      productos = [
+        for (final producto in productos)
+          if (cambios[producto.id]?.eliminado != true)
+            cambios.containsKey(producto.id)
+                ? producto.copyWith(
+                    stock: cambios[producto.id]!.stock,
+                    precio: cambios[producto.id]!.precio,
+                  )
+                : producto,
+      ];
+    });
+  }
+
   @override
   Widget build(BuildContext context) {
     return Scaffold(
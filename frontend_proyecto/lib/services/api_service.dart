@@ -34,6 +34,46 @@ class ApiService {
     }
   }
 
+  /// Escuchar los cambios de stock y precio (server-sent events).
+  /// El flujo termina cuando el servidor cierra la conexión; hay que volver a llamarlo.
+  static Stream<CambiosProductos> escucharCambiosProductos() async* {
+    final client = http.Client();
+    try {
+      final request = http.Request('GET', Uri.parse('$baseUrl/productos/eventos'))
+        ..headers['Accept'] = 'text/event-stream';
+      final response = await client.send(request);
+
+      if (response.statusCode != 200) {
+        throw Exception('Error al conectar con el feed de productos: ${response.statusCode}');
+      }
+
+      String? evento;
+      final datos = StringBuffer();
+      final lineas = response.stream.transform(utf8.decoder).transform(const LineSplitter());
+      await for (final linea in lineas) {
+        if (linea.isEmpty) {
+          // Línea vacía: fin del mensaje
+          if (evento == 'resincronizar') {
+            yield CambiosProductos.resincronizar();
+          } else if (evento == 'productos' && datos.isNotEmpty) {
+            final List<dynamic> cambiosJson = jsonDecode(datos.toString());
+            yield CambiosProductos(
+              cambiosJson.map((json) => CambioProducto.fromJson(json)).toList(),
+            );
+          }
+          evento = null;
+          datos.clear();
+        } else if (linea.startsWith('event:')) {
+          evento = linea.substring(6).trim();
+        } else if (linea.startsWith('data:')) {
+          datos.write(linea.substring(5).trim());
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
   /// Obtener un producto por ID
   static Future<Producto> getProducto(int id) async {
     try {